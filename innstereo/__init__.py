@@ -3,10 +3,18 @@
 """
 This module imports the main program.
 
-The __init__ module just imports the main program module (main_ui).
-The main program is then available as a package.
+The __init__ module provides the startup-function of the main program
+module (main_ui). The main program is only imported when startup is called,
+so the headless renderer and the processes of the shared process pool can
+import the package without Gtk.
 """
 
 import os.path
-from .main_ui import startup
 
+
+def startup():
+    """
+    Imports the main program and starts its GUI.
+    """
+    from .main_ui import startup as start_main_ui
+    start_main_ui()
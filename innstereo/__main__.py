@@ -3,12 +3,14 @@
 """
 This module imports the main program and executes it.
 
-The __init__ module just imports the main program module (main_ui).
-The main program is then launched using the imported startup-function.
+The startup-function of the __init__ module imports the main program module
+(main_ui) and launches it. The processes of the shared process pool import
+this module again when the program is run with "python3 -m innstereo", so
+the program is only started by the main process.
 """
 
 import os.path
-from .main_ui import startup
-
-startup()
+from . import startup
 
+if __name__ == "__main__":
+    startup()
@@ -0,0 +1,404 @@
+#!/usr/bin/python3
+
+"""
+This module contains the analysis functions for orientation data.
+
+The functions work on NumPy-arrays of dip directions and dips (planes) or
+trends and plunges (linears) in degrees, so they can be used in scripts and
+batch jobs as well as by the toolbuttons of the main window. Orientations
+are converted to unit vectors in North-East-Down coordinates. Best-fit
+planes, intersections and eigenvectors are calculated from the orientation
+tensor of these vectors. The confidence cones of the eigenvectors are
+estimated by bootstrapping, which decomposes a whole stack of resampled
+tensors at once. The EigenvectorWorker runs this analysis in a background
+thread for the main window. The pairwise intersections of a beta diagram
+are calculated in chunks of pairs, so they never have to be held in memory
+at once.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+#The default number of bootstrap resamples
+BOOTSTRAP_RESAMPLES = 1000
+
+#The number of counts (resamples times measurements) of one bootstrap chunk
+BOOTSTRAP_CHUNK_VALUES = 2 ** 23
+
+#The number of plane pairs that are intersected at once
+BETA_CHUNK_PAIRS = 2 ** 18
+
+#Pairs of planes whose poles are closer than this (the sine of the angle)
+#have no defined intersection and are left out
+PARALLEL_LIMIT = 1e-6
+
+
+def line_vectors(trend, plunge):
+    """
+    Converts linears into unit vectors.
+
+    Expects arrays of trends and plunges in degrees. Returns an array with
+    one row (North, East, Down) for each linear.
+    """
+    trend = np.radians(np.asarray(trend, dtype=np.float64))
+    plunge = np.radians(np.asarray(plunge, dtype=np.float64))
+    cos_plunge = np.cos(plunge)
+    return np.column_stack((cos_plunge * np.cos(trend),
+                            cos_plunge * np.sin(trend),
+                            np.sin(plunge)))
+
+
+def vector_lines(vectors):
+    """
+    Converts unit vectors into linears in the lower hemisphere.
+
+    Vectors that point upwards are reversed. Returns an array of trends and
+    an array of plunges in degrees.
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float64))
+    vectors = np.where(vectors[:, 2:3] < 0, -vectors, vectors)
+    length = np.sqrt(np.sum(vectors ** 2, axis=1))
+    trend = np.degrees(np.arctan2(vectors[:, 1], vectors[:, 0])) % 360
+    plunge = np.degrees(np.arcsin(np.clip(vectors[:, 2] / length, -1, 1)))
+    return trend, plunge
+
+
+def plane_poles(dipdir, dip):
+    """
+    Returns the poles of planes as linears.
+
+    Expects arrays of dip directions and dips. Returns the trends and
+    plunges of the poles.
+    """
+    dipdir = np.asarray(dipdir, dtype=np.float64)
+    dip = np.asarray(dip, dtype=np.float64)
+    return (dipdir + 180) % 360, 90 - dip
+
+
+def normal_planes(trend, plunge):
+    """
+    Returns the planes that are normal to linears.
+
+    Expects arrays of trends and plunges. Returns the dip directions and
+    dips of the planes, whose poles are the linears.
+    """
+    trend = np.asarray(trend, dtype=np.float64)
+    plunge = np.asarray(plunge, dtype=np.float64)
+    return (trend + 180) % 360, 90 - plunge
+
+
+def orientation_tensor(trend, plunge):
+    """
+    Returns the orientation tensor of linears.
+
+    The tensor is the mean of the outer products of the unit vectors of the
+    linears. Raises a ValueError if no linears are passed.
+    """
+    vectors = line_vectors(trend, plunge)
+    if len(vectors) == 0:
+        raise ValueError("No measurements were selected.")
+    return np.dot(vectors.T, vectors) / len(vectors)
+
+
+def eigenvectors(trend, plunge):
+    """
+    Returns the eigenvalues and eigenvectors of the orientation tensor.
+
+    Expects arrays of the trends and plunges of linears (or poles). Returns
+    the three eigenvalues in descending order, and the trends and plunges
+    of the corresponding eigenvectors. All three come from one
+    decomposition of the tensor. The first eigenvector is the mean
+    direction of a cluster, the last one is the pole of a girdle.
+    """
+    values, vectors = np.linalg.eigh(orientation_tensor(trend, plunge))
+    vector_trend, vector_plunge = vector_lines(vectors[:, ::-1].T)
+    return values[::-1], vector_trend, vector_plunge
+
+
+def bootstrap_tensors(outer, resamples, rng):
+    """
+    Returns a stack of orientation tensors of resampled measurements.
+
+    Expects the flattened outer products of the unit vectors (one row of 9
+    values per measurement). Each resample draws as many measurements as
+    there are, with replacement. The draws are counted per measurement, so
+    the tensors of all resamples are one product of the counts and the
+    outer products. The draws of all resamples are counted by one bincount,
+    offsetting the indices of each resample by its row, so the only Python
+    loop of the bootstrap is the one over the chunks in bootstrap_cones.
+    Returns an array of shape (resamples, 3, 3).
+    """
+    count = len(outer)
+    draws = rng.integers(0, count, (resamples, count))
+    draws += np.arange(resamples)[:, np.newaxis] * count
+    counts = np.bincount(draws.ravel(), minlength=resamples * count)
+    counts = counts.reshape(resamples, count).astype(np.float64)
+    tensors = np.einsum("rn,nk->rk", counts, outer, optimize=True)
+    return tensors.reshape(resamples, 3, 3) / count
+
+
+def bootstrap_cones(trend, plunge, resamples=BOOTSTRAP_RESAMPLES,
+                    confidence=95, seed=None, max_workers=1):
+    """
+    Returns the confidence cones of the three eigenvectors.
+
+    Expects arrays of the trends and plunges of linears (or poles). The
+    measurements are resampled with replacement and the orientation tensors
+    of all resamples are decomposed at once. The cone of an eigenvector is
+    the angle (in degrees) to the eigenvector of the measurements that the
+    given percentage of the resampled eigenvectors do not exceed. The
+    resamples are calculated in chunks, which run in max_workers threads.
+    The chunks have their own random generators that are derived from the
+    seed, so the result does not depend on the number of threads. Returns
+    an array of three angles, beginning with the largest eigenvalue.
+    """
+    vectors = line_vectors(trend, plunge)
+    if len(vectors) == 0:
+        raise ValueError("No measurements were selected.")
+    outer = np.einsum("ni,nj->nij", vectors, vectors).reshape(-1, 9)
+    reference = np.linalg.eigh(np.dot(vectors.T, vectors))[1]
+
+    chunk_size = max(1, BOOTSTRAP_CHUNK_VALUES // len(vectors))
+    sizes = [min(chunk_size, resamples - start)
+             for start in range(0, resamples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    def decompose_chunk(size, chunk_seed):
+        tensors = bootstrap_tensors(outer, size,
+                                    np.random.default_rng(chunk_seed))
+        resampled = np.linalg.eigh(tensors)[1]
+        #Eigenvectors have no sign, so the absolute cosine is used
+        cosines = np.abs(np.einsum("rij,ij->rj", resampled, reference))
+        return np.degrees(np.arccos(np.clip(cosines, 0, 1)))
+
+    if max_workers > 1 and len(sizes) > 1:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            angles = list(executor.map(decompose_chunk, sizes, seeds))
+    else:
+        angles = [decompose_chunk(size, chunk_seed)
+                  for size, chunk_seed in zip(sizes, seeds)]
+    cones = np.percentile(np.concatenate(angles), confidence, axis=0)
+    return cones[::-1]
+
+
+class EigenvectorWorker(object):
+
+    """
+    Calculates eigenvectors and their confidence cones in a background thread.
+
+    The bootstrap of the cones takes too long for the main thread of the
+    GUI. When a result is ready, the callback is handed to the post function
+    (GLib.idle_add in the main window), so it runs in the main thread.
+    Errors of the analysis are handed to the error function in the same way.
+    """
+
+    def __init__(self, post_function, error_function=None,
+                 max_workers=1):
+        """
+        Initializes the thread of the worker.
+
+        Expects the function that runs a callback in the main thread. The
+        error function receives the exception of a job that failed. The
+        bootstrap of each job runs in max_workers threads.
+        """
+        self.post_function = post_function
+        self.error_function = error_function
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.jobs = set()
+
+    def analyse(self, trend, plunge):
+        """
+        Returns the eigenvalues, eigenvectors and cones of the measurements.
+
+        Runs in the thread of the worker.
+        """
+        values, vector_trend, vector_plunge = eigenvectors(trend, plunge)
+        cones = bootstrap_cones(trend, plunge, max_workers=self.max_workers)
+        return values, vector_trend, vector_plunge, cones
+
+    def submit(self, trend, plunge, callback):
+        """
+        Starts the analysis of the trends and plunges of linears (or poles).
+
+        The arrays are copied, because they can change while the analysis
+        runs. Once the analysis is done the callback receives the
+        eigenvalues, the trends and plunges of the eigenvectors and their
+        cones, like eigenvectors and bootstrap_cones return them.
+        """
+        future = self.executor.submit(self.analyse, np.array(trend),
+                                      np.array(plunge))
+        self.jobs.add(future)
+        future.add_done_callback(
+            lambda done: self.post_function(self.on_job_done, done, callback))
+
+    def on_job_done(self, future, callback):
+        """
+        Hands a finished analysis to the callback. Runs in the main thread.
+
+        The result is discarded if the worker was shut down. The exception of
+        a failed job is handed to the error function. Returns False so the
+        idle-source is removed.
+        """
+        if future not in self.jobs:
+            return False
+        self.jobs.discard(future)
+        if future.cancelled():
+            return False
+        if future.exception() is not None:
+            if self.error_function is not None:
+                self.error_function(future.exception())
+            return False
+        callback(*future.result())
+        return False
+
+    def is_pending(self):
+        """
+        Returns True if an analysis is running or waiting.
+        """
+        return len(self.jobs) > 0
+
+    def shutdown(self):
+        """
+        Discards all jobs and stops the thread.
+        """
+        for future in self.jobs:
+            future.cancel()
+        self.jobs.clear()
+        self.executor.shutdown(wait=False)
+
+
+def best_fit_plane(trend, plunge):
+    """
+    Returns the plane that fits a set of linears best.
+
+    The pole of the plane is the eigenvector with the smallest eigenvalue.
+    Returns the dip direction and dip of the plane.
+    """
+    values, vector_trend, vector_plunge = eigenvectors(trend, plunge)
+    dipdir, dip = normal_planes(vector_trend[2], vector_plunge[2])
+    return float(dipdir), float(dip)
+
+
+def plane_intersection(dipdir, dip):
+    """
+    Returns the linear that fits the intersection of a set of planes best.
+
+    The linear is the pole of the best-fit girdle through the poles of the
+    planes (e.g. the fold axis of folded bedding). Returns the trend and
+    plunge of the linear.
+    """
+    pole_trend, pole_plunge = plane_poles(dipdir, dip)
+    values, vector_trend, vector_plunge = eigenvectors(pole_trend,
+                                                       pole_plunge)
+    return float(vector_trend[2]), float(vector_plunge[2])
+
+
+def plane_pairs(count, chunk_pairs=BETA_CHUNK_PAIRS, max_pairs=None,
+                rng=None):
+    """
+    Yields the index-arrays of pairs of planes in chunks.
+
+    All count * (count - 1) / 2 pairs are yielded, in chunks of whole rows
+    of the upper triangle with about chunk_pairs pairs each. If there are
+    more pairs than max_pairs, max_pairs pairs of two different planes are
+    drawn at random with the random generator instead. Yields two arrays of
+    the same length.
+    """
+    total = count * (count - 1) // 2
+    if max_pairs is not None and total > max_pairs:
+        if rng is None:
+            rng = np.random.default_rng()
+        for start in range(0, max_pairs, chunk_pairs):
+            size = min(chunk_pairs, max_pairs - start)
+            first = rng.integers(0, count, size)
+            second = rng.integers(0, count - 1, size)
+            second[second >= first] += 1
+            yield first, second
+        return
+
+    row = 0
+    while row < count - 1:
+        #Row k of the upper triangle has count - 1 - k pairs
+        end = row + 1
+        pairs = count - 1 - row
+        while end < count - 1 and pairs + count - 1 - end <= chunk_pairs:
+            pairs += count - 1 - end
+            end += 1
+        lengths = count - 1 - np.arange(row, end)
+        first = np.repeat(np.arange(row, end), lengths)
+        offsets = np.arange(len(first)) - np.repeat(np.cumsum(lengths) -
+                                                    lengths, lengths)
+        yield first, first + 1 + offsets
+        row = end
+
+
+def crossing_pairs(first_poles, second_poles):
+    """
+    Returns True for each pair of poles whose planes intersect.
+
+    Expects two arrays of unit vectors of the same length. Pairs of (nearly)
+    parallel poles have no defined intersection. The squared sine of the
+    angle between two unit vectors is one minus their squared dot product,
+    so no cross products are needed.
+    """
+    cosines = np.einsum("ij,ij->i", first_poles, second_poles)
+    return 1 - cosines ** 2 > PARALLEL_LIMIT ** 2
+
+
+def pairwise_intersections(dipdir, dip, max_pairs=None, seed=None,
+                           chunk_pairs=BETA_CHUNK_PAIRS):
+    """
+    Yields the intersections of pairs of planes in chunks.
+
+    The intersection of two planes is the cross product of their poles.
+    Pairs of (nearly) parallel planes are left out (see crossing_pairs). If
+    there are more pairs than max_pairs, a random subsample of max_pairs
+    pairs is used (see plane_pairs). Yields arrays of unit vectors in the
+    lower hemisphere, with one row (North, East, Down) for each
+    intersection.
+    """
+    poles = line_vectors(*plane_poles(dipdir, dip))
+    rng = np.random.default_rng(seed)
+    for first, second in plane_pairs(len(poles), chunk_pairs, max_pairs,
+                                     rng):
+        keep = crossing_pairs(poles[first], poles[second])
+        vectors = np.cross(poles[first[keep]], poles[second[keep]])
+        length = np.sqrt(np.sum(vectors ** 2, axis=1))
+        vectors /= length[:, np.newaxis]
+        vectors[vectors[:, 2] < 0] *= -1
+        yield vectors
+
+
+def count_intersections(dipdir, dip, max_pairs=None, seed=None,
+                        chunk_pairs=BETA_CHUNK_PAIRS):
+    """
+    Returns the number of intersections that pairwise_intersections yields.
+
+    The same pairs are drawn for the same arguments, but only their dot
+    products are calculated, so this is much cheaper than intersecting the
+    planes.
+    """
+    poles = line_vectors(*plane_poles(dipdir, dip))
+    rng = np.random.default_rng(seed)
+    return sum(int(np.count_nonzero(crossing_pairs(poles[first],
+                                                   poles[second])))
+               for first, second in plane_pairs(len(poles), chunk_pairs,
+                                                max_pairs, rng))
+
+
+def beta_lines(dipdir, dip, max_pairs=None, seed=None):
+    """
+    Returns the trends and plunges of the pairwise intersections of planes.
+
+    This is the beta diagram of the planes as linears. All intersections are
+    returned at once, so max_pairs should be set for many planes.
+    """
+    trend = [np.empty(0)]
+    plunge = [np.empty(0)]
+    for vectors in pairwise_intersections(dipdir, dip, max_pairs, seed):
+        if len(vectors) > 0:
+            chunk_trend, chunk_plunge = vector_lines(vectors)
+            trend.append(chunk_trend)
+            plunge.append(chunk_plunge)
+    return np.concatenate(trend), np.concatenate(plunge)
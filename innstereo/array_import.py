@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+
+"""
+This module imports measurements from binary array files.
+
+Processing scripts often store the dip directions and dips of measurements
+as NumPy-arrays. Such files do not need to pass through the text parser. The
+functions of this module memory-map .npy-files, or raw files of
+little-endian float64 values, and return their columns as views of the file.
+The layers use these views as their data columns, so the import does not
+copy the data. The memory-maps are opened in copy-on-write mode, so edits
+in the program never change the file.
+"""
+
+import numpy as np
+
+#The extensions of the files that can be imported
+ARRAY_EXTENSIONS = (".npy", ".bin", ".raw", ".f64")
+
+
+def open_array_file(path, column_count):
+    """
+    Memory-maps an array file.
+
+    Files with the extension .npy are opened with numpy.load. All other files
+    are read as raw little-endian float64 values with column_count values
+    per row. Raises a ValueError if the size of a raw file does not fit the
+    number of columns.
+    """
+    if path.lower().endswith(".npy"):
+        return np.load(path, mmap_mode="c", allow_pickle=False)
+
+    values = np.memmap(path, dtype="<f8", mode="c")
+    if len(values) % column_count != 0:
+        raise ValueError("The file does not hold {0} values per row.".format(
+                                                                column_count))
+    return values.reshape(-1, column_count)
+
+
+def array_columns(array):
+    """
+    Returns the columns of an array as a list of views.
+
+    A 1-dimensional array is one column. The columns of a 2-dimensional
+    array are its columns. The columns of a structured array are its fields,
+    in the order in which they are defined.
+    """
+    if array.dtype.names is not None:
+        return [array[name] for name in array.dtype.names]
+    elif array.ndim == 1:
+        return [array]
+    elif array.ndim == 2:
+        return [array[:, k] for k in range(array.shape[1])]
+    else:
+        raise ValueError("Arrays with {0} dimensions can not be "
+                         "imported.".format(array.ndim))
+
+
+def load_layer_arrays(path, column_count):
+    """
+    Returns the first column_count columns of an array file.
+
+    Raises a ValueError if the file has fewer columns than the layer needs.
+    """
+    columns = array_columns(open_array_file(path, column_count))
+    if len(columns) < column_count:
+        raise ValueError("The file has {0} columns, but {1} are "
+                         "needed.".format(len(columns), column_count))
+    return columns[:column_count]
@@ -0,0 +1,332 @@
+#!/usr/bin/python3
+
+"""
+This module renders the figures of many projects or text files at once.
+
+Reports often need one stereonet per outcrop. The export_figures-function
+renders a list of inputs in a pool of processes. Each process creates one
+StereonetRenderer when it starts and reuses its figure and axes for all the
+figures it renders, so only the layers are drawn for each figure. A
+StyleTemplate sets the plot settings and the style of each layer-type, so
+all figures look the same. A manifest with the timing of each figure is
+written next to the figures. The main-function is the entry point of the
+innstereo-export command and of "python3 -m innstereo.batch_export".
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from .plot_control import PlotSettings
+from .plot_renderer import StereonetRenderer
+from .project_file import ProjectArchive, PROJECT_EXTENSION
+from .batch_import import TEXT_EXTENSIONS
+from .headless import (load_project_layers, load_text_layer, LAYER_CLASSES,
+                       VIEW_MODES)
+
+#The name of the manifest in the output directory
+MANIFEST_FILE_NAME = "manifest.json"
+
+#The renderer of a worker process, created by start_worker
+worker_renderer = None
+
+#The style template of a worker process
+worker_template = None
+
+
+class StyleTemplate(object):
+
+    """
+    Stores the plot settings and the layer styles that a batch export uses.
+
+    The settings are a dictionary of the PlotSettings (see saved_settings)
+    and the styles are a dictionary with a style dictionary for each
+    layer-type. Each worker process renders all its figures with the same
+    settings, so settings that are not in the template keep their default
+    values, also for projects. Layers of a layer-type that has no style in
+    the template keep the style of the project, or the default style.
+    """
+
+    def __init__(self, settings=None, styles=None):
+        """
+        Initializes the template.
+        """
+        self.settings = settings or {}
+        self.styles = styles or {}
+
+    def to_dict(self):
+        """
+        Returns the template as a dictionary.
+        """
+        return {"settings": self.settings, "styles": self.styles}
+
+    @classmethod
+    def from_dict(cls, values):
+        """
+        Returns a new template from a dictionary.
+        """
+        return cls(values.get("settings"), values.get("styles"))
+
+    def save(self, path):
+        """
+        Writes the template to a JSON-file.
+        """
+        with open(path, "w") as template_file:
+            json.dump(self.to_dict(), template_file, indent=4, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a template from a JSON-file or a project file.
+
+        A project file gives its plot settings and the style of the first
+        layer of each layer-type.
+        """
+        if path.lower().endswith(PROJECT_EXTENSION):
+            return cls.from_project(ProjectArchive(path))
+        with open(path) as template_file:
+            return cls.from_dict(json.load(template_file))
+
+    @classmethod
+    def from_project(cls, archive):
+        """
+        Returns a new template from the settings and layers of a project.
+        """
+        styles = {}
+        def collect_styles(nodes):
+            for node in nodes:
+                if node["kind"] == "group":
+                    collect_styles(node["children"])
+                elif node["layer_type"] not in styles:
+                    styles[node["layer_type"]] = node["style"]
+        collect_styles(archive.get_layer_tree())
+        return cls(archive.get_settings(), styles)
+
+    def apply_settings(self, settings):
+        """
+        Applies the plot settings of the template to PlotSettings.
+        """
+        settings.set_settings_dict(self.settings)
+
+    def apply_style(self, layer_obj):
+        """
+        Applies the style of the template to a layer.
+
+        The label of the layer is kept.
+        """
+        style = self.styles.get(layer_obj.get_layer_type())
+        if style is not None:
+            label = layer_obj.get_label()
+            layer_obj.set_style_dict(style)
+            layer_obj.set_label(label)
+
+
+def find_inputs(patterns):
+    """
+    Returns the sorted paths of the projects and text files to export.
+
+    A directory gives all its files with one of the TEXT_EXTENSIONS or the
+    PROJECT_EXTENSION. Other patterns are expanded as glob-patterns.
+    """
+    extensions = TEXT_EXTENSIONS + (PROJECT_EXTENSION,)
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(os.path.join(pattern, name)
+                         for name in os.listdir(pattern)
+                         if name.lower().endswith(extensions))
+        else:
+            paths.update(glob.glob(pattern))
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def output_paths(inputs, output_dir, file_format):
+    """
+    Returns the paths of the figures of the inputs in the output directory.
+
+    The figures keep the paths of the inputs relative to the directory that
+    holds all inputs, so inputs of the same name in different directories
+    (e.g. "a/s.csv" and "b/s.csv") go into subdirectories of the output
+    directory. Inputs that only differ in their extension (e.g. "x.csv" and
+    "x.innstereo") keep their extension in the name of the figure. Raises a
+    ValueError if two figures would still have the same path.
+    """
+    if len(inputs) == 0:
+        return []
+    inputs = [os.path.abspath(path) for path in inputs]
+    root = os.path.commonpath([os.path.dirname(path) for path in inputs])
+    names = [os.path.splitext(os.path.relpath(path, root))[0]
+             for path in inputs]
+    duplicates = {name for name in names if names.count(name) > 1}
+    names = [os.path.relpath(path, root) if name in duplicates else name
+             for path, name in zip(inputs, names)]
+    paths = [os.path.join(output_dir, "{0}.{1}".format(name, file_format))
+             for name in names]
+    for path in paths:
+        if paths.count(path) > 1:
+            raise ValueError("Several inputs would be rendered to "
+                             "{0}.".format(path))
+    return paths
+
+
+def start_worker(template_dict, view_mode):
+    """
+    Creates the renderer of a worker process.
+
+    Runs once in each process of the pool. The figure and axes of the
+    renderer are reused for all figures of the process.
+    """
+    global worker_renderer, worker_template
+    worker_template = StyleTemplate.from_dict(template_dict)
+    settings = PlotSettings()
+    worker_template.apply_settings(settings)
+    worker_renderer = StereonetRenderer(settings, view_mode)
+
+
+def export_figure(input_path, output_file, layer_type="plane", dpi=None):
+    """
+    Renders one input with the renderer of the worker process.
+
+    Returns the manifest entry of the figure. It holds the number of layers
+    and rows, the time in seconds that was spent loading, drawing and saving
+    and the process id of the worker. If the input can not be rendered, the
+    entry holds the error instead.
+    """
+    entry = {"input": input_path, "output": output_file,
+             "worker": os.getpid()}
+    start = time.perf_counter()
+    try:
+        if input_path.lower().endswith(PROJECT_EXTENSION):
+            archive = ProjectArchive(input_path)
+            layers = load_project_layers(archive, archive.get_layer_tree())
+        else:
+            layers = [load_text_layer(input_path, layer_type)]
+        for layer_obj in layers:
+            worker_template.apply_style(layer_obj)
+        entry["layers"] = len(layers)
+        entry["rows"] = sum(len(layer_obj.get_data_columns())
+                            for layer_obj in layers)
+        loaded = time.perf_counter()
+
+        worker_renderer.draw_layers(layers)
+        drawn = time.perf_counter()
+
+        worker_renderer.write_figure(output_file, dpi)
+        saved = time.perf_counter()
+    except (OSError, ValueError, KeyError) as error:
+        entry["status"] = "error"
+        entry["error"] = str(error)
+        entry["total_seconds"] = time.perf_counter() - start
+        return entry
+
+    entry["status"] = "ok"
+    entry["load_seconds"] = loaded - start
+    entry["draw_seconds"] = drawn - loaded
+    entry["save_seconds"] = saved - drawn
+    entry["total_seconds"] = saved - start
+    return entry
+
+
+def export_figures(inputs, output_dir, template=None, view_mode="stereonet",
+                   file_format="png", layer_type="plane", dpi=None,
+                   max_workers=None):
+    """
+    Renders a list of inputs in a pool of processes and writes a manifest.
+
+    Each input (a project or a text file) becomes one figure in the output
+    directory, named after the input (see output_paths). Returns the
+    manifest, which is also
+    written to MANIFEST_FILE_NAME in the output directory. The figures are
+    listed in the order of the inputs. max_workers defaults to the number of
+    processors.
+    """
+    if template is None:
+        template = StyleTemplate()
+    outputs = output_paths(inputs, output_dir, file_format)
+    for directory in set(os.path.dirname(path) for path in outputs) | \
+                                                            {output_dir}:
+        os.makedirs(directory, exist_ok=True)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers,
+                             initializer=start_worker,
+                             initargs=(template.to_dict(),
+                                       view_mode)) as executor:
+        futures = [executor.submit(export_figure, path, output_file,
+                                   layer_type, dpi)
+                   for path, output_file in zip(inputs, outputs)]
+        figures = [future.result() for future in futures]
+
+    manifest = {"view_mode": view_mode, "format": file_format,
+                "template": template.to_dict(),
+                "figure_count": len(figures),
+                "failed_count": sum(1 for figure in figures
+                                    if figure["status"] != "ok"),
+                "wall_seconds": time.perf_counter() - start,
+                "figures": figures}
+    with open(os.path.join(output_dir, MANIFEST_FILE_NAME),
+              "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1)
+    return manifest
+
+
+def main(argv=None):
+    """
+    Runs the innstereo-export command.
+
+    Returns 0 if all figures were rendered, otherwise 1.
+    """
+    parser = argparse.ArgumentParser(prog="innstereo-export",
+        description="Renders many InnStereo projects or text files to "
+                    "figures in parallel and writes a manifest.")
+    parser.add_argument("inputs", nargs="+",
+        help="project files, text files, directories or glob-patterns")
+    parser.add_argument("-o", "--output-dir", required=True,
+        help="directory for the figures and the manifest")
+    parser.add_argument("--template", default=None,
+        help="style template (JSON-file or project file)")
+    parser.add_argument("--view", choices=VIEW_MODES, default="stereonet",
+        help="the view that is rendered (default: stereonet)")
+    parser.add_argument("--format", default="png",
+        help="file format of the figures, e.g. png, svg or pdf "
+             "(default: png)")
+    parser.add_argument("--layer-type", choices=sorted(LAYER_CLASSES),
+        default="plane",
+        help="the layer type of text files (default: plane)")
+    parser.add_argument("--dpi", type=float, default=None,
+        help="resolution of raster images")
+    parser.add_argument("--workers", type=int, default=None,
+        help="number of worker processes (default: number of processors)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.template is not None:
+            template = StyleTemplate.load(args.template)
+        else:
+            template = None
+        inputs = find_inputs(args.inputs)
+        manifest = export_figures(inputs, args.output_dir, template,
+                                  args.view, args.format, args.layer_type,
+                                  args.dpi, args.workers)
+    except (OSError, ValueError) as error:
+        sys.stderr.write("innstereo-export: {0}\n".format(error))
+        return 1
+
+    for figure in manifest["figures"]:
+        if figure["status"] != "ok":
+            sys.stderr.write("innstereo-export: {0}: {1}\n".format(
+                                            figure["input"], figure["error"]))
+    sys.stdout.write("Rendered {0} of {1} figures in {2:.1f} s.\n".format(
+                        manifest["figure_count"] - manifest["failed_count"],
+                        manifest["figure_count"], manifest["wall_seconds"]))
+    if manifest["failed_count"] > 0:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+#!/usr/bin/python3
+
+"""
+This module imports many text files at once.
+
+Field campaigns produce many files with the same layout. The ColumnMapping-
+class stores which columns of such a file hold which values of a layer, as
+it is chosen in the file-parse dialog, and can be saved to a JSON-file. The
+BatchImporter parses the files of a directory or glob-pattern with such a
+mapping in the shared pool of processes, so several files are converted at
+the same time. Each file, or each value of a grouping column in a file,
+becomes one layer.
+"""
+
+import glob
+import json
+import os
+import numpy as np
+
+from .text_import import LineOffsetIndex, read_column_arrays
+from .text_sniffer import TextDialect, sniff_dialect, SNIFF_LINES
+from .process_pool import get_process_pool
+
+#The file in a directory that holds the column mapping of its files
+MAPPING_FILE_NAME = "innstereo_mapping.json"
+
+#The extensions of the files that are imported from a directory
+TEXT_EXTENSIONS = (".csv", ".txt", ".dat")
+
+#The sense-codes of TectonicsFP files
+TFPL_CODES = {"0": "ukn", "1": "up", "2": "dn", "3": "dex", "4": "sin"}
+
+
+class ColumnMapping(object):
+
+    """
+    Stores how the columns of a text file are assigned to a layer.
+
+    The mapping holds the type of layer, the numbers of the columns with the
+    values (e.g. dip direction and dip), the number of the text column, if
+    the text column holds TectonicsFP sense-codes, the first line that holds
+    data and the number of the column by which the rows are grouped into
+    layers. Unassigned columns are -1. The dialect is the dictionary of a
+    TextDialect. If it is None, the layout of each file is sniffed.
+    """
+
+    def __init__(self, layer_type, float_columns, text_column=-1,
+                 use_tfpl=False, start_line=0, group_column=-1, dialect=None):
+        """
+        Initializes the mapping.
+        """
+        self.layer_type = layer_type
+        self.float_columns = [int(column) for column in float_columns]
+        self.text_column = int(text_column)
+        self.use_tfpl = bool(use_tfpl)
+        self.start_line = int(start_line)
+        self.group_column = int(group_column)
+        self.dialect = dialect
+
+    def to_dict(self):
+        """
+        Returns the mapping as a dictionary.
+        """
+        return {"layer_type": self.layer_type,
+                "float_columns": self.float_columns,
+                "text_column": self.text_column,
+                "use_tfpl": self.use_tfpl,
+                "start_line": self.start_line,
+                "group_column": self.group_column,
+                "dialect": self.dialect}
+
+    @classmethod
+    def from_dict(cls, values):
+        """
+        Returns a new mapping from a dictionary.
+        """
+        return cls(values["layer_type"], values["float_columns"],
+                   values.get("text_column", -1),
+                   values.get("use_tfpl", False),
+                   values.get("start_line", 0),
+                   values.get("group_column", -1),
+                   values.get("dialect"))
+
+    def get_sense_codes(self):
+        """
+        Returns the dictionary that translates the text column, or None.
+        """
+        if self.use_tfpl == True:
+            return TFPL_CODES
+        else:
+            return None
+
+    def save(self, path):
+        """
+        Writes the mapping to a JSON-file.
+        """
+        with open(path, "w") as mapping_file:
+            json.dump(self.to_dict(), mapping_file, indent=4, sort_keys=True)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a mapping from a JSON-file.
+        """
+        with open(path) as mapping_file:
+            return cls.from_dict(json.load(mapping_file))
+
+
+def find_files(pattern):
+    """
+    Returns the sorted paths of the files that should be imported.
+
+    If the pattern is a directory, all files in it with one of the
+    TEXT_EXTENSIONS are returned. Otherwise the pattern is expanded as a
+    glob-pattern (e.g. "campaign/*.csv").
+    """
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                 if name.lower().endswith(TEXT_EXTENSIONS)]
+    else:
+        paths = glob.glob(pattern)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def split_groups(arrays, groups):
+    """
+    Splits the arrays of a layer by the values of a group column.
+
+    Returns a list of (group value, arrays) tuples, sorted by the value.
+    """
+    values, inverse = np.unique(groups.astype(str), return_inverse=True)
+    return [(value, [column[inverse == k] for column in arrays])
+            for k, value in enumerate(values)]
+
+
+def parse_file(path, mapping_dict):
+    """
+    Reads one file with a column mapping. Runs in a worker process.
+
+    The mapping is passed as a dictionary, so it can be sent to the process.
+    Returns a list of (layer label, arrays) tuples. The label is the name of
+    the file without extension, followed by the group value if the mapping
+    has a group column. Files are split with the dialect of the mapping, or
+    with a dialect that is sniffed from the first lines of the file.
+    """
+    mapping = ColumnMapping.from_dict(mapping_dict)
+    name = os.path.splitext(os.path.basename(path))[0]
+    index = LineOffsetIndex(path)
+    try:
+        if mapping.dialect is not None:
+            dialect = TextDialect.from_dict(mapping.dialect)
+        else:
+            dialect = sniff_dialect(index.read_lines(0, SNIFF_LINES))
+        arrays, groups = read_column_arrays(index, mapping.start_line,
+                                            mapping.float_columns,
+                                            mapping.text_column,
+                                            mapping.get_sense_codes(),
+                                            mapping.group_column, dialect)
+    finally:
+        index.close()
+
+    if groups is None:
+        return [(name, arrays)]
+    return [("{0} - {1}".format(name, value), group_arrays)
+            for value, group_arrays in split_groups(arrays, groups)]
+
+
+class BatchImporter(object):
+
+    """
+    Parses text files in a pool of processes.
+
+    Converting the text of a file into arrays holds the GIL for most of the
+    time, so the files are parsed in separate processes instead of threads.
+    The results are collected in the main thread through the post function
+    (GLib.idle_add in the main window). The callback is called once, after
+    all files are parsed.
+    """
+
+    def __init__(self, post_function, executor=None):
+        """
+        Initializes the importer.
+
+        The executor defaults to the shared pool of the process_pool-module,
+        which is only started when files are imported.
+        """
+        self.post_function = post_function
+        self.executor = executor
+        self.futures = []
+
+    def start(self, paths, mapping, callback):
+        """
+        Starts parsing the files with the column mapping.
+
+        Once all files are parsed, the callback receives a list of
+        (layer label, arrays) tuples in the order of the paths and a list of
+        (path, exception) tuples of the files that could not be read.
+        """
+        self.cancel()
+        if len(paths) == 0:
+            callback([], [])
+            return
+        executor = self.executor or get_process_pool()
+        futures = [executor.submit(parse_file, path, mapping.to_dict())
+                   for path in paths]
+        self.futures = futures
+        for future in futures:
+            future.add_done_callback(
+                lambda done: self.post_function(self.on_file_done, paths,
+                                                futures, callback))
+
+    def on_file_done(self, paths, futures, callback):
+        """
+        Hands the results to the callback once all files are parsed.
+
+        Runs in the main thread. Results of a cancelled import are
+        discarded. Returns False so the idle-source is removed.
+        """
+        if futures is not self.futures:
+            return False
+        if not all(future.done() for future in futures):
+            return False
+
+        results = []
+        errors = []
+        for path, future in zip(paths, futures):
+            if future.cancelled():
+                continue
+            elif future.exception() is not None:
+                errors.append((path, future.exception()))
+            else:
+                results.extend(future.result())
+        self.futures = []
+        callback(results, errors)
+        return False
+
+    def is_running(self):
+        """
+        Returns True while files are being parsed.
+        """
+        return len(self.futures) > 0
+
+    def cancel(self):
+        """
+        Discards the running import.
+
+        Files that are not parsed yet are cancelled. The processes of the
+        pool keep running for later jobs.
+        """
+        for future in self.futures:
+            future.cancel()
+        self.futures = []
@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+
+"""
+This module separates orientations into sets by spherical clustering.
+
+Joints and other fractures form sets of similar orientation. The
+cluster_orientations-function splits the unit vectors of linears (or of the
+poles of planes) into a given number of sets with an axial k-means: a vector
+and its opposite are the same orientation, so the similarity of a vector to
+the center of a set is the absolute cosine between them. The centers are
+fitted with mini-batches of a fixed size and the measurements are assigned
+in chunks, so the memory does not grow with the number of measurements.
+Several restarts with different seeds can run in a pool of processes and the
+restart that fits the measurements best is kept.
+"""
+
+import numpy as np
+
+#The number of measurements in each mini-batch
+CLUSTER_BATCH_SIZE = 4096
+
+#The number of mini-batches that fit the centers of one restart
+CLUSTER_ITERATIONS = 100
+
+#The default number of restarts with different seeds
+CLUSTER_RESTARTS = 4
+
+#The number of measurements that are assigned to the sets at once
+ASSIGN_CHUNK_SIZE = 65536
+
+
+def seed_centers(vectors, count, rng):
+    """
+    Returns the first centers of the sets.
+
+    The centers are drawn from a sample of the vectors as in k-means++: each
+    further center is drawn with a probability that grows with the axial
+    distance (1 - absolute cosine) to the centers drawn before.
+    """
+    sample = vectors[rng.integers(0, len(vectors),
+                                  min(len(vectors), CLUSTER_BATCH_SIZE))]
+    centers = [sample[rng.integers(0, len(sample))]]
+    #Rounding can make the absolute cosine slightly larger than one
+    distance = np.maximum(1 - np.abs(np.dot(sample, centers[0])), 0)
+    for k in range(1, count):
+        total = np.sum(distance)
+        if total > 0:
+            choice = rng.choice(len(sample), p=distance / total)
+        else:
+            choice = rng.integers(0, len(sample))
+        centers.append(sample[choice])
+        distance = np.minimum(distance, np.maximum(
+                              1 - np.abs(np.dot(sample, centers[-1])), 0))
+    return np.array(centers)
+
+
+def assign_sets(vectors, centers):
+    """
+    Assigns each vector to the set with the most similar center.
+
+    The vectors are processed in chunks of ASSIGN_CHUNK_SIZE. Returns the
+    array of set numbers and the sum of the absolute cosines between the
+    vectors and their centers, which is larger the better the centers fit.
+    """
+    labels = np.empty(len(vectors), dtype=np.intp)
+    score = 0.0
+    for start in range(0, len(vectors), ASSIGN_CHUNK_SIZE):
+        chunk = vectors[start:start + ASSIGN_CHUNK_SIZE]
+        similarity = np.abs(np.dot(chunk, centers.T))
+        chunk_labels = np.argmax(similarity, axis=1)
+        labels[start:start + len(chunk)] = chunk_labels
+        score += np.sum(similarity[np.arange(len(chunk)), chunk_labels])
+    return labels, score
+
+
+def fit_centers(vectors, count, seed, batch_size=CLUSTER_BATCH_SIZE,
+                iterations=CLUSTER_ITERATIONS):
+    """
+    Fits the centers of the sets with mini-batches.
+
+    Each mini-batch is drawn at random from the vectors. Every vector is
+    flipped to the side of its most similar center and added to the sum of
+    that set, and the centers are the normalized sums. A center therefore
+    moves less the more vectors it has collected. Returns the centers and
+    the score of assign_sets.
+    """
+    rng = np.random.default_rng(seed)
+    centers = seed_centers(vectors, count, rng)
+    sums = centers.copy()
+    for k in range(iterations):
+        batch = vectors[rng.integers(0, len(vectors), batch_size)]
+        cosines = np.dot(batch, centers.T)
+        labels = np.argmax(np.abs(cosines), axis=1)
+        signs = np.where(cosines[np.arange(len(batch)), labels] < 0, -1, 1)
+        for axis in range(3):
+            sums[:, axis] += np.bincount(labels,
+                                         weights=batch[:, axis] * signs,
+                                         minlength=count)
+        centers = sums / np.sqrt(np.sum(sums ** 2, axis=1))[:, np.newaxis]
+    return centers, assign_sets(vectors, centers)[1]
+
+
+def cluster_orientations(vectors, count, restarts=CLUSTER_RESTARTS,
+                         seed=None, executor=None,
+                         batch_size=CLUSTER_BATCH_SIZE,
+                         iterations=CLUSTER_ITERATIONS):
+    """
+    Splits unit vectors into a number of sets of similar orientation.
+
+    Expects an array with one row (North, East, Down) per measurement, e.g.
+    from the get_unit_vectors-method of a layer. The centers are fitted
+    restarts times with seeds derived from the seed. The restarts run in the
+    executor if one is passed (e.g. the shared pool of the
+    process_pool-module), otherwise one after the other. The result does not
+    depend on the executor. The sets are numbered by their size, beginning with
+    the largest. Returns the set number of each vector and the centers as an
+    array of unit vectors. Raises a ValueError if there are fewer vectors
+    than sets.
+    """
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+    if count < 1 or len(vectors) < count:
+        raise ValueError("There are fewer measurements than sets.")
+
+    seeds = np.random.SeedSequence(seed).spawn(restarts)
+    arguments = ([vectors] * restarts, [count] * restarts, seeds,
+                 [batch_size] * restarts, [iterations] * restarts)
+    if executor is not None and restarts > 1:
+        results = list(executor.map(fit_centers, *arguments))
+    else:
+        results = list(map(fit_centers, *arguments))
+    centers = max(results, key=lambda result: result[1])[0]
+
+    labels = assign_sets(vectors, centers)[0]
+    order = np.argsort(-np.bincount(labels, minlength=count), kind="stable")
+    ranks = np.empty(count, dtype=np.intp)
+    ranks[order] = np.arange(count)
+    return ranks[labels], centers[order]
@@ -21,20 +21,21 @@ class DataTreeView(Gtk.TreeView):
 
     """
     This class inherits from Gtk.TreeView. It requires a treestore and the
-    main window redraw-function for the init. The class defines a function
-    that truncates the float-numbers and a function to tab through the
-    treeview. All other data-views inherit from this class.
+    main window function that requests a redraw for the init. The class
+    defines a function that truncates the float-numbers and a function to tab
+    through the treeview. All other data-views inherit from this class.
     """
 
-    def __init__(self, store, redraw_plot):
+    def __init__(self, store, request_redraw):
         """
         Initializes the treeview. Requires a model and the main window
-        redraw-function. Sets selection mode to MULTIPLE. Connect the
-        key-pres event.
+        function that requests a redraw. Edits only request a redraw, so
+        tabbing through a row results in a single redraw once Gtk is idle.
+        Sets selection mode to MULTIPLE. Connect the key-pres event.
         """
         Gtk.TreeView.__init__(self, model=store)
         self.store = store
-        self.redraw = redraw_plot
+        self.request_redraw = request_redraw
         self.select = self.get_selection()
         self.select.set_mode(Gtk.SelectionMode.MULTIPLE)
         self.connect("key-press-event", self.on_key_pressed)
@@ -84,15 +85,15 @@ class PlaneDataView(DataTreeView):
     and stratigraphic orientation.
     """
 
-    def __init__(self, store, redraw_plot):
+    def __init__(self, store, request_redraw):
         """
-        Passes store and redraw_plot to the parent DataTreeView-class.
+        Passes store and request_redraw to the parent DataTreeView-class.
         Initializes 3 columns and connects their edited-signals. The columns:
         0: Dip direction (Float)
         1: Dip angle (Float)
         2: Stratigraphy (String)
         """
-        DataTreeView.__init__(self, store, redraw_plot)
+        DataTreeView.__init__(self, store, request_redraw)
 
         renderer_dir = Gtk.CellRendererText()
         renderer_dir.set_property("editable", True)
@@ -134,7 +135,7 @@ class PlaneDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][0] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("dip direction edited")
 
     def renderer_dip_edited(self, widget, path, new_string):
         """
@@ -143,7 +144,7 @@ class PlaneDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][1] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("dip edited")
 
     def renderer_strat_edited(self, widget, path, new_string):
         """
@@ -151,7 +152,7 @@ class PlaneDataView(DataTreeView):
         existing value. The column takes the raw string.
         """
         self.store[path][2] = new_string
-        self.redraw()
+        self.request_redraw("stratigraphy edited")
 
 class FaultPlaneDataView(DataTreeView):
 
@@ -160,7 +161,7 @@ class FaultPlaneDataView(DataTreeView):
     and tab-through function from the DataTreeView class.
     """
 
-    def __init__(self, store, redraw_plot):
+    def __init__(self, store, request_redraw):
         """
         Initializes a new faultplane view. 5 columns are created and their
         respective edited-signals are connected. The columns are:
@@ -170,7 +171,7 @@ class FaultPlaneDataView(DataTreeView):
         3: Lineation dip (Float)
         4: Lineation sense of movement (String)
         """
-        DataTreeView.__init__(self, store, redraw_plot)
+        DataTreeView.__init__(self, store, request_redraw)
 
         renderer_dir = Gtk.CellRendererText()
         renderer_dir.set_property("editable", True)
@@ -236,7 +237,7 @@ class FaultPlaneDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][0] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("dip direction edited")
 
     def renderer_dip_edited(self, widget, path, new_string):
         """
@@ -245,7 +246,7 @@ class FaultPlaneDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][1] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("dip edited")
 
     def renderer_ldir_edited(self, widget, path, new_string):
         """
@@ -254,7 +255,7 @@ class FaultPlaneDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][2] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("lineation dip direction edited")
 
     def renderer_ldip_edited(self, widget, path, new_string):
         """
@@ -263,7 +264,7 @@ class FaultPlaneDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][3] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("lineation dip edited")
 
     def renderer_sense_edited(self, widget, path, new_string):
         """
@@ -271,7 +272,7 @@ class FaultPlaneDataView(DataTreeView):
         The the values is replaced by the raw input-string.
         """
         self.store[path][4] = new_string
-        self.redraw()
+        self.request_redraw("sense edited")
 
 class LineDataView(DataTreeView):
 
@@ -281,7 +282,7 @@ class LineDataView(DataTreeView):
     for dip direction, dip and linear direction sense.
     """
 
-    def __init__(self, store, redraw_plot):
+    def __init__(self, store, request_redraw):
         """
         Initalizes the LineDataView class. Passes 2 arguments to the
         DataTreeView class and creates 3 TreeViewColumns and connects their
@@ -290,7 +291,7 @@ class LineDataView(DataTreeView):
         1: Dip (Float)
         2: Sense of direction/movement (String)
         """
-        DataTreeView.__init__(self, store, redraw_plot)
+        DataTreeView.__init__(self, store, request_redraw)
 
         renderer_dir = Gtk.CellRendererText()
         renderer_dir.set_property("editable", True)
@@ -332,7 +333,7 @@ class LineDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][0] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("dip direction edited")
 
     def renderer_dip_edited(self, widget, path, new_string):
         """
@@ -341,7 +342,7 @@ class LineDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][1] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("dip edited")
 
     def renderer_sense_edited(self, widget, path, new_string):
         """
@@ -349,7 +350,7 @@ class LineDataView(DataTreeView):
         The new values is the raw input-string.
         """
         self.store[path][2] = new_string
-        self.redraw()
+        self.request_redraw("sense edited")
 
 class SmallCircleDataView(DataTreeView):
 
@@ -358,7 +359,7 @@ class SmallCircleDataView(DataTreeView):
     It creates 3 columns for dip direction, dip and opening angle.
     """
 
-    def __init__(self, store, redraw_plot):
+    def __init__(self, store, request_redraw):
         """
         Initalizes the SmallCircleDataView class. Passes 2 arguments to the
         DataTreeView class and creates 3 TreeViewColumns and connects their
@@ -367,7 +368,7 @@ class SmallCircleDataView(DataTreeView):
         1: Dip (Float)
         2: Opening angle (Float)
         """
-        DataTreeView.__init__(self, store, redraw_plot)
+        DataTreeView.__init__(self, store, request_redraw)
 
         renderer_dir = Gtk.CellRendererText()
         renderer_dir.set_property("editable", True)
@@ -413,7 +414,7 @@ class SmallCircleDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][0] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("dip direction edited")
 
     def renderer_dip_edited(self, widget, path, new_string):
         """
@@ -422,7 +423,7 @@ class SmallCircleDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][1] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("dip edited")
 
     def renderer_angle_edited(self, widget, path, new_string):
         """
@@ -431,4 +432,4 @@ class SmallCircleDataView(DataTreeView):
         the string value to a float.
         """
         self.store[path][2] = float(new_string.replace(",", "."))
-        self.redraw()
+        self.request_redraw("opening angle edited")
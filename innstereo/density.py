@@ -0,0 +1,467 @@
+#!/usr/bin/python3
+
+"""
+This module estimates density grids and contains the DensityGridCache-class.
+
+Contouring a layer requires a density grid that is estimated from all the
+measurements of the layer. The density_grid-function is a drop-in
+replacement for the function of the same name in mplstereonet and returns the
+same results for the methods that InnStereo offers. MPLStereonet evaluates the
+kernel for all measurements at one grid node at a time. This module instead
+evaluates it for blocks of grid nodes at once, and only for the pairs of nodes
+and measurements that lie within the radius of the kernel. The contour fills,
+the contour lines and their labels are all drawn from the same grid. The cache
+stores the most recently used grids, so the grid is only estimated once for
+each combination of data and contour settings. The DensityWorker calculates
+grids in background threads. The density of a beta diagram is summed from
+chunks of plane intersections, so the intersections of all pairs are never
+held in memory at once.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import threading
+import numpy as np
+from scipy.spatial import cKDTree
+from mplstereonet import stereonet_math
+
+from .analysis import pairwise_intersections, count_intersections
+
+#Kernel values below exp(-KERNEL_CUTOFF) are left out by the exponential Kamb
+#method. They are smaller than the rounding error of the summed density.
+KERNEL_CUTOFF = 40
+
+#The number of kernel values that are held in memory at once
+CHUNK_ELEMENTS = 2 ** 22
+
+#The most plane pairs of a beta diagram. More pairs are subsampled.
+BETA_MAX_PAIRS = 2 * 10 ** 6
+
+METHODS = ["exponential_kamb", "linear_kamb", "square_kamb", "kamb",
+           "schmidt"]
+
+
+def kamb_radius(n, sigma):
+    """
+    Returns the cosine of the radius of the counting circle of Kamb-methods.
+    """
+    return 1 - sigma ** 2 / (float(n) + sigma ** 2)
+
+
+def kamb_units(n, radius):
+    """
+    Returns the normalization of the Kamb-methods.
+    """
+    return np.sqrt(n * radius * (1 - radius))
+
+
+def kernel_parameters(method, n, sigma):
+    """
+    Returns the support, kernel function and normalization of a method.
+
+    The support is the smallest cosine between a grid node and a measurement
+    for which the kernel is not 0. The kernel function receives an array of
+    cosines that all lie within the support and returns their weights. The
+    kernels are the same as those of mplstereonet.contouring.
+    """
+    if method == "exponential_kamb":
+        f = 2 * (1.0 + n / sigma ** 2)
+        units = np.sqrt(n * (f / 2.0 - 1) / f ** 2)
+        return 1 - KERNEL_CUTOFF / f, lambda c: np.exp(f * (c - 1)), units
+    elif method == "linear_kamb":
+        radius = kamb_radius(n, sigma)
+        f = 2 / (1 - radius)
+        return radius, lambda c: f * (c - radius), kamb_units(n, radius)
+    elif method == "square_kamb":
+        radius = kamb_radius(n, sigma)
+        f = 3 / (1 - radius) ** 2
+        return radius, lambda c: f * (c - radius) ** 2, kamb_units(n, radius)
+    elif method == "kamb":
+        radius = kamb_radius(n, sigma)
+        return radius, np.ones_like, kamb_units(n, radius)
+    elif method == "schmidt":
+        return 0.99, np.ones_like, n * 0.01
+    else:
+        raise ValueError("Unknown contour method: {0}".format(method))
+
+
+def counter_grid(gridsize):
+    """
+    Returns the grid nodes ("counters") as unit vectors.
+
+    The nodes form a regular grid in longitude and latitude, in the same
+    order as in mplstereonet. Returns an array of shape (nodes, 3).
+    """
+    bound = np.pi / 2.0
+    nrows, ncols = gridsize
+    lon, lat = np.mgrid[-bound:bound:ncols * 1j, -bound:bound:nrows * 1j]
+    return np.vstack(stereonet_math.sph2cart(lon.ravel(), lat.ravel())).T
+
+
+def count_dense(counters, points, support, kernel):
+    """
+    Sums the kernel of all points at each counter in dense blocks.
+
+    The cosines between a block of counters and all points are calculated as
+    one matrix product. The size of the blocks is chosen so that no more than
+    CHUNK_ELEMENTS values are held in memory. Returns the sums as an array.
+    """
+    sums = np.zeros(len(counters), dtype=np.float64)
+    step = max(1, CHUNK_ELEMENTS // max(1, len(points)))
+    for start in range(0, len(counters), step):
+        cos_dist = np.abs(np.dot(counters[start:start + step], points.T))
+        inside = cos_dist >= support
+        values = np.zeros(cos_dist.shape, dtype=np.float64)
+        values[inside] = kernel(cos_dist[inside])
+        sums[start:start + step] = values.sum(axis=1)
+    return sums
+
+
+def count_indexed(counters, points, support, kernel):
+    """
+    Sums the kernel of the points near each counter using a KD-tree.
+
+    The points and their antipodes are stored in a KD-tree. The tree first
+    returns the number of points within the support of each counter. For the
+    Kamb- and Schmidt-counts these numbers are already the sums. For the
+    smoothed methods the counters are split into blocks with no more than
+    CHUNK_ELEMENTS pairs and the kernel is evaluated for the pairs of each
+    block. The cost depends on the number of pairs and not on the number of
+    counters times the number of points. Returns the sums as an array.
+    """
+    point_tree = cKDTree(np.vstack((points, -points)))
+    max_distance = np.sqrt(2 * (1 - support))
+    lengths = point_tree.query_ball_point(counters, max_distance,
+                                          return_length=True)
+    if kernel is np.ones_like:
+        return lengths.astype(np.float64)
+
+    sums = np.zeros(len(counters), dtype=np.float64)
+    cumulative = np.cumsum(lengths)
+    start = 0
+    while start < len(counters):
+        done = cumulative[start - 1] if start > 0 else 0
+        end = np.searchsorted(cumulative, done + CHUNK_ELEMENTS, side="right")
+        end = max(end, start + 1)
+        block = counters[start:end]
+        pairs = cKDTree(block).sparse_distance_matrix(point_tree,
+                                        max_distance, output_type="ndarray")
+        cos_dist = 1 - pairs["v"] ** 2 / 2
+        inside = cos_dist >= support
+        sums[start:end] = np.bincount(pairs["i"][inside],
+                                      weights=kernel(cos_dist[inside]),
+                                      minlength=len(block))
+        start = end
+    return sums
+
+
+def count_points(lons, lats, method, sigma, gridsize, use_index=None):
+    """
+    Estimates the density of the points at the nodes of a grid.
+
+    Expects the longitudes and latitudes of the points in radians. The
+    KD-tree is used if the support of the kernel covers only a small part of
+    the hemisphere, which is the case for large datasets. use_index can be set
+    to True or False to choose the way of counting. Returns the longitudes,
+    latitudes and density of the grid nodes as arrays of the gridsize.
+    """
+    lons = np.atleast_1d(np.squeeze(lons))
+    lats = np.atleast_1d(np.squeeze(lats))
+    n = len(lons)
+    support, kernel, units = kernel_parameters(method, n, sigma)
+
+    counters = counter_grid(gridsize)
+    points = np.vstack(stereonet_math.sph2cart(lons, lats)).T
+    if use_index is None:
+        use_index = support > 0.9 and n > 1000
+    if use_index == True and support > 0:
+        sums = count_indexed(counters, points, support, kernel)
+    else:
+        sums = count_dense(counters, points, support, kernel)
+
+    if method == "schmidt":
+        totals = sums / units
+    else:
+        totals = (sums - 0.5) / units
+    totals[totals < 0] = 0
+
+    counter_lon, counter_lat = stereonet_math.cart2sph(*counters.T)
+    for item in [counter_lon, counter_lat, totals]:
+        item.shape = gridsize
+    return counter_lon, counter_lat, totals
+
+
+def count_beta(dipdir, dips, method, sigma, gridsize,
+               max_pairs=BETA_MAX_PAIRS, seed=0):
+    """
+    Estimates the density of the pairwise intersections of planes.
+
+    Expects the dip directions and dips of the planes. The intersections
+    are yielded chunk by chunk by pairwise_intersections, which leaves out
+    pairs of parallel planes. The intersections are counted first with
+    count_intersections, which only needs the dot products of the poles, so
+    the width of the kernel and the normalization both use the number of
+    intersections that are actually summed, as if they had been passed to
+    count_points. Then the kernel is summed at the grid nodes. More than
+    max_pairs pairs are subsampled with a fixed seed, so both steps see the
+    same pairs and the grid is the same each time. Returns the longitudes,
+    latitudes and density of the grid nodes as arrays of the gridsize.
+    """
+    n = count_intersections(dipdir, dips, max_pairs, seed)
+    support, kernel, units = kernel_parameters(method, max(n, 1), sigma)
+    use_index = support > 0.9 and n > 1000
+
+    counters = counter_grid(gridsize)
+    sums = np.zeros(len(counters), dtype=np.float64)
+    for points in pairwise_intersections(dipdir, dips, max_pairs, seed):
+        if len(points) == 0:
+            continue
+        #The grid uses the axes of mplstereonet: (Down, East, North)
+        points = points[:, ::-1]
+        if use_index == True:
+            sums += count_indexed(counters, points, support, kernel)
+        else:
+            sums += count_dense(counters, points, support, kernel)
+
+    if method == "schmidt":
+        totals = sums / units
+    else:
+        totals = (sums - 0.5) / units
+    totals[totals < 0] = 0
+
+    counter_lon, counter_lat = stereonet_math.cart2sph(*counters.T)
+    for item in [counter_lon, counter_lat, totals]:
+        item.shape = gridsize
+    return counter_lon, counter_lat, totals
+
+
+def density_grid(*args, **kwargs):
+    """
+    Estimates the density of measurements on a regular grid.
+
+    Accepts the same arguments as mplstereonet.density_grid: two sequences of
+    measurements and the keywords measurement ("poles", "lines" or
+    "radians"), method, sigma and gridsize. Weights are not supported. The
+    measurement "beta" expects the dip directions and dips of planes and
+    estimates the density of their pairwise intersections (see count_beta).
+    Returns the longitudes, latitudes and density of the grid.
+    """
+    measurement = kwargs.get("measurement", "poles")
+    method = kwargs.get("method", "exponential_kamb")
+    sigma = kwargs.get("sigma", 3)
+    gridsize = kwargs.get("gridsize", 100)
+    use_index = kwargs.get("use_index", None)
+    try:
+        gridsize = int(gridsize)
+        gridsize = (gridsize, gridsize)
+    except TypeError:
+        gridsize = tuple(gridsize)
+
+    if measurement == "beta":
+        lon, lat, z = count_beta(args[0], args[1], method, sigma, gridsize)
+    else:
+        if measurement == "poles":
+            lon, lat = stereonet_math.pole(*args)
+        elif measurement == "lines":
+            lon, lat = stereonet_math.line(*args)
+        elif measurement == "radians":
+            lon, lat = args
+        else:
+            raise ValueError("Unknown measurement: {0}".format(measurement))
+        lon, lat, z = count_points(lon, lat, method, sigma, gridsize,
+                                   use_index)
+
+    if method not in ("schmidt", "kamb"):
+        #Never draw a 0 contour for the smoothed methods (as mplstereonet)
+        z[z == 0] = np.finfo(z.dtype).tiny
+    return lon, lat, z
+
+
+class DensityGridCache(object):
+
+    """
+    Stores recently calculated density grids.
+
+    The grids are looked up by a key that is built from a hash of the data
+    and the measurement type, method, sigma and gridsize. The least recently
+    used grid is dropped when the cache holds more than the maximum number
+    of entries.
+    """
+
+    def __init__(self, max_entries=16):
+        """
+        Initializes an empty cache that holds up to max_entries grids.
+        """
+        self.max_entries = max_entries
+        self.grids = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, dipdir, dips, measurement, method, sigma, gridsize):
+        """
+        Returns the key of a density grid.
+
+        The two data-arrays are hashed with their contents, so equal data
+        in different arrays (e.g. after a redraw) returns the same key.
+        """
+        data_hash = hashlib.sha1()
+        for values in (dipdir, dips):
+            values = np.ascontiguousarray(values, dtype=np.float64)
+            data_hash.update(str(values.shape).encode())
+            data_hash.update(values.tobytes())
+        if np.iterable(gridsize):
+            gridsize = tuple(gridsize)
+        return (data_hash.hexdigest(), measurement, method, float(sigma),
+                gridsize)
+
+    def calculate_grid(self, dipdir, dips, measurement, method, sigma,
+                       gridsize):
+        """
+        Estimates a density grid with the density_grid-function.
+
+        Returns the longitudes, latitudes and the density of the grid as
+        three arrays that can be passed to contour and contourf.
+        """
+        return density_grid(dipdir, dips, measurement=measurement,
+                            method=method, sigma=sigma, gridsize=gridsize)
+
+    def lookup(self, dipdir, dips, measurement, method, sigma, gridsize):
+        """
+        Returns the density grid if it is in the cache, or else None.
+        """
+        key = self.make_key(dipdir, dips, measurement, method, sigma,
+                            gridsize)
+        with self.lock:
+            if key not in self.grids:
+                return None
+            self.hits += 1
+            self.grids.move_to_end(key)
+            return self.grids[key]
+
+    def get_grid(self, dipdir, dips, measurement, method, sigma, gridsize):
+        """
+        Returns the density grid for the data and contour settings.
+
+        The grid is calculated if it is not in the cache yet. The returned
+        arrays are shared between all callers and must not be modified. This
+        method can be called from the threads of the DensityWorker.
+        """
+        grid = self.lookup(dipdir, dips, measurement, method, sigma, gridsize)
+        if grid is not None:
+            return grid
+
+        key = self.make_key(dipdir, dips, measurement, method, sigma,
+                            gridsize)
+        grid = self.calculate_grid(dipdir, dips, measurement, method, sigma,
+                                   gridsize)
+        with self.lock:
+            self.misses += 1
+            self.grids[key] = grid
+            while len(self.grids) > self.max_entries:
+                self.grids.popitem(last=False)
+        return grid
+
+    def clear(self):
+        """
+        Removes all grids from the cache.
+        """
+        with self.lock:
+            self.grids.clear()
+
+
+class DensityWorker(object):
+
+    """
+    Calculates density grids in a pool of threads.
+
+    Each job belongs to an owner (a layer) and is tagged with the version of
+    the owner when it was submitted. A new job of the same owner replaces the
+    old one, whose result is then discarded. When a grid is ready, the
+    callback is handed to the post function (GLib.idle_add in the main
+    window), so it runs in the main thread. Errors of the estimation are
+    handed to the error function in the same way. The heavy parts of the
+    density estimation run in NumPy and SciPy, which release the GIL.
+    """
+
+    def __init__(self, cache, post_function, max_workers=2,
+                 error_function=None):
+        """
+        Initializes the thread pool.
+
+        Expects the DensityGridCache that stores the finished grids and the
+        function that runs a callback in the main thread. The error function
+        receives the owner and the exception of a job that failed, e.g. to
+        show it in the statusbar.
+        """
+        self.cache = cache
+        self.post_function = post_function
+        self.error_function = error_function
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.jobs = {}
+
+    def submit(self, owner, version, grid_args, callback):
+        """
+        Starts calculating a grid for the owner.
+
+        The grid_args are passed to the DensityGridCache get_grid-method.
+        The data arrays are copied, because the owner can change them while
+        the grid is calculated. A job of the same owner that has not started
+        yet is cancelled. Once the grid is ready the callback receives the
+        owner, the version and the grid.
+        """
+        self.cancel(owner)
+        dipdir, dips = np.array(grid_args[0]), np.array(grid_args[1])
+        future = self.executor.submit(self.cache.get_grid, dipdir, dips,
+                                      *grid_args[2:])
+        self.jobs[owner] = (version, future)
+        future.add_done_callback(
+            lambda done: self.post_function(self.on_job_done, owner, version,
+                                            done, callback))
+
+    def on_job_done(self, owner, version, future, callback):
+        """
+        Hands a finished grid to the callback. Runs in the main thread.
+
+        The grid is discarded if the job was replaced by a newer one or was
+        cancelled. The exception of a failed job is handed to the error
+        function. Returns False so the idle-source is removed.
+        """
+        job = self.jobs.get(owner)
+        if job is None or job[1] is not future:
+            return False
+        del self.jobs[owner]
+        if future.cancelled():
+            return False
+        if future.exception() is not None:
+            if self.error_function is not None:
+                self.error_function(owner, future.exception())
+            return False
+        callback(owner, version, future.result())
+        return False
+
+    def is_pending(self, owner):
+        """
+        Returns True if a grid is being calculated for the owner.
+        """
+        return owner in self.jobs
+
+    def cancel(self, owner):
+        """
+        Discards the job of the owner.
+
+        A job that has not started yet is cancelled. The result of a running
+        job is ignored when it finishes.
+        """
+        job = self.jobs.pop(owner, None)
+        if job is not None:
+            job[1].cancel()
+
+    def shutdown(self):
+        """
+        Discards all jobs and stops the threads.
+        """
+        for owner in list(self.jobs):
+            self.cancel(owner)
+        self.executor.shutdown(wait=False)
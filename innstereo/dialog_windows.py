@@ -146,7 +146,7 @@ class StereonetProperties(object):
     connects all the signals defined in the that file.
     """
 
-    def __init__(self, settings, redraw_function):
+    def __init__(self, settings, request_redraw):
         """
         Initializes the plot-properties dialog.        
 
@@ -180,7 +180,7 @@ class StereonetProperties(object):
         self.checkbutton_cross = \
                     self.builder.get_object("checkbutton_cross")
         
-        self.redraw = redraw_function
+        self.request_redraw = request_redraw
         self.changes = []
         self.settings = settings
         self.adjustment_pixel_density.\
@@ -220,12 +220,12 @@ class StereonetProperties(object):
 
         Triggered when "Apply" is clicked in the "properties"-dialog. This
         means that the list of changes is applied one by one. Then the dialog
-        is hidden and triggers a redraw of the plot.
+        is hidden and requests a redraw of the plot on a new canvas.
         """
         for change in self.changes:
             change()
         self.spd.hide()
-        self.redraw(checkout_canvas = True)
+        self.request_redraw("plot settings applied", checkout_canvas = True)
 
     def on_radiobutton_schmidt_toggled(self, button):
         # pylint: disable=unused-argument
@@ -426,3 +426,425 @@ class FileChooserParse(object):
         Triggered when "cancel" is clicked. Hides the dialog.
         """
         self.dialog.hide()
+
+
+class FileChooserBatchImport(object):
+
+    """
+    Sets up and handles all the signals of the FileChooser for batch imports.
+
+    This class handles the actions of the filechooserdialog that selects the
+    folder whose files are imported into a new layer group. Below the folder
+    the dialog offers a glob-pattern for the files, the column by which the
+    rows are grouped into layers and whether the column mapping is saved in
+    the folder.
+    """
+
+    def __init__(self, run_batch_import):
+        self.builder = Gtk.Builder()
+        script_dir = os.path.dirname(__file__)
+        rel_path = "gui_layout.glade"
+        abs_path = os.path.join(script_dir, rel_path)
+        self.builder.add_objects_from_file(abs_path,
+            ("filechooserdialog_batch_import",
+             "adjustment_batch_group_column"))
+        self.dialog = self.builder.get_object("filechooserdialog_batch_import")
+        self.entry_pattern = self.builder.get_object("entry_batch_pattern")
+        self.adjustment_group_column = \
+                    self.builder.get_object("adjustment_batch_group_column")
+        self.checkbutton_save_mapping = \
+                    self.builder.get_object("checkbutton_batch_save_mapping")
+        self.run_batch_import = run_batch_import
+        self.builder.connect_signals(self)
+
+    def run(self):
+        """
+        Runs the dialog.
+
+        This function is run when the batch import is called from the main
+        window. It runs the dialog.
+        """
+        self.dialog.run()
+
+    def on_filechooserdialog_batch_import_destroy(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        This function is run when the filechooserdialog is destroyed. Hides
+        the dialog.
+        """
+        self.dialog.hide()
+
+    def on_filechooserdialog_batch_import_close(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when the filechooserdialog is closed. Hides the dialog.
+        """
+        self.dialog.hide()
+
+    def on_filechooserdialog_batch_import_response(self, widget, response):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when the filechooserdialog sends a response.
+        """
+        if response == -4:
+            self.dialog.hide()
+
+    def on_button_open_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Passes the chosen folder and options back to the MainWindow-class.
+
+        Triggered when "import" is clicked. The pattern is stripped and the
+        group column is -1 if the rows are not grouped.
+        """
+        directory = self.dialog.get_filename()
+        pattern = self.entry_pattern.get_text().strip()
+        group_column = int(self.adjustment_group_column.get_value())
+        save_mapping = self.checkbutton_save_mapping.get_active()
+        self.dialog.hide()
+        self.run_batch_import(directory, pattern, group_column, save_mapping)
+
+    def on_button_cancel_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when "cancel" is clicked. Hides the dialog.
+        """
+        self.dialog.hide()
+
+
+class FileChooserProject(object):
+
+    """
+    Sets up and handles all the signals of the FileChoosers for projects.
+
+    The same class handles the filechooserdialog that opens projects and the
+    one that saves them. The name of the dialog in the Glade file and the
+    function that receives the chosen file are passed by the main window.
+    """
+
+    def __init__(self, dialog_name, run_project_action):
+        self.builder = Gtk.Builder()
+        script_dir = os.path.dirname(__file__)
+        rel_path = "gui_layout.glade"
+        abs_path = os.path.join(script_dir, rel_path)
+        self.builder.add_objects_from_file(abs_path,
+            (dialog_name, "filefilter_project"))
+        self.dialog = self.builder.get_object(dialog_name)
+        self.filefilters = self.builder.get_object("filefilter_project")
+        self.filefilters.set_name("InnStereo Projects")
+        self.run_project_action = run_project_action
+        self.builder.connect_signals(self)
+
+    def run(self):
+        """
+        Runs the dialog.
+
+        This function is run when a project is opened or saved from the
+        main window. It runs the dialog.
+        """
+        self.dialog.run()
+
+    def on_filechooserdialog_project_destroy(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        This function is run when the filechooserdialog is destroyed. Hides
+        the dialog.
+        """
+        self.dialog.hide()
+
+    def on_filechooserdialog_project_close(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when the filechooserdialog is closed. Hides the dialog.
+        """
+        self.dialog.hide()
+
+    def on_filechooserdialog_project_response(self, widget, response):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when the filechooserdialog sends a response.
+        """
+        if response == -4:
+            self.dialog.hide()
+
+    def on_button_project_accept_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Passes the chosen file back to the MainWindow-class.
+
+        Triggered when "open" or "save" is clicked.
+        """
+        project_file = self.dialog.get_filename()
+        self.dialog.hide()
+        if project_file is not None:
+            self.run_project_action(project_file)
+
+    def on_button_project_cancel_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when "cancel" is clicked. Hides the dialog.
+        """
+        self.dialog.hide()
+
+
+class FileChooserArrays(object):
+
+    """
+    Sets up and handles all the signals of the FileChooser for array files.
+
+    This class handles the actions of the filechooserdialog that selects
+    binary array files (.npy or raw float64) for the import into a new layer.
+    """
+
+    def __init__(self, run_array_import):
+        self.builder = Gtk.Builder()
+        script_dir = os.path.dirname(__file__)
+        rel_path = "gui_layout.glade"
+        abs_path = os.path.join(script_dir, rel_path)
+        self.builder.add_objects_from_file(abs_path,
+            ("filechooserdialog_import_arrays", "filefilter_arrays"))
+        self.dialog = self.builder.get_object("filechooserdialog_import_arrays")
+        self.filefilters = self.builder.get_object("filefilter_arrays")
+        self.filefilters.set_name("Array Files")
+        self.dialog.add_filter(self.filefilters)
+        self.run_array_import = run_array_import
+        self.builder.connect_signals(self)
+
+    def run(self):
+        """
+        Runs the dialog.
+
+        This function is run when the array import is called from the main
+        window. It runs the dialog.
+        """
+        self.dialog.run()
+
+    def on_filechooserdialog_import_arrays_destroy(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        This function is run when the filechooserdialog is destroyed. Hides
+        the dialog.
+        """
+        self.dialog.hide()
+
+    def on_filechooserdialog_import_arrays_close(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when the filechooserdialog is closed. Hides the dialog.
+        """
+        self.dialog.hide()
+
+    def on_filechooserdialog_import_arrays_response(self, widget, response):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when the filechooserdialog sends a response.
+        """
+        if response == -4:
+            self.dialog.hide()
+
+    def on_button_open_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Passes the chosen file back to the MainWindow-class.
+
+        Triggered when "open" is clicked.
+        """
+        array_file = self.dialog.get_filename()
+        self.dialog.hide()
+        self.run_array_import(array_file)
+
+    def on_button_cancel_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when "cancel" is clicked. Hides the dialog.
+        """
+        self.dialog.hide()
+
+
+class ClusterDialog(object):
+
+    """
+    Sets up and handles the signals of the dialog that splits a layer into
+    sets.
+
+    The dialog asks for the number of sets and the number of restarts of the
+    clustering. When "Apply" is clicked, both are passed back to the
+    MainWindow-class.
+    """
+
+    def __init__(self, run_clustering):
+        """
+        Initializes the dialog.
+
+        Expects the function of the MainWindow that splits the selected
+        layer. It receives the number of sets and restarts.
+        """
+        self.builder = Gtk.Builder()
+        script_dir = os.path.dirname(__file__)
+        rel_path = "gui_layout.glade"
+        abs_path = os.path.join(script_dir, rel_path)
+        self.builder.add_objects_from_file(abs_path,
+            ("dialog_cluster", "adjustment_cluster_sets",
+             "adjustment_cluster_restarts"))
+        self.dialog = self.builder.get_object("dialog_cluster")
+        self.adjustment_sets = \
+                    self.builder.get_object("adjustment_cluster_sets")
+        self.adjustment_restarts = \
+                    self.builder.get_object("adjustment_cluster_restarts")
+        self.run_clustering = run_clustering
+        self.builder.connect_signals(self)
+
+    def run(self):
+        """
+        Runs the dialog.
+
+        This function is run when the toolbutton of the main window is
+        clicked.
+        """
+        self.dialog.run()
+
+    def on_dialog_cluster_close(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when the dialog is closed.
+        """
+        self.dialog.hide()
+
+    def on_dialog_cluster_response(self, widget, response):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when the dialog sends a response.
+        """
+        self.dialog.hide()
+
+    def on_button_cluster_cancel_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when "Cancel" is clicked.
+        """
+        self.dialog.hide()
+
+    def on_button_cluster_apply_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Passes the number of sets and restarts back to the MainWindow-class.
+
+        Triggered when "Apply" is clicked. Hides the dialog first, because
+        splitting a large layer can take a moment.
+        """
+        sets = int(self.adjustment_sets.get_value())
+        restarts = int(self.adjustment_restarts.get_value())
+        self.dialog.hide()
+        self.run_clustering(sets, restarts)
+
+
+class BetaDialog(object):
+
+    """
+    Sets up and handles the signals of the dialog of the beta diagram.
+
+    The dialog asks whether the intersections are only contoured or added
+    as a linear layer, and for the largest number of intersections of the
+    linear layer. When "Apply" is clicked, both are passed back to the
+    MainWindow-class.
+    """
+
+    def __init__(self, run_beta_diagram):
+        """
+        Initializes the dialog.
+
+        Expects the function of the MainWindow that creates the beta
+        diagram. It receives True if a linear layer should be added, and the
+        largest number of intersections.
+        """
+        self.builder = Gtk.Builder()
+        script_dir = os.path.dirname(__file__)
+        rel_path = "gui_layout.glade"
+        abs_path = os.path.join(script_dir, rel_path)
+        self.builder.add_objects_from_file(abs_path,
+            ("dialog_beta", "adjustment_beta_max_pairs"))
+        self.dialog = self.builder.get_object("dialog_beta")
+        self.radiobutton_lines = \
+                    self.builder.get_object("radiobutton_beta_lines")
+        self.adjustment_max_pairs = \
+                    self.builder.get_object("adjustment_beta_max_pairs")
+        self.run_beta_diagram = run_beta_diagram
+        self.builder.connect_signals(self)
+
+    def run(self):
+        """
+        Runs the dialog.
+
+        This function is run when the toolbutton of the main window is
+        clicked.
+        """
+        self.dialog.run()
+
+    def on_dialog_beta_close(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when the dialog is closed.
+        """
+        self.dialog.hide()
+
+    def on_dialog_beta_response(self, widget, response):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when the dialog sends a response.
+        """
+        self.dialog.hide()
+
+    def on_button_beta_cancel_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Hides the dialog.
+
+        Triggered when "Cancel" is clicked.
+        """
+        self.dialog.hide()
+
+    def on_button_beta_apply_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Passes the chosen output back to the MainWindow-class.
+
+        Triggered when "Apply" is clicked. Hides the dialog first.
+        """
+        as_lines = self.radiobutton_lines.get_active()
+        max_pairs = int(self.adjustment_max_pairs.get_value())
+        self.dialog.hide()
+        self.run_beta_diagram(as_lines, max_pairs)
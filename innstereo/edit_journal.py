@@ -0,0 +1,340 @@
+#!/usr/bin/python3
+
+"""
+This module contains the EditJournal-class that records edits of a project.
+
+Saving a project rewrites the whole project file, which takes a while for
+large projects. Instead, every edit (new layers, changed rows or styles and
+changes of the layer tree) is appended to a journal file next to the project
+file as one line of JSON. The lines are written by a background thread, so
+the GUI does not wait for the disk, and the amount written is proportional to
+the edit. The journal is compacted into the project file from time to time,
+also by the background thread. After a crash the project file is opened and
+the journal is replayed on top of it. Projects that were never saved record
+their edits in a recovery project in the recovery directory instead.
+"""
+
+import json
+import os
+import queue
+import threading
+import uuid
+import numpy as np
+
+from .project_file import PROJECT_EXTENSION
+
+#The extension that is added to the project file name for the journal
+JOURNAL_EXTENSION = ".journal"
+
+#Journals that are larger than this (in bytes) are compacted
+COMPACT_JOURNAL_SIZE = 2 ** 24
+
+#The prefix of the names of recovery projects
+RECOVERY_PREFIX = "untitled-"
+
+
+def journal_path(project_file):
+    """
+    Returns the path of the journal of a project file.
+    """
+    return project_file + JOURNAL_EXTENSION
+
+
+def encode_value(value):
+    """
+    Converts NumPy-values in an entry into values that JSON can store.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    elif isinstance(value, np.generic):
+        return value.item()
+    raise TypeError("Can not store {0} in the journal.".format(type(value)))
+
+
+def recovery_directory():
+    """
+    Returns the directory of the recovery projects and creates it if needed.
+
+    A project that was never saved has no file that its journal belongs to,
+    so its journal belongs to a recovery project in this directory.
+    """
+    directory = os.path.join(os.path.expanduser("~"), ".innstereo",
+                             "recovery")
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def new_recovery_path(directory):
+    """
+    Returns a new path for a recovery project of this process.
+
+    The name holds the process id, so the recovery projects of running
+    programs can be told apart from those of programs that crashed.
+    """
+    return os.path.join(directory, "{0}{1}-{2}{3}".format(RECOVERY_PREFIX,
+                        os.getpid(), uuid.uuid4().hex[:8], PROJECT_EXTENSION))
+
+
+def process_running(pid):
+    """
+    Returns True if a process with the given id is running.
+
+    Other processes can only be checked on POSIX-systems. Elsewhere only the
+    own process counts as running.
+    """
+    if pid == os.getpid():
+        return True
+    if os.name != "posix":
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def find_recovery_projects(directory):
+    """
+    Returns the recovery projects that were left behind by a crash.
+
+    A recovery project can consist of a project file, a journal or both.
+    Recovery projects of running processes are left out. Returns the paths
+    of the project files (which might not exist), newest first.
+    """
+    found = {}
+    for name in os.listdir(directory):
+        project_name = name
+        if name.endswith(JOURNAL_EXTENSION):
+            project_name = name[:-len(JOURNAL_EXTENSION)]
+        if not project_name.startswith(RECOVERY_PREFIX) or \
+                not project_name.endswith(PROJECT_EXTENSION):
+            continue
+        try:
+            pid = int(project_name[len(RECOVERY_PREFIX):].split("-")[0])
+        except ValueError:
+            continue
+        if process_running(pid) == True:
+            continue
+        project_file = os.path.join(directory, project_name)
+        modified = os.path.getmtime(os.path.join(directory, name))
+        found[project_file] = max(found.get(project_file, 0), modified)
+    return sorted(found, key=lambda path: found[path], reverse=True)
+
+
+def claim_recovery_project(project_file, directory):
+    """
+    Moves a recovery project to a new path of this process.
+
+    The project is then no longer found by find_recovery_projects. Returns
+    the new path of the project file.
+    """
+    new_path = new_recovery_path(directory)
+    for old, new in ((project_file, new_path),
+                     (journal_path(project_file), journal_path(new_path))):
+        if os.path.exists(old):
+            os.replace(old, new)
+    return new_path
+
+
+def remove_recovery_project(project_file):
+    """
+    Deletes the project file and the journal of a recovery project.
+    """
+    for path in (project_file, journal_path(project_file)):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def replay_entries(entries, layers, new_layer):
+    """
+    Repeats the edits of a journal on the layers they belong to.
+
+    Expects a dictionary of the layers by their id and a function that
+    returns a new layer of a layer-type. Layers that were created in the
+    journal are added to the dictionary. The entries of the layer tree do
+    not refer to layers by their position, so only the last one is needed.
+    Returns the nodes of that layer tree, or None if none was recorded.
+    """
+    tree = None
+    for entry in entries:
+        if entry["op"] == "create":
+            layer_obj = new_layer(entry["layer_type"])
+            layer_obj.layer_id = entry["layer"]
+            layers[layer_obj.layer_id] = layer_obj
+        elif entry["op"] == "tree":
+            tree = entry["layers"]
+        elif entry.get("layer") in layers:
+            layers[entry["layer"]].apply_journal_entry(entry)
+    return tree
+
+
+def read_journal(path):
+    """
+    Returns the list of entries of a journal file.
+
+    Reading stops at the first line that is not complete, which is the last
+    line if the program crashed while it was written. A missing journal has
+    no entries.
+    """
+    entries = []
+    if not os.path.exists(path):
+        return entries
+    with open(path, "r", encoding="utf-8") as journal_file:
+        for line in journal_file:
+            if not line.endswith("\n"):
+                break
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+    return entries
+
+
+class EditJournal(object):
+
+    """
+    Appends the edits of a project to a journal file in a background thread.
+
+    The record-method only puts the entry into a queue. The thread converts
+    the entries to JSON, appends them to the file and syncs the file to the
+    disk once the queue is empty. The thread also compacts the journal into
+    the project file, so the GUI never waits for the project to be written.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the journal file for appending and starts the writer thread.
+        """
+        self.path = path
+        self.queue = queue.Queue()
+        self.entry_count = 0
+        self.compact_error = None
+        self.journal_file = open(path, "a", encoding="utf-8")
+        self.thread = threading.Thread(target=self.write_entries, daemon=True)
+        self.thread.start()
+
+    def record(self, entry):
+        """
+        Appends an entry to the journal.
+
+        The entry is a dictionary with an "op" key that names the edit. It
+        is written in the background and must not be changed afterwards.
+        """
+        self.entry_count += 1
+        self.queue.put(entry)
+
+    def write_entries(self):
+        """
+        Writes the entries of the queue until None is received.
+
+        Runs in the writer thread.
+        """
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                self.queue.task_done()
+                break
+            if isinstance(entry, tuple):
+                self.write_project(entry[1])
+            elif entry == "truncate":
+                self.truncate()
+            else:
+                self.journal_file.write(json.dumps(entry,
+                                                   default=encode_value))
+                self.journal_file.write("\n")
+            if self.queue.empty():
+                self.journal_file.flush()
+                os.fsync(self.journal_file.fileno())
+            self.queue.task_done()
+
+    def truncate(self):
+        """
+        Empties the journal file. Runs in the writer thread.
+        """
+        self.journal_file.seek(0)
+        self.journal_file.truncate()
+
+    def write_project(self, save_function):
+        """
+        Saves the project and empties the journal. Runs in the writer thread.
+
+        If the project can not be written, the journal is kept and the error
+        is stored, so it can be reported by get_compact_error.
+        """
+        try:
+            save_function()
+        except (OSError, ValueError) as error:
+            self.compact_error = error
+            return
+        self.compact_error = None
+        self.truncate()
+
+    def compact(self, save_function):
+        """
+        Compacts the journal into the project file in the writer thread.
+
+        The save_function writes the project file. It runs after the entries
+        that were recorded before, so it has to save a snapshot of the
+        project that was taken now (see DataColumns.snapshot). The journal is
+        emptied once the project is written. Entries that are recorded
+        meanwhile are written after that.
+        """
+        self.queue.put(("compact", save_function))
+        self.entry_count = 0
+
+    def get_compact_error(self):
+        """
+        Returns the error of the last compaction, or None if it succeeded.
+        """
+        return self.compact_error
+
+    def flush(self):
+        """
+        Waits until all recorded entries are written.
+        """
+        self.queue.join()
+
+    def get_entry_count(self):
+        """
+        Returns the number of entries that were recorded since the last reset.
+        """
+        return self.entry_count
+
+    def get_size(self):
+        """
+        Returns the size of the journal file in bytes.
+
+        Entries that are still in the queue are not counted.
+        """
+        return os.path.getsize(self.path)
+
+    def reset(self):
+        """
+        Empties the journal. Is called after it was compacted.
+
+        The file is truncated by the writer thread, after the entries that
+        were recorded before the reset.
+        """
+        self.queue.put("truncate")
+        self.flush()
+        self.entry_count = 0
+
+    def close(self):
+        """
+        Writes the remaining entries, stops the thread and closes the file.
+        """
+        if self.journal_file.closed:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.journal_file.close()
+
+    def remove(self):
+        """
+        Closes the journal and deletes its file.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
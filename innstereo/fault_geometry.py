@@ -0,0 +1,151 @@
+#!/usr/bin/python3
+
+"""
+This module contains the array-functions that prepare faultplane data.
+
+A faultplane-layer stores the dip direction and dip of each plane, the dip
+direction and dip of its lineation and the sense of movement. Before the
+faults can be plotted, the strikes, the sense-corrected lineations and the
+planes that connect each lineation with the pole of its faultplane are
+calculated, as well as the Hoeppener-arrows. The functions in this module
+calculate these values for all faults at once with NumPy-arrays.
+"""
+
+import numpy as np
+from mplstereonet import stereonet_math
+
+
+def plunge_bearing_to_vectors(plunge, bearing):
+    """
+    Converts plunges and bearings of linear elements into unit vectors.
+
+    Expects two arrays in degrees. Returns an array of shape (N, 3) in the
+    cartesian coordinates that mplstereonet uses for its projections.
+    """
+    lon, lat = stereonet_math.line(plunge, bearing)
+    x, y, z = stereonet_math.sph2cart(lon, lat)
+    return np.column_stack((x, y, z))
+
+
+def vectors_to_planes(vectors):
+    """
+    Converts poles given as vectors into the strike and dip of their planes.
+
+    Expects an array of shape (N, 3). The vectors do not have to be of unit
+    length. Returns two arrays with the strikes and dips (right-hand rule).
+    """
+    vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+    lon, lat = stereonet_math.cart2sph(vectors[:, 0], vectors[:, 1],
+                                       vectors[:, 2])
+    return stereonet_math.geographic2pole(lon, lat)
+
+
+def fault_strikes(plane_dir):
+    """
+    Returns the strikes (right-hand rule) of the faultplanes.
+    """
+    return np.asarray(plane_dir, dtype=np.float64) - 90
+
+
+def lineation_pole_planes(plane_dir, plane_dip, line_dir, line_dip):
+    """
+    Returns the planes that contain the lineation and the pole of each fault.
+
+    The pole of such a plane is perpendicular to both the lineation and the
+    pole of the faultplane, so it is their cross product. This is equal to
+    fitting a girdle through the two lines, which the plot did for each fault
+    with mplstereonet.fit_girdle before. Returns the strikes and dips of the
+    planes as two arrays.
+    """
+    plane_dir = np.asarray(plane_dir, dtype=np.float64)
+    plane_dip = np.asarray(plane_dip, dtype=np.float64)
+    lineations = plunge_bearing_to_vectors(line_dip, line_dir)
+    poles = plunge_bearing_to_vectors(90 - plane_dip, plane_dir + 180)
+    normals = np.cross(lineations, poles)
+    return vectors_to_planes(normals)
+
+
+def sense_lineations(line_dir, line_dip, sense):
+    """
+    Returns the lineations of all faults with a sense of "up" or "dn".
+
+    The lineations of faults with an "up"-sense are turned around, so they
+    point in the direction of movement of the hanging wall. Faults with any
+    other sense are left out. Returns the dip directions and dips as two
+    arrays.
+    """
+    line_dir = np.asarray(line_dir, dtype=np.float64)
+    line_dip = np.asarray(line_dip, dtype=np.float64)
+    sense = np.asarray(sense, dtype=object)
+    up = (sense == "up")
+    dn = (sense == "dn")
+    selected = up | dn
+    line_sense_dir = np.where(up, line_dir + 180, line_dir)[selected]
+    line_sense_dip = np.where(up, 90 - line_dip, line_dip)[selected]
+    return line_sense_dir, line_sense_dip
+
+
+def hoeppener_arrows(plane_dir, plane_dip, line_dir, line_dip, sense,
+                     half_length=3.6):
+    """
+    Calculates the start and end points of the Hoeppener-arrows of all faults.
+
+    Each arrow lies on the plane that connects the lineation with the pole of
+    the faultplane and is centered on the pole. The points are calculated
+    directly on the sphere: The arrow is the arc of the given half-length
+    (in degrees) to either side of the pole. If one end of the arc would
+    cross the edge of the stereonet, the arc is moved along the plane until
+    that end lies on the edge. The arrow points in the direction of movement
+    of the hanging wall:
+    -------------
+    "up" (overthrust) Arrow points away from the lineation.
+    "dn" (downthrust) Arrow points towards the lineation.
+    "sin" (sinistral strike-slip) Arrow points in the strike direction.
+    "dex" (dextral strike-slip) Arrow points against the strike direction.
+    Faults with an unknown sense ("uk" or any other text) get a line without
+    arrowhead. Faults with no sense ("") and faults where the lineation is
+    parallel to the pole are left out.
+    Returns the longitudes and latitudes of the start and end points and a
+    boolean array that is True for arrows that need an arrowhead.
+    """
+    plane_dir = np.asarray(plane_dir, dtype=np.float64)
+    plane_dip = np.asarray(plane_dip, dtype=np.float64)
+    sense = np.asarray(sense, dtype=object)
+    poles = plunge_bearing_to_vectors(90 - plane_dip, plane_dir + 180)
+    lineations = plunge_bearing_to_vectors(line_dip, line_dir)
+
+    #Tangent of the lineation-pole plane at the pole, pointing to the lineation
+    tangents = lineations - np.sum(lineations * poles, axis=1)[:, None] * poles
+    norm = np.linalg.norm(tangents, axis=1)
+    valid = (norm > 1e-9) & (sense != "")
+    norm[norm <= 1e-9] = 1
+    tangents = tangents / norm[:, None]
+
+    #Flip the tangent so it points in the direction of movement
+    strikes = plunge_bearing_to_vectors(np.zeros(len(plane_dir)),
+                                        plane_dir - 90)
+    along_strike = np.sign(np.sum(tangents * strikes, axis=1))
+    along_strike[along_strike == 0] = 1
+    flip = np.ones(len(plane_dir))
+    flip[sense == "up"] = -1
+    flip[sense == "sin"] = along_strike[sense == "sin"]
+    flip[sense == "dex"] = -along_strike[sense == "dex"]
+    tangents = tangents * flip[:, None]
+
+    #Points of the plane are pole * cos(t) + tangent * sin(t). The visible
+    #(lower) hemisphere has x >= 0, which is the half circle where t lies
+    #within 90 degrees of phi.
+    half = np.radians(half_length)
+    phi = np.arctan2(tangents[:, 0], poles[:, 0])
+    center = np.clip(0, phi - np.pi / 2 + half, phi + np.pi / 2 - half)
+
+    def arc_point(t):
+        point = poles * np.cos(t)[:, None] + tangents * np.sin(t)[:, None]
+        point[:, 0] = np.maximum(point[:, 0], 0)
+        return stereonet_math.cart2sph(point[:, 0], point[:, 1], point[:, 2])
+
+    lon_start, lat_start = arc_point(center - half)
+    lon_end, lat_end = arc_point(center + half)
+    heads = np.isin(sense, ["up", "dn", "sin", "dex"])
+    return lon_start[valid], lat_start[valid], lon_end[valid], \
+           lat_end[valid], heads[valid]
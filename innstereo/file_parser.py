@@ -4,13 +4,24 @@
 This module contains the FileParseDialog-class.
 
 The file-parse dialog is controlled by the FileParseDialog-class. The class
-loads the GUI from the glade file and connects all the GUI signals.
+loads the GUI from the glade file and connects all the GUI signals. The file
+is read through a LineOffsetIndex, so the preview only loads a window of
+rows and large files can be previewed without delay. The layout of the file
+(delimiter, header lines, decimal separator) is detected by sniffing its
+first lines, and the columns that hold the measurements are selected in
+advance.
 """
 
 from gi.repository import Gtk
-import re
 import os
 
+from .text_import import LineOffsetIndex, read_column_arrays
+from .text_sniffer import sniff_dialect, SNIFF_LINES
+from .batch_import import ColumnMapping, TFPL_CODES
+
+#The number of rows that the preview shows
+PREVIEW_ROWS = 500
+
 
 class FileParseDialog(object):
 
@@ -23,17 +34,20 @@ class FileParseDialog(object):
     defined in Glade and are connected to this class.
     """
 
-    def __init__(self, text_file, layer_obj, redraw_plot,
-                 append_plane, append_line, append_faultplane):
+    def __init__(self, text_file, layer_obj, request_redraw, show_message):
         """
         Initializes the file parser dialog and connects the signals.
 
-        The GUI-layout is loaded from the project Glade file. The functions
-        that the dialog needs to import the data and refresh the plot are
-        assigned. Then the treestore and treeview are set up. A few buttons
-        are hidden, depending on the layer that was chosen for the import. Then
-        the signals are connected and the dialog does the first parsing of the
-        file.
+        The GUI-layout is loaded from the project Glade file. The function
+        that requests a redraw of the plot and the function that shows a
+        message in the statusbar of the main window are assigned. Then the treestore
+        and treeview are set up. A few buttons are hidden, depending on the
+        layer that was chosen for the import. Then the signals are connected
+        and the dialog does the first parsing of the file. The file is
+        scanned once for the offsets of its lines and stays open until the
+        dialog is hidden. The first lines are sniffed for the layout of the
+        file, which sets the start line and the columns before the first
+        parsing.
         """
         self.builder = Gtk.Builder()
         script_dir = os.path.dirname(__file__)
@@ -42,19 +56,21 @@ class FileParseDialog(object):
         self.builder.add_objects_from_file(abs_path,
             ("file_parse_dialog", "liststore_assign_columns",
              "adjustment_parse_start_line"))
-        self.tfpl_dic = {"0": "ukn", "1": "up", "2": "dn", "3": "dex",
-                         "4": "sin"}
-        self.redraw_plot = redraw_plot
+        self.tfpl_dic = TFPL_CODES
+        self.request_redraw = request_redraw
+        self.show_message = show_message
         self.layer_obj = layer_obj
-        self.append_plane = append_plane
-        self.append_line = append_plane
-        self.append_faultplane = append_faultplane
         self.file = text_file
+        self.index = LineOffsetIndex(text_file)
+        self.dialect = sniff_dialect(self.index.read_lines(0, SNIFF_LINES))
+        self.start_line = self.dialect.header_lines
+        self.column_mapping = None
         self.load_gui_elements()
         self.create_treeview()
         self.hide_buttons()
+        self.select_suggested_columns()
         self.builder.connect_signals(self)
-        self.parse_file()
+        self.parse_file(self.start_line)
 
     def load_gui_elements(self):
         """
@@ -77,6 +93,55 @@ class FileParseDialog(object):
         self.scr_win = self.builder.get_object("scrolledwindow_file_parser")
         self.grid_planes = self.builder.get_object("grid_planes")
         self.grid_linears = self.builder.get_object("grid_linears")
+        self.adjustment_start_line = self.builder.\
+                                get_object("adjustment_parse_start_line")
+        self.adjustment_start_line.set_upper(
+                                max(0, self.index.get_line_count() - 1))
+        self.adjustment_start_line.set_value(self.start_line)
+        self.checkbutton_tectonicsfpl = \
+                            self.builder.get_object("checkbutton_tectonicsfpl")
+
+    def select_suggested_columns(self):
+        """
+        Selects the columns that the sniffer guessed in the comboboxes.
+
+        The columns are taken from the get_layer_columns-method of the
+        dialect, in the same order as in the apply handler. If the sense
+        column holds numbers, the TectonicsFP-checkbutton is activated.
+        """
+        layer_type = self.layer_obj.get_layer_type()
+        float_columns, text_column, use_tfpl = \
+                                self.dialect.get_layer_columns(layer_type)
+        if layer_type == "plane":
+            comboboxes = [self.combobox_plane_dipdir, self.combobox_plane_dip,
+                          self.combobox_strat]
+        elif layer_type == "line":
+            comboboxes = [self.combobox_line_dipdir, self.combobox_line_dip,
+                          self.combobox_line_sense]
+        elif layer_type == "faultplane":
+            comboboxes = [self.combobox_plane_dipdir, self.combobox_plane_dip,
+                          self.combobox_line_dipdir, self.combobox_line_dip,
+                          self.combobox_line_sense]
+        else:
+            return
+
+        for combobox, column in zip(comboboxes, float_columns + [text_column]):
+            if 0 <= column < 8:
+                combobox.set_active(column)
+        if use_tfpl == True:
+            self.checkbutton_tectonicsfpl.set_active(True)
+
+    def get_column_number(self, combobox):
+        """
+        Returns the column number that is selected in a combobox.
+
+        The number is read from the model of the combobox. Returns -1 if
+        nothing or the "-1" row is selected.
+        """
+        itr = combobox.get_active_iter()
+        if itr is None:
+            return -1
+        return combobox.get_model()[itr][0]
 
     def hide_buttons(self):
         """
@@ -130,22 +195,43 @@ class FileParseDialog(object):
         self.store.append([st_lst[0], st_lst[1], st_lst[2], st_lst[3],
                           st_lst[4], st_lst[5], st_lst[6], st_lst[7]])
 
+    def split_line(self, line):
+        """
+        Splits a line of the file into a list of strings.
+
+        The line is split with the dialect that was sniffed from the file.
+        """
+        return self.dialect.split_line(line)
+
     def parse_file(self, start_line=0):
         """
         Parses the file according to the settings and updates the TreeView.
 
-        The old parsing result are cleared from the TreeStore. Then each
-        row of the file is re-iterated and all rows before the starting
-        row are omitted. The rows are passed to the append_data-method.
+        The old parsing result are cleared from the TreeStore. Only the first
+        PREVIEW_ROWS rows, beginning at the starting row, are read from the
+        file. The LineOffsetIndex seeks directly to the starting row. The
+        rows are passed to the append_data-method.
         """
         self.store.clear()
-        parse_file = open(self.file, "r")
-        for key, line in enumerate(parse_file):
-            if key < start_line:
-                continue
-            else:
-                string_list = re.split(r"[;,]", line)
-                self.append_data(string_list)
+        self.start_line = int(start_line)
+        for line in self.index.read_lines(self.start_line, PREVIEW_ROWS):
+            self.append_data(self.split_line(line))
+
+    def get_column_mapping(self):
+        """
+        Returns the ColumnMapping of the last import, or None.
+
+        The mapping is used by the batch import to read more files with the
+        same layout.
+        """
+        return self.column_mapping
+
+    def hide_dialog(self):
+        """
+        Hides the dialog and closes the file.
+        """
+        self.index.close()
+        self.dialog.hide()
 
     def on_spinbutton_start_line_value_changed(self, spinbutton):
         """
@@ -154,6 +240,7 @@ class FileParseDialog(object):
         If the user changes the starting line for the parsing, the new
         starting line will be passes to the parse_file method. This will
         result in all the lines, before the starting line, to be omitted.
+        Changing the starting line only seeks to a new position in the file.
         """
         start_line = spinbutton.get_value()
         self.parse_file(start_line)
@@ -176,7 +263,7 @@ class FileParseDialog(object):
         and no importing actions are triggered. The results of the parsing
         are lost.
         """
-        self.dialog.hide()
+        self.hide_dialog()
 
     def on_file_parse_dialog_destroy(self, widget):
         # pylint: disable=unused-argument
@@ -186,7 +273,7 @@ class FileParseDialog(object):
         When the dialog is destroyed it hidden and no other actions are taken.
         The results of the parsing are lost.
         """
-        self.dialog.hide()
+        self.hide_dialog()
 
     def on_file_parse_dialog_response(self, widget, response):
         # pylint: disable=unused-argument
@@ -196,7 +283,7 @@ class FileParseDialog(object):
         When the dialog-response is triggered the dialog is hidden. No other
         actions are taken and the results of the parsing are lost.
         """
-        self.dialog.hide()
+        self.hide_dialog()
 
     def on_button_parse_apply_clicked(self, button):
         # pylint: disable=unused-argument
@@ -208,117 +295,75 @@ class FileParseDialog(object):
         numbers from the dialog. The column-numbers match the parsed-column
         with the internal column for the data (e.g. plane dip-direction is in
         the 3rd column in the parsed file, but needs to go into the 1st column
-        of a plane-layer).
-        """
-        cb_pl_dipdir = self.combobox_plane_dipdir.get_active()
-        cb_pl_dip = self.combobox_plane_dip.get_active()
-        cb_pl_strat = self.combobox_strat.get_active()
-        cb_ln_dipdir = self.combobox_line_dipdir.get_active()
-        cb_ln_dip = self.combobox_line_dip.get_active()
-        cb_ln_sense = self.combobox_line_sense.get_active()
-        layer_store = self.layer_obj.get_data_treestore()
+        of a plane-layer). All rows of the file, not only the rows of the
+        preview, are converted into arrays and appended to the layer at once.
+        Rows without valid numbers (e.g. a short line or a text in a number
+        column) are skipped and counted in the statusbar. If the file can not
+        be read at all, the error is shown and the dialog stays open.
+        """
+        cb_pl_dipdir = self.get_column_number(self.combobox_plane_dipdir)
+        cb_pl_dip = self.get_column_number(self.combobox_plane_dip)
+        cb_pl_strat = self.get_column_number(self.combobox_strat)
+        cb_ln_dipdir = self.get_column_number(self.combobox_line_dipdir)
+        cb_ln_dip = self.get_column_number(self.combobox_line_dip)
+        cb_ln_sense = self.get_column_number(self.combobox_line_sense)
         layer_type = self.layer_obj.get_layer_type()
-        self.checkbutton_tectonicsfpl = \
-                            self.builder.get_object("checkbutton_tectonicsfpl")
         self.use_tfpl = self.checkbutton_tectonicsfpl.get_active()
 
-        def iterate_over_planes(m, p, i):
-            """
-            Iterates over all parsed rows and adds them to a plane-layer.
-
-            Replaces the values with a default so there is no IndexError.
-            Calls the add_planar_feature function from the MainWindow class.
-            """
-            #m = model, p = path, i = itr
-            if cb_pl_dipdir == -1:
-                dipdir = 0
-            else:
-                dipdir = float(m[p][cb_pl_dipdir])
-            if cb_pl_dip == -1:
-                dip = 0
-            else:
-                dip = float(m[p][cb_pl_dip])
-            if cb_pl_strat == -1:
-                strat = ""
-            else:
-                strat = str(m[p][cb_pl_strat])
-            self.append_plane(layer_store, dipdir, dip, strat)
-
-        def iterate_over_lines(m, p, i):
-            """
-            Iterates over all parsed rows and adds them to a line-layer.
-
-            Replaces the values with a default so there is no IndexError.
-            Calls the add_linear_feature function from the MainWindow class.
-            """
-            #m = model, p = path, i = itr
-            if cb_ln_dipdir == -1:
-                dipdir = 0
-            else:
-                dipdir = float(m[p][cb_ln_dipdir])
-
-            if cb_ln_dip == -1:
-                dip = 0
-            else:
-                dip = float(m[p][cb_ln_dip])
-
-            if cb_ln_sense == -1:
-                sense = ""
-            else:
-                if self.use_tfpl is True:
-                    sense = self.tfpl_dic[m[p][cb_ln_sense][0:1]]
-                else:
-                    sense = str(m[p][cb_ln_sense])
-
-            self.append_line(layer_store, dipdir, dip, sense)
-
-        def iterate_over_faultplanes(m, p, i):
-            """
-            Iterates over all parsed rows and adds them to a faultplane-layer.
-
-            Replaces the values with a default so there is no IndexError.
-            Calls the add_faultplane_feature function from the MainWindow class.
-            """
-            #m = model, p = path, i = itr
-            if cb_pl_dipdir == -1:
-                pl_dipdir = 0
-            else:
-                pl_dipdir = float(m[p][cb_pl_dipdir])
-
-            if cb_pl_dip == -1:
-                pl_dip = 0
-            else:
-                pl_dip = float(m[p][cb_pl_dip])
-
-            if cb_ln_dipdir == -1:
-                ln_dipdir = 0
-            else:
-                ln_dipdir = float(m[p][cb_ln_dipdir])
-
-            if cb_ln_dip == -1:
-                ln_dip = 0
-            else:
-                ln_dip = float(m[p][cb_ln_dip])
-
-            if cb_ln_sense == -1:
-                ln_sense = ""
-            else:
-                if self.use_tfpl is True:
-                    ln_sense = self.tfpl_dic[m[p][cb_ln_sense][0:1]]
-                else:
-                    ln_sense = str(m[p][cb_ln_sense])
-
-            self.append_faultplane(layer_store, pl_dipdir, pl_dip, ln_dipdir,
-                                   ln_dip, ln_sense)
-
         if layer_type == "plane":
-            self.store.foreach(iterate_over_planes)
+            mapping = ColumnMapping(layer_type, [cb_pl_dipdir, cb_pl_dip],
+                                    cb_pl_strat, False, self.start_line)
         elif layer_type == "line":
-            self.store.foreach(iterate_over_lines)
+            mapping = ColumnMapping(layer_type, [cb_ln_dipdir, cb_ln_dip],
+                                    cb_ln_sense, self.use_tfpl,
+                                    self.start_line)
         elif layer_type == "faultplane":
-            self.store.foreach(iterate_over_faultplanes)
-        self.redraw_plot()
-        self.dialog.hide()
+            mapping = ColumnMapping(layer_type, [cb_pl_dipdir, cb_pl_dip,
+                                                 cb_ln_dipdir, cb_ln_dip],
+                                    cb_ln_sense, self.use_tfpl,
+                                    self.start_line)
+        else:
+            mapping = None
+
+        if mapping is not None:
+            mapping.dialect = self.dialect.to_dict()
+            try:
+                arrays = self.read_arrays(mapping.float_columns,
+                                          mapping.text_column,
+                                          mapping.use_tfpl)
+            except (ValueError, IndexError, UnicodeDecodeError,
+                    OSError) as error:
+                self.show_message("Could not read {0}: {1}".format(
+                                  os.path.basename(self.file), error))
+                return
+            self.layer_obj.append_data_arrays(arrays)
+            self.column_mapping = mapping
+            rows = max(0, self.index.get_line_count() - self.start_line)
+            skipped = rows - len(arrays[0])
+            if skipped > 0:
+                self.show_message("Imported {0} rows, skipped {1} rows "
+                                  "without valid numbers".format(
+                                      len(arrays[0]), skipped))
+        self.request_redraw("file imported")
+        self.hide_dialog()
+
+    def read_arrays(self, float_columns, text_column, use_tfpl):
+        """
+        Reads the chosen columns of all rows of the file into arrays.
+
+        The columns are passed to read_column_arrays. If use_tfpl is True the
+        text column holds TectonicsFP sense-codes, which are translated.
+        Returns a list of arrays in the order of the columns of the layer.
+        The sniffed dialect splits the rows.
+        """
+        if use_tfpl == True:
+            sense_codes = self.tfpl_dic
+        else:
+            sense_codes = None
+        arrays, groups = read_column_arrays(self.index, self.start_line,
+                                            float_columns, text_column,
+                                            sense_codes, dialect=self.dialect)
+        return arrays
 
     def on_button_cancel_clicked(self, button):
         # pylint: disable=unused-argument
@@ -329,4 +374,4 @@ class FileParseDialog(object):
         the dialog. No other actions are taken and the results of the parsing
         are lost.
         """
-        self.dialog.hide()
+        self.hide_dialog()
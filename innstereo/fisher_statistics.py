@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+
+"""
+This module calculates the Fisher statistics of orientation data.
+
+The statistics of a layer are calculated from the unit vectors of its linears
+(or of the poles of its planes), which the layer caches for each version of
+its data. Only the resultant vector and the number of measurements are
+stored, so the statistics of several layers are combined by adding them up.
+The mean direction, mean resultant length (R-bar), precision (kappa) and the
+95% confidence cone (alpha95) follow from these two values. The
+FisherStatisticsCache keeps the statistics of each layer until its data
+changes.
+"""
+
+import weakref
+import numpy as np
+
+from .analysis import vector_lines
+
+#The probability that the true mean lies outside of the alpha95-cone
+FISHER_PROBABILITY = 0.05
+
+
+class FisherStatistics(object):
+
+    """
+    Stores the resultant vector and the number of measurements of a set of
+    unit vectors.
+
+    All statistics are derived from these two values. An empty set has a
+    resultant of zero and a count of zero; its mean and statistics are NaN.
+    """
+
+    def __init__(self, resultant, count):
+        """
+        Initializes the statistics with a resultant vector and a count.
+        """
+        self.resultant = np.asarray(resultant, dtype=np.float64)
+        self.count = count
+
+    @classmethod
+    def from_vectors(cls, vectors):
+        """
+        Returns the statistics of an array of unit vectors.
+
+        Expects an array with one row (North, East, Down) per measurement.
+        """
+        vectors = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+        return cls(np.sum(vectors, axis=0), len(vectors))
+
+    @classmethod
+    def combine(cls, statistics):
+        """
+        Returns the statistics of several sets of measurements at once.
+
+        The resultant vectors and counts are added, so the measurements do
+        not have to be read again.
+        """
+        resultant = np.zeros(3)
+        count = 0
+        for item in statistics:
+            resultant = resultant + item.resultant
+            count += item.count
+        return cls(resultant, count)
+
+    def get_count(self):
+        """
+        Returns the number of measurements.
+        """
+        return self.count
+
+    def get_resultant_length(self):
+        """
+        Returns the length of the resultant vector (R).
+        """
+        return float(np.sqrt(np.sum(self.resultant ** 2)))
+
+    def get_mean_resultant_length(self):
+        """
+        Returns the mean resultant length (R-bar).
+
+        R-bar is 1 if all measurements point in the same direction and gets
+        smaller the more they are scattered.
+        """
+        if self.count == 0:
+            return np.nan
+        return self.get_resultant_length() / self.count
+
+    def get_mean(self):
+        """
+        Returns the trend and plunge of the mean direction.
+
+        The mean is returned in the lower hemisphere.
+        """
+        if self.count == 0:
+            return np.nan, np.nan
+        trend, plunge = vector_lines(self.resultant)
+        return float(trend[0]), float(plunge[0])
+
+    def get_kappa(self):
+        """
+        Returns the estimate of the precision parameter (kappa).
+
+        Kappa is (n - 1) / (n - R). It is infinite if all measurements are
+        the same and NaN for less than two measurements.
+        """
+        if self.count < 2:
+            return np.nan
+        spread = self.count - self.get_resultant_length()
+        if spread <= 0:
+            return np.inf
+        return (self.count - 1) / spread
+
+    def get_alpha95(self):
+        """
+        Returns the half-angle of the 95% confidence cone of the mean.
+
+        The angle is in degrees. It is NaN for less than two measurements and
+        180 degrees if the measurements are too scattered for a mean.
+        """
+        if self.count < 2:
+            return np.nan
+        length = self.get_resultant_length()
+        if length == 0:
+            return 180.0
+        spread = max(self.count - length, 0)
+        cosine = 1 - spread / length * (
+            (1 / FISHER_PROBABILITY) ** (1 / (self.count - 1)) - 1)
+        return float(np.degrees(np.arccos(np.clip(cosine, -1, 1))))
+
+    def get_summary(self):
+        """
+        Returns the statistics as one line of text, e.g. for the statusbar.
+        """
+        if self.count == 0:
+            return "No measurements"
+        trend, plunge = self.get_mean()
+        return ("n = {0}, mean = {1:05.1f}/{2:04.1f}, R-bar = {3:.3f}, "
+                "kappa = {4:.1f}, alpha95 = {5:.1f}".format(
+                    self.count, trend, plunge,
+                    self.get_mean_resultant_length(), self.get_kappa(),
+                    self.get_alpha95()))
+
+
+class FisherStatisticsCache(object):
+
+    """
+    Stores the Fisher statistics of each layer.
+
+    The statistics are stored together with the data version of the layer
+    and are calculated again when the data changes. Style changes keep the
+    statistics. Deleted layers are dropped from the cache automatically.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty cache.
+        """
+        self.statistics = weakref.WeakKeyDictionary()
+
+    def get_statistics(self, layer_obj):
+        """
+        Returns the FisherStatistics of the unit vectors of a layer.
+        """
+        layer_obj.load_data()
+        key = layer_obj.get_data_version()
+        cached = self.statistics.get(layer_obj)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        statistics = FisherStatistics.from_vectors(
+                                            layer_obj.get_unit_vectors())
+        self.statistics[layer_obj] = (key, statistics)
+        return statistics
+
+    def get_combined_statistics(self, layers):
+        """
+        Returns the FisherStatistics of all measurements of several layers.
+        """
+        return FisherStatistics.combine(self.get_statistics(layer_obj)
+                                        for layer_obj in layers)
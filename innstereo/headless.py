@@ -0,0 +1,171 @@
+#!/usr/bin/python3
+
+"""
+This module renders stereonets without a display.
+
+The functions of this module open a project file or a text file, create the
+layers without the Gtk-treestores of the GUI and draw them with the
+StereonetRenderer on an Agg-canvas. The figure is saved as PNG, SVG or PDF,
+depending on the extension of the output file. The main-function is the
+entry point of the innstereo-render command and of "python3 -m
+innstereo.headless", so stereonets can be rendered on servers without a
+display or in scripts.
+"""
+
+import argparse
+import functools
+import os
+import sys
+
+from .layer_types import (PlaneLayer, FaultPlaneLayer, LineLayer,
+                          SmallCircleLayer)
+from .plot_control import PlotSettings
+from .plot_renderer import StereonetRenderer
+from .project_file import ProjectArchive, PROJECT_EXTENSION
+from .text_import import LineOffsetIndex, read_column_arrays
+from .text_sniffer import sniff_dialect, SNIFF_LINES
+from .batch_import import TFPL_CODES
+
+#The layer-classes for the layer types of project and text files
+LAYER_CLASSES = {"plane": PlaneLayer, "faultplane": FaultPlaneLayer,
+                 "line": LineLayer, "smallcircle": SmallCircleLayer}
+
+#The views that can be rendered
+VIEW_MODES = ("stereonet", "stereo_rose", "rose", "pt")
+
+
+def new_layer(layer_type, label=None):
+    """
+    Returns a new layer of a type that has no treestore.
+    """
+    layer_obj = LAYER_CLASSES[layer_type](None, None)
+    if label is not None:
+        layer_obj.set_label(label)
+    return layer_obj
+
+
+def load_project_layers(archive, nodes, visible=True):
+    """
+    Returns the visible layers of a project in the order of the layer tree.
+
+    Layers inside hidden groups are left out. The layers only receive a data
+    loader, so the columns are read from the archive while they are drawn.
+    Edits in the journal of the project are not replayed.
+    """
+    layers = []
+    for node in nodes:
+        shown = visible and node.get("visible", True)
+        if node["kind"] == "group":
+            layers.extend(load_project_layers(archive, node["children"],
+                                              shown))
+        elif shown == True:
+            layer_obj = new_layer(node["layer_type"], node["label"])
+            layer_obj.layer_id = node.get("id", layer_obj.layer_id)
+            layer_obj.set_style_dict(node["style"])
+            layer_obj.set_data_loader(
+                functools.partial(archive.read_columns, node["columns"]))
+            layers.append(layer_obj)
+    return layers
+
+
+def load_text_layer(text_file, layer_type="plane"):
+    """
+    Returns a layer with the data of a text file.
+
+    The layout of the file and its columns are sniffed from the first lines,
+    as in the file-parse dialog. Raises a ValueError if the columns of the
+    dip directions and dips were not found.
+    """
+    index = LineOffsetIndex(text_file)
+    try:
+        dialect = sniff_dialect(index.read_lines(0, SNIFF_LINES))
+        float_columns, text_column, use_tfpl = \
+                                    dialect.get_layer_columns(layer_type)
+        if -1 in float_columns[:2]:
+            raise ValueError("The dip direction and dip columns were not "
+                             "found.")
+        if use_tfpl == True:
+            sense_codes = TFPL_CODES
+        else:
+            sense_codes = None
+        arrays, groups = read_column_arrays(index, dialect.header_lines,
+                                            float_columns, text_column,
+                                            sense_codes, dialect=dialect)
+    finally:
+        index.close()
+    label = os.path.splitext(os.path.basename(text_file))[0]
+    layer_obj = new_layer(layer_type, label)
+    layer_obj.attach_data_arrays(arrays)
+    return layer_obj
+
+
+def render_layers(layers, output, settings=None, view_mode="stereonet",
+                  dpi=None):
+    """
+    Draws a list of layers and saves the figure to the output file.
+
+    If no PlotSettings are passed the default settings are used.
+    """
+    if settings is None:
+        settings = PlotSettings()
+    renderer = StereonetRenderer(settings, view_mode)
+    renderer.save_figure(output, layers, dpi)
+
+
+def render_project(project_file, output, view_mode="stereonet", dpi=None):
+    """
+    Renders the visible layers of a project file with its plot settings.
+    """
+    archive = ProjectArchive(project_file)
+    settings = PlotSettings()
+    settings.set_settings_dict(archive.get_settings())
+    layers = load_project_layers(archive, archive.get_layer_tree())
+    render_layers(layers, output, settings, view_mode, dpi)
+
+
+def render_text_file(text_file, output, layer_type="plane",
+                     view_mode="stereonet", dpi=None):
+    """
+    Renders the data of a text file as one layer with the default style.
+    """
+    layer_obj = load_text_layer(text_file, layer_type)
+    render_layers([layer_obj], output, None, view_mode, dpi)
+
+
+def main(argv=None):
+    """
+    Runs the innstereo-render command.
+
+    Returns the exit status of the command.
+    """
+    parser = argparse.ArgumentParser(prog="innstereo-render",
+        description="Renders an InnStereo project or a text file of "
+                    "measurements to a PNG, SVG or PDF file.")
+    parser.add_argument("input",
+        help="project file ({0}) or text file".format(PROJECT_EXTENSION))
+    parser.add_argument("output",
+        help="image file, the format is taken from the extension")
+    parser.add_argument("--view", choices=VIEW_MODES, default="stereonet",
+        help="the view that is rendered (default: stereonet)")
+    parser.add_argument("--layer-type", choices=sorted(LAYER_CLASSES),
+        default="plane",
+        help="the layer type of a text file (default: plane)")
+    parser.add_argument("--dpi", type=float, default=None,
+        help="resolution of raster images (default: the pixel density of "
+             "the plot settings)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.input.lower().endswith(PROJECT_EXTENSION):
+            render_project(args.input, args.output, args.view, args.dpi)
+        else:
+            render_text_file(args.input, args.output, args.layer_type,
+                             args.view, args.dpi)
+    except (OSError, ValueError) as error:
+        sys.stderr.write("innstereo-render: {0}\n".format(error))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+#!/usr/bin/python3
+
+"""
+This module contains the DataColumns-class that stores the data of a layer.
+
+Each data-layer shows its features in a Gtk.ListStore in the data-view.
+Reading the values back out of the ListStore row by row is slow for large
+datasets, so every layer also keeps its data in a DataColumns-instance. The
+float columns are stored as NumPy-arrays and the text columns as object-arrays.
+The layer classes keep the columns in sync with the ListStore through its
+row-signals. The plotting functions of the main window read the columns
+directly.
+"""
+
+import numpy as np
+
+
+class DataColumns(object):
+
+    """
+    Stores the columns of a data-layer as NumPy-arrays.
+
+    The columns are preallocated with some spare capacity, so appending rows
+    does not copy the whole dataset each time. The get_column-method returns
+    a view of the filled part of a column. The views must not be modified
+    and become stale when the next row is inserted. The snapshot-method
+    returns views that keep their values, for saving in the background. The
+    version is increased with every change, so cached results can tell if
+    the data changed.
+    """
+
+    def __init__(self, column_types):
+        """
+        Initializes empty columns for the given column types.
+
+        Expects a sequence of python types (float or str) that match the
+        columns of the ListStore of the layer (e.g. [float, float, str] for
+        a plane-layer).
+        """
+        self.column_types = list(column_types)
+        self.length = 0
+        self.capacity = 0
+        self.version = 0
+        self.shared = False
+        self.columns = [self.new_column(col_type, 0)
+                        for col_type in self.column_types]
+
+    def new_column(self, col_type, size):
+        """
+        Returns a new and empty array for a column of the given type.
+
+        Float columns are stored as float64. Text columns are stored as
+        object-arrays that are filled with empty strings.
+        """
+        if col_type is float:
+            return np.zeros(size, dtype=np.float64)
+        else:
+            column = np.empty(size, dtype=object)
+            column.fill("")
+            return column
+
+    def convert_value(self, col_type, value):
+        """
+        Converts a value from the ListStore to the type of the column.
+
+        Empty text cells are returned as None by Gtk. They are stored as
+        empty strings.
+        """
+        if col_type is float:
+            return float(value)
+        elif value is None:
+            return ""
+        else:
+            return str(value)
+
+    def reserve(self, size):
+        """
+        Ensures that the columns can hold at least the given number of rows.
+
+        The capacity is at least doubled when the columns are grown, so that
+        appending rows one by one has an amortized constant cost.
+        """
+        if size <= self.capacity:
+            return
+        new_capacity = max(size, 2 * self.capacity, 16)
+        for k, col_type in enumerate(self.column_types):
+            column = self.new_column(col_type, new_capacity)
+            column[:self.length] = self.columns[k][:self.length]
+            self.columns[k] = column
+        self.capacity = new_capacity
+        self.shared = False
+
+    def snapshot(self):
+        """
+        Returns views of the filled part of all columns that keep their values.
+
+        The columns are not copied. They are marked as shared instead, and
+        the next edit that would change them in place copies them first.
+        This way a project can be saved in the background while the layer is
+        edited.
+        """
+        self.shared = True
+        return [self.get_column(k) for k in range(len(self.column_types))]
+
+    def unshare(self):
+        """
+        Copies the columns before an edit, if a snapshot still uses them.
+
+        Memory-mapped columns are read into memory by the copy.
+        """
+        if not self.shared:
+            return
+        self.columns = [np.array(column) for column in self.columns]
+        self.shared = False
+
+    def __len__(self):
+        """
+        Returns the number of rows that are stored.
+        """
+        return self.length
+
+    def get_column(self, index):
+        """
+        Returns a view of the filled part of a column.
+
+        Float columns are returned as float64-arrays, text columns as
+        object-arrays of strings.
+        """
+        return self.columns[index][:self.length]
+
+    def insert_row(self, index, values):
+        """
+        Inserts a row at the given index.
+
+        The values are expected in the same order as the columns of the
+        ListStore. Rows after the index are shifted by one.
+        """
+        self.reserve(self.length + 1)
+        if index < self.length:
+            self.unshare()
+        for k, col_type in enumerate(self.column_types):
+            column = self.columns[k]
+            column[index + 1:self.length + 1] = column[index:self.length]
+            column[index] = self.convert_value(col_type, values[k])
+        self.length += 1
+        self.version += 1
+
+    def append_row(self, values):
+        """
+        Appends a row at the end of the columns.
+        """
+        self.insert_row(self.length, values)
+
+    def set_row(self, index, values):
+        """
+        Replaces the values of the row at the given index.
+        """
+        self.unshare()
+        for k, col_type in enumerate(self.column_types):
+            self.columns[k][index] = self.convert_value(col_type, values[k])
+        self.version += 1
+
+    def delete_row(self, index):
+        """
+        Deletes the row at the given index.
+
+        Rows after the index are shifted by one towards the start.
+        """
+        self.unshare()
+        for column in self.columns:
+            column[index:self.length - 1] = column[index + 1:self.length]
+        self.length -= 1
+        for k, col_type in enumerate(self.column_types):
+            if col_type is not float:
+                self.columns[k][self.length] = ""
+        self.version += 1
+
+    def clear(self):
+        """
+        Removes all rows. The allocated capacity is kept.
+        """
+        self.unshare()
+        self.length = 0
+        for k, col_type in enumerate(self.column_types):
+            if col_type is not float:
+                self.columns[k].fill("")
+        self.version += 1
+
+    def attach(self, arrays):
+        """
+        Uses the given arrays as the columns, without copying them.
+
+        Expects one array per column, all of the same length. A text column
+        can be None, in which case it is filled with empty strings. Float
+        arrays of another type than float64, and arrays that are not
+        writeable, are converted into a copy. Copy-on-write memory-maps are
+        used as they are, so editing a row only copies the pages of the file
+        that are changed. Inserting rows copies the columns, like any other
+        growth of the columns. The columns have to be empty.
+        """
+        size = len(next(column for column in arrays if column is not None))
+        columns = []
+        for k, col_type in enumerate(self.column_types):
+            if arrays[k] is None:
+                column = self.new_column(col_type, size)
+            elif col_type is float:
+                column = np.asarray(arrays[k], dtype=np.float64)
+                if not column.flags.writeable:
+                    column = np.array(column)
+            elif np.asarray(arrays[k]).dtype.kind == "U":
+                column = np.asarray(arrays[k]).astype(object)
+            else:
+                column = np.empty(size, dtype=object)
+                column[:] = [self.convert_value(col_type, value)
+                             for value in arrays[k]]
+            columns.append(column)
+        self.columns = columns
+        self.length = size
+        self.capacity = size
+        self.shared = False
+        self.version += 1
+
+    def extend(self, arrays):
+        """
+        Appends many rows at once.
+
+        Expects one array-like per column, all of the same length. This is
+        used for bulk-imports, where appending row by row would be too slow.
+        """
+        size = len(arrays[0]) if len(arrays) > 0 else 0
+        self.reserve(self.length + size)
+        for k, col_type in enumerate(self.column_types):
+            new_values = self.columns[k][self.length:self.length + size]
+            if col_type is float:
+                new_values[:] = np.asarray(arrays[k], dtype=np.float64)
+            elif np.asarray(arrays[k]).dtype.kind == "U":
+                #Fixed-width strings (e.g. from project files) need no check
+                new_values[:] = np.asarray(arrays[k]).astype(object)
+            else:
+                new_values[:] = [self.convert_value(col_type, value)
+                                 for value in arrays[k]]
+        self.length += size
+        self.version += 1
@@ -18,11 +18,11 @@ class LayerProperties(object):
     """
     This class intializes the layer properties dialog and handles its signals.
     The init method requires a layer object, so the changes can be applied and
-    a function from the main loop that redraws the plot after changes are
-    applied.
+    a function from the main loop that requests a redraw of the plot after
+    changes are applied.
     """
 
-    def __init__(self, layer, redraw_plot):
+    def __init__(self, layer, request_redraw):
         """
         Initializes the Gtk.Builder and loads the about dialog from glade file.
         The builder creates and instance of the about dialog and connects
@@ -42,7 +42,7 @@ class LayerProperties(object):
             "liststore_colormaps", "liststore_contour_method",
             "adjustment_contour_sigma", "adjustment_contour_label_size"))
         self.layer = layer
-        self.redraw = redraw_plot
+        self.request_redraw = request_redraw
         self.changes = []
         self.dialog = self.builder.get_object("dialog_layer_properties")
         self.marker_style_dict = {".": 0, ",": 1, "o": 2, "v": 3, "^": 4, "<": 5,
@@ -157,6 +157,10 @@ class LayerProperties(object):
                                 self.layer.get_marker_edge_rgba())
         self.adjustment_marker_edge_width.set_value(
                                 self.layer.get_marker_edge_width())
+        self.checkbutton_fisher_cone = \
+                        self.builder.get_object("checkbutton_fisher_cone")
+        self.checkbutton_fisher_cone.set_active(
+                                self.layer.get_draw_fisher_cone())
 
     def load_fault_properties(self):
         """
@@ -181,6 +185,8 @@ class LayerProperties(object):
                        self.builder.get_object("checkbutton_draw_contour_fills")
         self.checkbutton_draw_contour_lines = \
                        self.builder.get_object("checkbutton_draw_contour_lines")
+        self.checkbutton_contour_beta = \
+                        self.builder.get_object("checkbutton_contour_beta")
         self.radiobutton_contour_poles = \
                         self.builder.get_object("radiobutton_contour_poles")
         self.radiobutton_contour_linears = \
@@ -217,6 +223,8 @@ class LayerProperties(object):
                                 self.layer.get_draw_contour_lines())
         self.checkbutton_draw_contour_labels.set_active(
                                 self.layer.get_draw_contour_labels())
+        self.checkbutton_contour_beta.set_active(
+                                self.layer.get_contour_beta())
         if self.layer.get_render_pole_contours() == True:
             self.radiobutton_contour_poles.set_active(True)
         else:
@@ -266,6 +274,10 @@ class LayerProperties(object):
         self.box_contour_faultplanes = \
                         self.builder.get_object("box_contour_faultplanes")
         layertype = self.layer.get_layer_type()
+        if layertype != "line":
+            self.checkbutton_fisher_cone.hide()
+        if layertype != "plane":
+            self.checkbutton_contour_beta.hide()
         if layertype == "line":
             self.notebook.get_nth_page(0).hide()
             self.notebook.get_nth_page(1).hide()
@@ -490,7 +502,7 @@ class LayerProperties(object):
         for change in self.changes:
             change()
         
-        self.redraw()
+        self.request_redraw("layer properties applied")
         self.dialog.hide()
 
     def run(self):
@@ -543,6 +555,17 @@ class LayerProperties(object):
         self.changes.append(
             lambda: self.layer.set_draw_contour_lines(draw_contour_lines_state))
 
+    def on_checkbutton_contour_beta_toggled(self, checkbutton):
+        """
+        Queues up a new state for the beta diagram checkbutton.
+
+        Triggered when the checkbutton is toggled. True means that the
+        intersections of the planes are contoured instead of the poles.
+        """
+        contour_beta = checkbutton.get_active()
+        self.changes.append(
+            lambda: self.layer.set_contour_beta(contour_beta))
+
     def on_radiobutton_contour_poles_toggled(self, radiobutton):
         """
         Triggered when the radiobutton-group for contouring poles and contouring
@@ -679,3 +702,15 @@ class LayerProperties(object):
         draw_hoeppener = checkbutton.get_active()
         self.changes.append(
             lambda: self.layer.set_draw_hoeppener(draw_hoeppener))
+
+    def on_checkbutton_fisher_cone_toggled(self, checkbutton):
+        """
+        Queues up a new state for the Fisher cone checkbutton.
+
+        Triggered when a new state for the checkbutton of the Fisher mean and
+        its confidence cone is set. Gets the new state and queues it up in the
+        list of changes.
+        """
+        draw_fisher_cone = checkbutton.get_active()
+        self.changes.append(
+            lambda: self.layer.set_draw_fisher_cone(draw_fisher_cone))
@@ -9,10 +9,24 @@ FaulPlaneLayer, LineLayer and SmallCircleLayer. Instances of these classes
 are created in the MainWindow-class. During plot-redraws the current styling
 of each layer is queried from these classes. The settings are also called when
 the layer properties dialog is opened. Changes in the layer properties dialog
-are stored in these classes.
+are stored in these classes. Each layer counts the changes to its style and
+its data, so plot- and analysis-caches can tell if a layer has changed. Gtk is
+only needed for the pixbufs and colors of the GUI, so the layers can also be
+used by the headless renderer.
 """
 
-from gi.repository import Gdk, GdkPixbuf
+try:
+    from gi.repository import Gdk, GdkPixbuf
+except ImportError:
+    #Headless rendering does not need the pixbufs and RGBA-colors
+    Gdk = None
+    GdkPixbuf = None
+import uuid
+import numpy as np
+
+from .layer_data import DataColumns
+from .array_import import load_layer_arrays
+from .analysis import line_vectors, plane_poles
 
 
 class PlaneLayer(object):
@@ -22,19 +36,47 @@ class PlaneLayer(object):
 
     The settings are currently hardcoded. The methods conists of get-methods,
     to retrieve settings and set-methods to update settings. Colors have an
-    additional get-rgba-method.
+    additional get-rgba-method. Every set-method increases the style version
+    of the layer and every change of the data increases the data version.
     """
 
+    #Types of the columns in the ListStore of this layer-type
+    column_types = (float, float, str)
+
+    #Attributes that are saved in project files
+    style_attributes = ("render_gcircles", "line_color", "line_width",
+        "line_style", "line_alpha", "capstyle", "render_poles", "pole_style",
+        "pole_size", "pole_fill", "pole_edge_color", "pole_edge_width",
+        "pole_alpha", "render_linears", "marker_style", "marker_size",
+        "marker_fill", "marker_edge_color", "marker_edge_width",
+        "marker_alpha", "rose_spacing", "rose_bottom", "draw_hoeppener",
+        "draw_lp_plane", "draw_contour_fills", "draw_contour_lines",
+        "draw_contour_labels", "render_plane_contours",
+        "render_line_contours", "colormap", "contour_resolution",
+        "contour_method", "contour_sigma", "contour_line_color",
+        "contour_use_line_color", "contour_line_width",
+        "contour_line_style", "contour_label_size", "draw_fisher_cone",
+        "contour_beta")
+
     def __init__(self, treestore, treeview):
         """
         Initalizes the PlaneLayer class with default settings.
 
         The settings that are applied here are also set for the layers, that
         inherit from the PlaneLayer class, even if some settings are not used
-        for certain layer-types.
+        for certain layer-types. The data columns are connected to the
+        row-signals of the treestore, so they always mirror its content.
         """
         self.data_treestore = treestore
         self.data_treeview = treeview
+        self.data_columns = DataColumns(self.column_types)
+        self.data_loader = None
+        self.pending_rows = None
+        self.layer_id = uuid.uuid4().hex
+        self.journal = None
+        self.connect_data_treestore()
+        self.style_version = 0
+        self.unit_vectors = None
         self.type = "plane"
         self.label = "Plane layer"
 
@@ -72,7 +114,11 @@ class PlaneLayer(object):
         self.draw_hoeppener = False
         self.draw_lp_plane = False
 
+        #Linear statistics
+        self.draw_fisher_cone = False
+
         #Contours
+        self.contour_beta = False
         self.draw_contour_fills = False
         self.draw_contour_lines = False
         self.draw_contour_labels = False
@@ -183,18 +229,367 @@ class PlaneLayer(object):
         Returns the data TreeStore that holds the data for this layer.
 
         This method returns the TreeStore that stores the data of this layer.
-        The TreeStore contains all the individual features as rows.
+        The TreeStore contains all the individual features as rows. Data that
+        has not been loaded yet is loaded first.
         """
+        self.load_data()
+        self.fill_data_treestore()
         return self.data_treestore
 
+    def connect_data_treestore(self):
+        """
+        Connects the row-signals of the data TreeStore to the data columns.
+
+        Every insert, change, deletion or reordering of rows in the TreeStore
+        is repeated in the data columns of this layer. Existing rows of the
+        TreeStore are copied into the columns.
+        """
+        self.data_handler_ids = []
+        if self.data_treestore is None:
+            return
+        store = self.data_treestore
+        self.data_handler_ids = [
+            store.connect("row-inserted", self.on_data_row_inserted),
+            store.connect("row-changed", self.on_data_row_changed),
+            store.connect("row-deleted", self.on_data_row_deleted),
+            store.connect("rows-reordered", self.on_data_rows_reordered)]
+        self.reload_data_columns()
+
+    def append_data_arrays(self, arrays):
+        """
+        Appends many rows to the layer at once.
+
+        Expects one array per column of the layer, all of the same length.
+        The arrays are appended to the data columns in one step. Then the rows
+        are appended to the data TreeStore.
+        """
+        self.load_data()
+        self.fill_data_treestore()
+        self.data_columns.extend(arrays)
+        self.append_treestore_rows(arrays)
+        self.record_edit("append", columns=[np.asarray(column) for column in
+                                            arrays])
+
+    def append_treestore_rows(self, arrays):
+        """
+        Appends rows to the data TreeStore without updating the data columns.
+
+        The TreeView is detached from the TreeStore and the row-signals of
+        the layer are blocked while the rows are appended. This avoids
+        updating the data columns and repainting the view for each row.
+        """
+        if self.data_treestore is None:
+            return
+
+        store = self.data_treestore
+        if self.data_treeview is not None:
+            self.data_treeview.set_model(None)
+        for handler_id in self.data_handler_ids:
+            store.handler_block(handler_id)
+        try:
+            columns = [np.asarray(column).tolist() for column in arrays]
+            for values in zip(*columns):
+                store.append(values)
+        finally:
+            for handler_id in self.data_handler_ids:
+                store.handler_unblock(handler_id)
+            if self.data_treeview is not None:
+                self.data_treeview.set_model(store)
+
+    def set_data_loader(self, loader):
+        """
+        Sets a function that returns the data of the layer when it is needed.
+
+        This is used when a project is opened. The loader returns one array
+        per column. It is called the first time the data of the layer is
+        used, so layers that are never shown are never read from the disk.
+        """
+        self.data_loader = loader
+
+    def load_data(self):
+        """
+        Loads the data of the layer, if a data loader is set.
+
+        The arrays of the loader are attached to the layer with the
+        attach_data_arrays-method.
+        """
+        if self.data_loader is None:
+            return
+        loader = self.data_loader
+        self.data_loader = None
+        self.attach_data_arrays(loader())
+
+    def attach_data_arrays(self, arrays):
+        """
+        Uses arrays as the data of the layer without copying them.
+
+        Expects one array per column of the layer. Text columns can be None
+        and are then filled with empty strings. If the layer has no rows yet,
+        the arrays become its data columns (see DataColumns.attach) and the
+        rows of the data TreeStore are only filled when the TreeStore is
+        used, because this is much slower than filling the columns. Otherwise
+        the arrays are appended to the rows of the layer.
+        """
+        if len(self.data_columns) > 0 or self.pending_rows is not None:
+            size = len(next(array for array in arrays if array is not None))
+            arrays = [np.full(size, "", dtype=object) if array is None
+                      else array for array in arrays]
+            self.append_data_arrays(arrays)
+            return
+        self.data_columns.attach(arrays)
+        self.pending_rows = [self.data_columns.get_column(k)
+                             for k in range(len(self.column_types))]
+
+    def attach_array_file(self, path):
+        """
+        Attaches the columns of a binary array file to the layer.
+
+        The file is memory-mapped with load_layer_arrays, so no row is read
+        before it is used. The file holds the float columns of the layer in
+        their order (e.g. dip direction and dip). The import is recorded in
+        the journal by its path, not by its data.
+        """
+        float_count = list(self.column_types).count(float)
+        columns = load_layer_arrays(path, float_count)
+        arrays = [columns.pop(0) if col_type is float else None
+                  for col_type in self.column_types]
+        self.attach_data_arrays(arrays)
+        self.record_edit("attach", path=path)
+
+    def fill_data_treestore(self):
+        """
+        Appends the loaded rows that are not in the data TreeStore yet.
+        """
+        if self.pending_rows is None:
+            return
+        arrays = self.pending_rows
+        self.pending_rows = None
+        self.append_treestore_rows(arrays)
+
+    def get_row_values(self, model, itr):
+        """
+        Returns the values of a row of the data TreeStore as a tuple.
+        """
+        return model.get(itr, *range(len(self.column_types)))
+
+    def reload_data_columns(self):
+        """
+        Copies all rows of the data TreeStore into the data columns.
+
+        This is only needed when the order of the rows changes, because all
+        other changes are mirrored row by row.
+        """
+        self.data_columns.clear()
+        for row in self.data_treestore:
+            self.data_columns.append_row(
+                self.get_row_values(self.data_treestore, row.iter))
+
+    def on_data_row_inserted(self, model, path, itr):
+        """
+        Inserts a new row of the data TreeStore into the data columns.
+        """
+        values = self.get_row_values(model, itr)
+        self.data_columns.insert_row(path.get_indices()[0], values)
+        self.record_edit("insert", row=path.get_indices()[0],
+                         values=list(values))
+
+    def on_data_row_changed(self, model, path, itr):
+        """
+        Updates a changed row of the data TreeStore in the data columns.
+        """
+        values = self.get_row_values(model, itr)
+        self.data_columns.set_row(path.get_indices()[0], values)
+        self.record_edit("set", row=path.get_indices()[0],
+                         values=list(values))
+
+    def on_data_row_deleted(self, model, path):
+        # pylint: disable=unused-argument
+        """
+        Removes a deleted row of the data TreeStore from the data columns.
+        """
+        self.data_columns.delete_row(path.get_indices()[0])
+        self.record_edit("delete", row=path.get_indices()[0])
+
+    def on_data_rows_reordered(self, model, path, itr, new_order):
+        # pylint: disable=unused-argument
+        """
+        Reloads the data columns when the rows of the TreeStore are reordered.
+        """
+        self.reload_data_columns()
+        self.record_edit("reorder", order=list(new_order))
+
+    def get_data_columns(self):
+        """
+        Returns the DataColumns-instance that mirrors the data TreeStore.
+
+        The columns hold the data of the layer as NumPy-arrays. They are read
+        by the main window each time the plot is redrawn.
+        """
+        self.load_data()
+        return self.data_columns
+
+    def set_journal(self, journal):
+        """
+        Sets the EditJournal that records the edits of this layer.
+
+        Passing None stops the recording (e.g. while a journal is replayed).
+        """
+        self.journal = journal
+
+    def record_edit(self, op, **values):
+        """
+        Records an edit of this layer in the journal, if one is set.
+        """
+        if self.journal is None:
+            return
+        values["op"] = op
+        values["layer"] = self.layer_id
+        self.journal.record(values)
+
+    def apply_journal_entry(self, entry):
+        """
+        Repeats an edit that was recorded in the journal.
+
+        Row edits are applied to the data TreeStore, so the data columns and
+        the data view are updated as well. Layers without a TreeStore (e.g.
+        of the headless renderer) apply them to the data columns. The journal
+        of the layer has to be None while the entry is applied.
+        """
+        op = entry["op"]
+        if op == "style":
+            if entry["name"] in self.style_attributes + ("label",):
+                setattr(self, entry["name"], entry["value"])
+                self.style_version += 1
+            return
+        elif op == "append":
+            self.append_data_arrays(entry["columns"])
+            return
+        elif op == "attach":
+            self.attach_array_file(entry["path"])
+            return
+
+        if self.data_treestore is None:
+            self.apply_column_entry(entry)
+            return
+        store = self.get_data_treestore()
+        if op == "insert":
+            store.insert(entry["row"], entry["values"])
+        elif op == "set":
+            store.set_row(store.get_iter(entry["row"]), entry["values"])
+        elif op == "delete":
+            store.remove(store.get_iter(entry["row"]))
+        elif op == "reorder":
+            store.reorder(entry["order"])
+
+    def apply_column_entry(self, entry):
+        """
+        Repeats a row edit of the journal on the data columns.
+        """
+        op = entry["op"]
+        columns = self.get_data_columns()
+        if op == "insert":
+            columns.insert_row(entry["row"], entry["values"])
+        elif op == "set":
+            columns.set_row(entry["row"], entry["values"])
+        elif op == "delete":
+            columns.delete_row(entry["row"])
+        elif op == "reorder":
+            arrays = [columns.get_column(k)[entry["order"]]
+                      for k in range(len(self.column_types))]
+            columns.clear()
+            columns.extend(arrays)
+
+    def style_changed(self, name):
+        """
+        Increases the style version and records the new value of a setting.
+        """
+        self.style_version += 1
+        self.record_edit("style", name=name, value=getattr(self, name))
+
+    def get_style_dict(self):
+        """
+        Returns the style of the layer as a dictionary.
+
+        The dictionary holds the attributes in style_attributes and is
+        saved in project files.
+        """
+        return {name: getattr(self, name) for name in self.style_attributes}
+
+    def set_style_dict(self, style):
+        """
+        Sets the style of the layer from a dictionary.
+
+        Unknown keys are ignored, so project files of other versions can be
+        opened.
+        """
+        for name in self.style_attributes:
+            if name in style:
+                setattr(self, name, style[name])
+        self.style_version += 1
+
+    def get_style_version(self):
+        """
+        Returns the style version of this layer.
+
+        The style version is an int that is increased each time one of the
+        set-methods of this layer is called.
+        """
+        return self.style_version
+
+    def get_data_version(self):
+        """
+        Returns the data version of this layer.
+
+        The data version is an int that is increased each time a row of the
+        layer is inserted, changed or deleted.
+        """
+        return self.data_columns.version
+
+    def get_version(self):
+        """
+        Returns the data and style version of this layer as a tuple.
+
+        Caches of results that depend on the data and the style of a layer
+        (e.g. the artists of the plot) use this tuple as their key. Caches of
+        results that only depend on the data use the data version.
+        """
+        return self.get_data_version(), self.style_version
+
+    def calculate_unit_vectors(self, dipdir, dip):
+        """
+        Returns the unit vectors of the poles of planes.
+
+        Line- and small-circle-layers override this method, because their
+        first two columns are already the trends and plunges of linears.
+        """
+        return line_vectors(*plane_poles(dipdir, dip))
+
+    def get_unit_vectors(self):
+        """
+        Returns the unit vectors of the measurements of this layer.
+
+        The vectors (North, East, Down) belong to the poles of planes, or to
+        the linears of line-layers. They are calculated once for each data
+        version and shared with the statistics, so they must not be
+        modified.
+        """
+        columns = self.get_data_columns()
+        version = self.get_data_version()
+        if self.unit_vectors is None or self.unit_vectors[0] != version:
+            self.unit_vectors = (version, self.calculate_unit_vectors(
+                            columns.get_column(0), columns.get_column(1)))
+        return self.unit_vectors[1]
+
     def get_data_treeview(self):
         """
         Returns the data TreeView that is associated with this layer.
 
         Each layer stores a TreeView that is linked to the layers' TreeStore.
         This method is called when the selection in the main windows' layer
-        view is changed.
+        view is changed. Data that has not been loaded yet is loaded first.
         """
+        self.load_data()
+        self.fill_data_treestore()
         return self.data_treeview
 
     def get_layer_type(self):
@@ -223,6 +618,7 @@ class PlaneLayer(object):
         Expects a string in hex-triplet format.
         """
         self.line_color = new_color
+        self.style_changed("line_color")
 
     def get_label(self):
         """
@@ -241,6 +637,7 @@ class PlaneLayer(object):
         name of a layer by editing the column in the layer-view.
         """
         self.label = new_label
+        self.style_changed("label")
 
     def get_line_width(self):
         """
@@ -259,6 +656,7 @@ class PlaneLayer(object):
         dialog when a new value has been set.
         """
         self.line_width = new_line_width
+        self.style_changed("line_width")
 
     def get_line_style(self):
         """
@@ -278,6 +676,7 @@ class PlaneLayer(object):
         set.
         """
         self.line_style = new_line_style
+        self.style_changed("line_style")
 
     def get_capstyle(self):
         """
@@ -295,6 +694,7 @@ class PlaneLayer(object):
         Expects a string (e.g. "round").
         """
         self.capstyle = new_capstyle
+        self.style_changed("capstyle")
 
     def get_pole_style(self):
         """
@@ -313,6 +713,7 @@ class PlaneLayer(object):
         when a new style is set.
         """
         self.pole_style = new_pole_style
+        self.style_changed("pole_style")
 
     def get_pole_size(self):
         """
@@ -330,6 +731,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.pole_size = new_pole_size
+        self.style_changed("pole_size")
 
     def get_pole_fill(self):
         """
@@ -347,6 +749,7 @@ class PlaneLayer(object):
         layer-properties dialog when a new color is set.
         """
         self.pole_fill = new_pole_fill
+        self.style_changed("pole_fill")
 
     def get_pole_edge_color(self):
         """
@@ -364,6 +767,7 @@ class PlaneLayer(object):
         the layer-properties dialog when a new edge color is set.
         """
         self.pole_edge_color = new_pole_edge_color
+        self.style_changed("pole_edge_color")
 
     def get_pole_edge_width(self):
         """
@@ -381,6 +785,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.pole_edge_width = new_pole_edge_width
+        self.style_changed("pole_edge_width")
 
     def get_pole_alpha(self):
         """
@@ -408,6 +813,7 @@ class PlaneLayer(object):
         when a new value is set for this layer.
         """
         self.marker_style = new_marker_style
+        self.style_changed("marker_style")
 
     def get_marker_size(self):
         """
@@ -426,6 +832,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.marker_size = new_marker_size
+        self.style_changed("marker_size")
 
     def get_marker_fill(self):
         """
@@ -445,6 +852,7 @@ class PlaneLayer(object):
         layer-properties dialog when a new value is set.
         """
         self.marker_fill = new_marker_fill
+        self.style_changed("marker_fill")
 
     def get_marker_edge_width(self):
         """
@@ -464,6 +872,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.marker_edge_width = new_marker_edge_width
+        self.style_changed("marker_edge_width")
 
     def get_marker_edge_color(self):
         """
@@ -483,6 +892,7 @@ class PlaneLayer(object):
         by the layer-properties dialog when a new value is set.
         """
         self.marker_edge_color = new_marker_edge_color
+        self.style_changed("marker_edge_color")
 
     def get_line_alpha(self):
         """
@@ -500,6 +910,7 @@ class PlaneLayer(object):
         layer-properties dialog when a new value is set.
         """
         self.line_alpha = new_line_alpha
+        self.style_changed("line_alpha")
 
     def get_marker_alpha(self):
         """
@@ -517,6 +928,7 @@ class PlaneLayer(object):
         layer-properties dialog when a new value has been set.
         """
         self.marker_alpha = new_marker_alpha
+        self.style_changed("marker_alpha")
 
     def get_render_gcircles(self):
         """
@@ -535,6 +947,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.render_gcircles = new_render_gcircles_state
+        self.style_changed("render_gcircles")
 
     def get_render_poles(self):
         """
@@ -553,6 +966,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.render_poles = new_render_poles_state
+        self.style_changed("render_poles")
 
     def get_render_linears(self):
         """
@@ -571,6 +985,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.render_linears = new_render_linears_state
+        self.style_changed("render_linears")
 
     def get_draw_contour_fills(self):
         """
@@ -589,6 +1004,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.draw_contour_fills = new_state
+        self.style_changed("draw_contour_fills")
 
     def get_draw_contour_lines(self):
         """
@@ -607,6 +1023,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.draw_contour_lines = new_state
+        self.style_changed("draw_contour_lines")
 
     def get_draw_contour_labels(self):
         """
@@ -625,6 +1042,26 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.draw_contour_labels = new_state
+        self.style_changed("draw_contour_labels")
+
+    def get_contour_beta(self):
+        """
+        Returns if the intersections of the planes should be contoured.
+
+        True means that a plane-layer contours the intersections of all pairs
+        of its planes (a beta diagram) instead of its poles.
+        """
+        return self.contour_beta
+
+    def set_contour_beta(self, new_state):
+        """
+        Sets whether the intersections of the planes should be contoured.
+
+        Expects a boolean. This method is called by the layer-properties dialog
+        when a new value is set.
+        """
+        self.contour_beta = new_state
+        self.style_changed("contour_beta")
 
     def get_render_pole_contours(self):
         """
@@ -644,6 +1081,7 @@ class PlaneLayer(object):
         when a new value is set.
         """
         self.render_plane_contours = new_state
+        self.style_changed("render_plane_contours")
 
     def get_render_line_contours(self):
         """
@@ -661,6 +1099,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.render_line_contours = new_state
+        self.style_changed("render_line_contours")
 
     def get_rose_spacing(self):
         """
@@ -678,6 +1117,7 @@ class PlaneLayer(object):
         dialog when a new value is set.
         """
         self.rose_spacing = new_spacing
+        self.style_changed("rose_spacing")
 
     def get_rose_bottom(self):
         """
@@ -695,6 +1135,7 @@ class PlaneLayer(object):
         dialog when a new value is set.        
         """
         self.rose_bottom = new_bottom
+        self.style_changed("rose_bottom")
 
     def get_colormap(self):
         """
@@ -711,6 +1152,7 @@ class PlaneLayer(object):
         Expects a string (e.g. "Blues")
         """
         self.colormap = new_colormap
+        self.style_changed("colormap")
 
     def get_contour_resolution(self):
         """
@@ -727,6 +1169,7 @@ class PlaneLayer(object):
         Expects an integer.
         """
         self.contour_resolution = new_resolution
+        self.style_changed("contour_resolution")
 
     def get_contour_method(self):
         """
@@ -743,6 +1186,7 @@ class PlaneLayer(object):
         Expects an string.
         """
         self.contour_method = new_method
+        self.style_changed("contour_method")
 
     def get_contour_line_width(self):
         """
@@ -759,6 +1203,7 @@ class PlaneLayer(object):
         Expects an int or float.
         """
         self.contour_line_width = new_width
+        self.style_changed("contour_line_width")
 
     def get_contour_line_color(self):
         """
@@ -775,6 +1220,7 @@ class PlaneLayer(object):
         Expects a hex triplet in the form of e.g. "#ab00ab".
         """
         self.contour_line_color = new_color
+        self.style_changed("contour_line_color")
 
     def get_contour_line_rgba(self):
         """
@@ -802,6 +1248,7 @@ class PlaneLayer(object):
         Expects an int or float.
         """
         self.contour_sigma = new_sigma
+        self.style_changed("contour_sigma")
 
     def get_contour_line_style(self):
         """
@@ -818,6 +1265,7 @@ class PlaneLayer(object):
         Expects a string (Example "--").
         """
         self.contour_line_style = new_style
+        self.style_changed("contour_line_style")
 
     def get_contour_label_size(self):
         """
@@ -834,6 +1282,7 @@ class PlaneLayer(object):
         This method expects an int or float.
         """
         self.contour_label_size = new_size
+        self.style_changed("contour_label_size")
 
     def get_use_line_color(self):
         """
@@ -854,6 +1303,7 @@ class PlaneLayer(object):
         True = Use color, False = Use colormap
         """
         self.contour_use_line_color = new_state
+        self.style_changed("contour_use_line_color")
 
     def get_draw_hoeppener(self):
         """
@@ -873,6 +1323,7 @@ class PlaneLayer(object):
         is set. The function expects a boolean.
         """
         self.draw_hoeppener = new_state
+        self.style_changed("draw_hoeppener")
 
     def get_draw_lp_plane(self):
         """
@@ -891,6 +1342,25 @@ class PlaneLayer(object):
         is set. The function expects a boolean.
         """
         self.draw_lp_plane = new_state
+        self.style_changed("draw_lp_plane")
+
+    def get_draw_fisher_cone(self):
+        """
+        Returns if the Fisher mean and its confidence cone should be drawn.
+
+        Only line-layers draw the Fisher mean of their linears.
+        """
+        return self.draw_fisher_cone
+
+    def set_draw_fisher_cone(self, new_state):
+        """
+        Sets whether the Fisher mean and its confidence cone should be drawn.
+
+        Function is called by the layer-properties dialog when a new state
+        is set. The function expects a boolean.
+        """
+        self.draw_fisher_cone = new_state
+        self.style_changed("draw_fisher_cone")
 
 
 class FaultPlaneLayer(PlaneLayer):
@@ -903,6 +1373,8 @@ class FaultPlaneLayer(PlaneLayer):
     the PlaneLayer-class.
     """
 
+    column_types = (float, float, float, float, str)
+
     def __init__(self, treestore, treeview):
         """
         Initializes the FaultPlaneLayer-class. Sets the type and label.
@@ -955,6 +1427,12 @@ class LineLayer(PlaneLayer):
         pixbuf_color.fill(marker_color_alpha)
         return pixbuf_color
 
+    def calculate_unit_vectors(self, trend, plunge):
+        """
+        Returns the unit vectors of the linears.
+        """
+        return line_vectors(trend, plunge)
+
 
 class SmallCircleLayer(PlaneLayer):
 
@@ -966,6 +1444,8 @@ class SmallCircleLayer(PlaneLayer):
     class.
     """
 
+    column_types = (float, float, float)
+
     def __init__(self, treestore, treeview):
         """
         Initializes the SmallCircleLayer-class.
@@ -977,3 +1457,9 @@ class SmallCircleLayer(PlaneLayer):
         PlaneLayer.__init__(self, treestore, treeview)
         self.type = "smallcircle"
         self.label = "Small circle layer"
+
+    def calculate_unit_vectors(self, trend, plunge):
+        """
+        Returns the unit vectors of the axes of the small circles.
+        """
+        return line_vectors(trend, plunge)
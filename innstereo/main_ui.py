@@ -8,15 +8,15 @@ modules and clases are controlled from this class. The startup-function creates
 the first instance of the GUI when the program starts.
 """
 
-from gi.repository import Gtk, GdkPixbuf
+from gi.repository import Gtk, GdkPixbuf, GLib
 from matplotlib.backends.backend_gtk3cairo import (FigureCanvasGTK3Cairo
                                                    as FigureCanvas)
 from matplotlib.backends.backend_gtk3 import (NavigationToolbar2GTK3 
                                               as NavigationToolbar)
 import mplstereonet
 import numpy as np
-import scipy
 import webbrowser
+import functools
 import os
 
 #Internal imports
@@ -25,20 +25,40 @@ from .dataview_classes import (PlaneDataView, LineDataView,
 from .layer_view import LayerTreeView
 from .layer_types import PlaneLayer, FaultPlaneLayer, LineLayer, SmallCircleLayer
 from .dialog_windows import (AboutDialog, PrintDialog, StereonetProperties,
-                            FileChooserParse)
+                            FileChooserParse, FileChooserBatchImport,
+                            FileChooserProject, FileChooserArrays,
+                            ClusterDialog, BetaDialog)
 from .layer_properties import LayerProperties
 from .plot_control import PlotSettings
-from .polar_axes import NorthPolarAxes
 from .file_parser import FileParseDialog
-
-
-class MainWindow(object):
+from .redraw_scheduler import RedrawScheduler
+from .density import DensityGridCache, DensityWorker
+from .rose_histogram import RoseHistogramCache
+from .fisher_statistics import FisherStatisticsCache
+from .clustering import cluster_orientations
+from .paleostress import StressInversionCache, StressWorker
+from .batch_import import (BatchImporter, ColumnMapping, find_files,
+                           MAPPING_FILE_NAME)
+from .process_pool import get_process_pool, shutdown_process_pool
+from .project_file import save_project, ProjectArchive, PROJECT_EXTENSION
+from .edit_journal import (EditJournal, read_journal, journal_path,
+                           replay_entries, recovery_directory,
+                           new_recovery_path, find_recovery_projects,
+                           claim_recovery_project, remove_recovery_project,
+                           COMPACT_JOURNAL_SIZE)
+from .plot_renderer import StereonetRenderer
+from .analysis import (plane_poles, normal_planes, EigenvectorWorker,
+                       best_fit_plane, plane_intersection, beta_lines)
+
+
+class MainWindow(StereonetRenderer):
 
     """
     The MainWindow-class handles the properties and signals of the GUI.
 
     The class sets up the GUI and connects all signals. Most methods are
-    for individual functions of the GUI.
+    for individual functions of the GUI. The drawing of the layers is
+    inherited from the StereonetRenderer.
     """
 
     def __init__(self, builder):
@@ -83,13 +103,36 @@ class MainWindow(object):
         #Set up the plot
         self.fig = self.settings.get_fig()
         self.canvas = FigureCanvas(self.fig)
+        self.save_toolbar = None
         self.sw_plot.add_with_viewport(self.canvas)
-        self.ax_stereo = self.settings.get_stereonet()
-        self.inv = self.settings.get_inverse_transform()
         self.trans = self.settings.get_transform()
         self.view_mode = "stereonet"
         self.view_changed = False
-        self.ax_rose = None
+        self.create_axes()
+        self.redraw_scheduler = RedrawScheduler(self.redraw_plot,
+                                                min_interval=50)
+        self.density_cache = DensityGridCache()
+        self.density_worker = DensityWorker(self.density_cache, GLib.idle_add,
+                                    error_function=self.on_density_error)
+        self.rose_cache = RoseHistogramCache()
+        self.fisher_cache = FisherStatisticsCache()
+        self.stress_cache = StressInversionCache()
+        self.stress_worker = StressWorker(self.stress_cache, GLib.idle_add,
+                                    error_function=self.on_stress_error)
+        self.eigenvector_worker = EigenvectorWorker(GLib.idle_add,
+                                    error_function=self.on_eigenvector_error,
+                                    max_workers=os.cpu_count() or 1)
+        self.batch_importer = BatchImporter(GLib.idle_add)
+        self.column_mapping = None
+        self.project_file = None
+        self.recovery_file = None
+        self.journal = None
+        self.recorded_tree = None
+        self.tree_record_pending = False
+        for signal in ("row-inserted", "row-changed", "row-deleted",
+                       "rows-reordered"):
+            self.layer_store.connect(signal, self.on_layer_tree_changed)
+        GLib.timeout_add_seconds(60, self.on_journal_timeout)
 
         #Set up event-handlers
         self.canvas.mpl_connect('motion_notify_event', 
@@ -97,6 +140,7 @@ class MainWindow(object):
         self.canvas.mpl_connect('button_press_event',
             self.mpl_canvas_clicked)
 
+        self.start_recovery()
         self.redraw_plot()
         self.main_window.show_all()
 
@@ -111,7 +155,7 @@ class MainWindow(object):
         if self.view_mode is not "stereonet":
             self.view_changed = True
             self.view_mode = "stereonet"
-            self.redraw_plot()
+            self.request_redraw("view changed")
 
     def on_menuitem_stereo_rose_activate(self, widget):
         # pylint: disable=unused-argument
@@ -124,7 +168,7 @@ class MainWindow(object):
         if self.view_mode is not "stereo-rose":
             self.view_changed = True
             self.view_mode = "stereo_rose"
-            self.redraw_plot()
+            self.request_redraw("view changed")
 
     def on_menuitem_rose_view_activate(self, widget):
         # pylint: disable=unused-argument
@@ -137,7 +181,7 @@ class MainWindow(object):
         if self.view_mode is not "rose":
             self.view_changed = True
             self.view_mode = "rose"
-            self.redraw_plot()
+            self.request_redraw("view changed")
 
     def on_menuitem_pt_view_activate(self, widget):
         # pylint: disable=unused-argument
@@ -150,39 +194,152 @@ class MainWindow(object):
         if self.view_mode is not "pt":
             self.view_changed = True
             self.view_mode = "pt"
-            self.redraw_plot()
+            self.request_redraw("view changed")
 
     def on_toolbutton_eigenvector_clicked(self, widget):
         # pylint: disable=unused-argument
         """
         Calculates the eigenvectors and eigenvalues of one or more layers.
 
-        __!!__Implemented in mplstereonet now, change this function!
-        """
-        selection = self.layer_view.get_selection()
-        model, row_list = selection.get_selected_rows()
+        Linear-layers are used as they are, plane- and faultplane-layers
+        contribute the poles of their planes. The three eigenvectors of all
+        selected measurements are added as a new linear layer, beginning
+        with the largest eigenvalue. Their 95% confidence cones are estimated
+        by bootstrapping and added as a small-circle layer. The analysis runs
+        in the EigenvectorWorker, so the layers are added by
+        add_eigenvector_layers once it is done.
+        """
+        trend = []
+        plunge = []
+        for layer_obj in self.get_selected_layers():
+            dipdir, dip = self.get_layer_orientations([layer_obj])
+            if layer_obj.get_layer_type() == "line":
+                trend.append(dipdir)
+                plunge.append(dip)
+            else:
+                pole_trend, pole_plunge = plane_poles(dipdir, dip)
+                trend.append(pole_trend)
+                plunge.append(pole_plunge)
+        if len(trend) == 0 or len(np.concatenate(trend)) == 0:
+            return
 
-        total_dipdir = []
-        total_dip = []
-        for row in row_list:
-            layer_obj = model[row][3]
-            dipdir, dip, sense = self.parse_lines(
-                                                layer_obj.get_data_treestore())
-            for x in dipdir:
-                total_dipdir.append(x)
-            for y in dip:
-                total_dip.append(y)
-
-        fit_strike1, fit_dip1 = mplstereonet.fit_girdle(total_dipdir, total_dip)
-        fit_strike2, fit_dip2 = mplstereonet.fit_pole(total_dipdir, total_dip)
-        fit_strike3, fit_dip3 = mplstereonet.analysis._sd_of_eigenvector(
-                                                   [total_dipdir, total_dip], 1)
+        self.eigenvector_worker.submit(np.concatenate(trend),
+                                       np.concatenate(plunge),
+                                       self.add_eigenvector_layers)
+        self.statbar.push(1, "Calculating eigenvectors")
 
+    def add_eigenvector_layers(self, values, vector_trend, vector_plunge,
+                               cones):
+        # pylint: disable=unused-argument
+        """
+        Adds the eigenvectors and their confidence cones as new layers.
+
+        Called by the EigenvectorWorker in the main thread, when the analysis
+        that was started by the toolbutton is done.
+        """
         store = self.add_layer_dataset("line")
-        self.add_linear_feature(store, fit_strike1 + 180, 90 - fit_dip1)
-        self.add_linear_feature(store, fit_strike2 + 180, 90 - fit_dip2)
-        self.add_linear_feature(store, fit_strike3 + 180, 90 - fit_dip3)
-        self.redraw_plot()
+        for vector_dir, vector_dip in zip(vector_trend, vector_plunge):
+            self.add_linear_feature(store, vector_dir, vector_dip)
+        store = self.add_layer_dataset("smallcircle")
+        for vector_dir, vector_dip, cone in zip(vector_trend, vector_plunge,
+                                                cones):
+            self.add_smallcircle_feature(store, vector_dir, vector_dip, cone)
+        self.request_redraw("layer added")
+
+    def on_toolbutton_beta_diagram_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Opens the dialog of the beta diagram.
+
+        Triggered from the GUI. The dialog calls add_beta_diagram with the
+        chosen output.
+        """
+        beta_dialog = BetaDialog(self.add_beta_diagram)
+        beta_dialog.run()
+
+    def add_beta_diagram(self, as_lines, max_pairs):
+        """
+        Adds the beta diagram of the selected plane- and faultplane-layers.
+
+        The beta diagram holds the intersections of all pairs of the
+        selected planes. If as_lines is True the intersections are added as
+        a new linear layer; above max_pairs pairs a random subsample is used.
+        Otherwise a new plane-layer with the selected planes is added, which
+        hides its great circles and poles and contours the intersections.
+        Its density is summed from chunks of intersections, so they are
+        never stored.
+        """
+        layers = [layer_obj for layer_obj in self.get_selected_layers()
+                  if layer_obj.get_layer_type() in ("plane", "faultplane")]
+        dipdir, dip = self.get_layer_orientations(layers)
+        if len(dipdir) < 2:
+            self.statbar.push(1, "Select at least two planes")
+            return
+
+        if as_lines == True:
+            trend, plunge = beta_lines(dipdir, dip, max_pairs)
+            self.add_analysis_layer("line", trend, plunge)
+            return
+
+        text = np.empty(len(dipdir), dtype=object)
+        text.fill("")
+        layer_obj = self.create_layer("plane", self.get_new_layer_parent())
+        layer_obj.set_label("Beta diagram")
+        layer_obj.set_render_gcircles(False)
+        layer_obj.set_render_poles(False)
+        layer_obj.set_draw_contour_fills(True)
+        layer_obj.set_contour_beta(True)
+        layer_obj.append_data_arrays([dipdir, dip, text])
+        self.request_redraw("layer added")
+
+    def on_toolbutton_cluster_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Opens the dialog that splits the selected layer into sets.
+
+        Triggered from the GUI. The dialog calls split_layer_into_sets with
+        the number of sets and restarts.
+        """
+        cluster_dialog = ClusterDialog(self.split_layer_into_sets)
+        cluster_dialog.run()
+
+    def split_layer_into_sets(self, sets, restarts):
+        """
+        Splits the selected layer into sets of similar orientation.
+
+        One plane-, faultplane- or line-layer has to be selected. Its
+        measurements (linears, or the poles of planes) are clustered with an
+        axial spherical k-means and each set is added as a new layer of the
+        same type, beginning with the largest set. The restarts of the
+        clustering run in the shared pool of processes.
+        """
+        layers = self.get_selected_layers()
+        if len(layers) != 1 or \
+                layers[0].get_layer_type() not in ("plane", "faultplane",
+                                                   "line"):
+            self.statbar.push(1, "Select one plane- or line-layer to split")
+            return
+
+        layer_obj = layers[0]
+        layer_type = layer_obj.get_layer_type()
+        try:
+            labels, centers = cluster_orientations(
+                                    layer_obj.get_unit_vectors(), sets,
+                                    restarts, executor=get_process_pool())
+        except ValueError as error:
+            self.statbar.push(1, str(error))
+            return
+
+        columns = layer_obj.get_data_columns()
+        arrays = [columns.get_column(k)
+                  for k in range(len(layer_obj.column_types))]
+        for k in range(sets):
+            selected = labels == k
+            self.add_layer_dataset(layer_type,
+                                   [column[selected] for column in arrays],
+                                   "{0} (set {1})".format(
+                                       layer_obj.get_label(), k + 1))
+        self.request_redraw("layer added")
 
     def on_toolbutton_new_project_clicked(self, widget):
         # pylint: disable=unused-argument
@@ -210,53 +367,326 @@ class MainWindow(object):
         """
         Copies the poles of a plane-layer into a new line-layer.
 
-        Checks if selected layers are planes or faultplanes. Copies the
-        dip-direction - dip data into a line-dataset. If many layers are
-        selected the data will be merged into one layer.
+        Checks if selected layers are planes or faultplanes. Converts the
+        dip-direction - dip data into poles and appends them to a new
+        line-dataset at once. If many layers are selected the data will be
+        merged into one layer.
         """
-        selection = self.layer_view.get_selection()
-        model, row_list = selection.get_selected_rows()
+        layers = self.get_selected_layers()
+        if len(layers) == 0 or not all(layer_obj.get_layer_type() in
+                                       ("plane", "faultplane")
+                                       for layer_obj in layers):
+            return
 
-        def iterate_over_data(model, path, itr, n):
-            """
-            Copies data to new layer.
+        trend, plunge = plane_poles(*self.get_layer_orientations(layers))
+        self.add_analysis_layer("line", trend, plunge)
 
-            Receives a model, path and itr of a layer, plus the datastore
-            of the new layer. Converts the plane orientation into a pole
-            orientation and adds it to the new layer.
-            """
-            r = model[path]
-            self.add_linear_feature(n, 180 + r[0], 90 - r[1])
+    def on_toolbutton_save_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Triggered from the GUI. Saves the project.
 
-        for row in row_list:
-            layer_obj = model[row][3]
+        If the project has not been saved or opened before, the dialog for
+        choosing a file is shown first.
+        """
+        if self.project_file is None:
+            fc = FileChooserProject("filechooserdialog_save_project",
+                                    self.save_project_file)
+            fc.run()
+        else:
+            self.save_project_file(self.project_file)
+
+    def on_menuitem_save_activate(self, widget):
+        """
+        Triggered when the user clicks "File -> Save" in the MenuBar.
+        """
+        self.on_toolbutton_save_clicked(widget)
 
+    def on_menuitem_save_as_activate(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Saves the project in a new file.
+
+        Triggered when the user clicks "File -> Save As" in the MenuBar.
+        """
+        fc = FileChooserProject("filechooserdialog_save_project",
+                                self.save_project_file)
+        fc.run()
+
+    def on_toolbutton_open_project_clicked(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Triggered from the GUI. Opens the dialog for opening a project.
+        """
+        fc = FileChooserProject("filechooserdialog_open_project",
+                                self.open_project_file)
+        fc.run()
+
+    def on_menuitem_open_activate(self, widget):
+        """
+        Triggered when the user clicks "File -> Open" in the MenuBar.
+        """
+        self.on_toolbutton_open_project_clicked(widget)
+
+    def get_project_tree(self, itr=None, with_data=True):
+        """
+        Returns the layers below itr as a list of nodes for save_project.
+
+        The whole layer tree is returned if itr is None. The columns of each
+        layer are a snapshot of its data columns, so they can also be saved
+        in the background. If with_data is False, only the structure of the
+        tree is returned, without styles and columns.
+        """
+        nodes = []
+        child = self.layer_store.iter_children(itr)
+        while child is not None:
+            row = self.layer_store[child]
+            layer_obj = row[3]
             if layer_obj is None:
-                return
+                nodes.append({"kind": "group", "label": row[2],
+                              "visible": row[0],
+                              "children": self.get_project_tree(child,
+                                                                with_data)})
+            else:
+                node = {"kind": "layer", "label": row[2], "visible": row[0],
+                        "layer_type": layer_obj.get_layer_type(),
+                        "id": layer_obj.layer_id}
+                if with_data == True:
+                    node["style"] = layer_obj.get_style_dict()
+                    node["columns"] = layer_obj.get_data_columns().snapshot()
+                nodes.append(node)
+            child = self.layer_store.iter_next(child)
+        return nodes
+
+    def save_project_file(self, project_file):
+        """
+        Saves the layers and plot settings in a project file.
+
+        The extension is added if the chosen file name has none. A running
+        compaction of the journal is waited for first. The recovery project
+        of an untitled window is no longer needed once it is saved.
+        """
+        if os.path.splitext(project_file)[1] == "":
+            project_file += PROJECT_EXTENSION
+        if self.journal is not None:
+            self.journal.flush()
+        save_project(project_file, self.get_project_tree(),
+                     self.settings.get_settings_dict())
+        self.project_file = project_file
+        if self.journal is None or \
+                        self.journal.path != journal_path(project_file):
+            self.start_journal(project_file)
+            self.remove_recovery()
+        self.journal.reset()
+        self.statbar.push(1, "Saved {0}".format(project_file))
+
+    def load_project_tree(self, archive, nodes, itr):
+        """
+        Appends the nodes of a project to the layer tree below itr.
+
+        The layers only receive a data loader, so their columns are read from
+        the archive the first time they are used.
+        """
+        for node in nodes:
+            if node["kind"] == "group":
+                group_itr = self.layer_store.append(itr,
+                    [node["visible"], self.settings.get_folder_icon(),
+                     node["label"], None])
+                self.load_project_tree(archive, node["children"], group_itr)
             else:
-                layer_type = layer_obj.get_layer_type()
+                layer_obj = self.create_layer(node["layer_type"], itr,
+                                              node["label"])
+                layer_obj.layer_id = node.get("id", layer_obj.layer_id)
+                layer_obj.set_style_dict(node["style"])
+                layer_obj.set_data_loader(
+                    functools.partial(archive.read_columns, node["columns"]))
+                layer_itr = self.layer_store.iter_nth_child(itr,
+                                self.layer_store.iter_n_children(itr) - 1)
+                self.layer_store[layer_itr][0] = node["visible"]
+
+    def open_project_file(self, project_file):
+        """
+        Replaces the layers and plot settings with those of a project file.
+        """
+        archive = ProjectArchive(project_file)
+        self.stop_journal()
+        self.remove_recovery()
+        self.layer_view.get_selection().unselect_all()
+        self.layer_store.clear()
+        self.settings.set_settings_dict(archive.get_settings())
+        self.load_project_tree(archive, archive.get_layer_tree(), None)
+        self.project_file = project_file
+
+        entries = read_journal(journal_path(project_file))
+        if len(entries) > 0:
+            self.replay_journal(entries)
+            self.save_project_file(project_file)
+            self.statbar.push(1, "Recovered {0} edits".format(len(entries)))
+        else:
+            self.start_journal(project_file)
+        self.request_redraw("project opened", checkout_canvas=True)
 
-            if layer_type == "line":
-                return
+    def start_recovery(self):
+        """
+        Records the edits of the untitled project in a recovery project.
 
-        #n = new datastore
-        n = self.add_layer_dataset("line")
+        A project that was never saved has no file for its journal, so the
+        journal belongs to a recovery project in the recovery directory. If
+        a program crashed before, the newest recovery project it left behind
+        is taken over and its journal is replayed.
+        """
+        directory = recovery_directory()
+        leftovers = find_recovery_projects(directory)
+        if len(leftovers) == 0:
+            self.recovery_file = new_recovery_path(directory)
+            self.start_journal(self.recovery_file)
+            return
 
-        for row in row_list:
-            layer_obj = model[row][3]
-            datastore = layer_obj.get_data_treestore()
-            datastore.foreach(iterate_over_data, n)
+        self.recovery_file = claim_recovery_project(leftovers[0], directory)
+        if os.path.exists(self.recovery_file):
+            archive = ProjectArchive(self.recovery_file)
+            self.settings.set_settings_dict(archive.get_settings())
+            self.load_project_tree(archive, archive.get_layer_tree(), None)
+        entries = read_journal(journal_path(self.recovery_file))
+        self.replay_journal(entries)
+        self.start_journal(self.recovery_file)
+        self.statbar.push(1, "Recovered the unsaved project")
 
-        self.redraw_plot()
+    def remove_recovery(self):
+        """
+        Deletes the recovery project of the window, if it has one.
 
-    def on_toolbutton_save_clicked(self, widget):
+        The journal has to be stopped before, or belong to a project file.
+        """
+        if self.recovery_file is None:
+            return
+        remove_recovery_project(self.recovery_file)
+        self.recovery_file = None
+
+    def get_layers(self):
+        """
+        Returns a list of all layer objects in the layer-treestore.
+        """
+        layers = []
+
+        def collect_layer(model, path, itr, data):
+            # pylint: disable=unused-argument
+            if model[itr][3] is not None:
+                layers.append(model[itr][3])
+
+        self.layer_store.foreach(collect_layer, None)
+        return layers
+
+    def start_journal(self, project_file):
+        """
+        Starts recording the edits of the project in a new journal.
+
+        The journal belongs to the project file and is emptied each time the
+        project is saved. All layers record their edits in it.
+        """
+        self.stop_journal()
+        self.journal = EditJournal(journal_path(project_file))
+        for layer_obj in self.get_layers():
+            layer_obj.set_journal(self.journal)
+        self.recorded_tree = self.get_project_tree(with_data=False)
+
+    def stop_journal(self):
+        """
+        Writes the remaining edits and stops recording them.
+
+        The journal file is kept, so the edits since the last save are
+        recovered when the project is opened the next time.
+        """
+        if self.journal is None:
+            return
+        self.journal.close()
+        self.journal = None
+        for layer_obj in self.get_layers():
+            layer_obj.set_journal(None)
+
+    def on_layer_tree_changed(self, *args):
         # pylint: disable=unused-argument
         """
-        Triggered from the GUI. Saves the project.
+        Schedules recording the layer tree when a row of it changes.
 
-        __!!__ Save function is not implemented yet.
+        Adding a layer changes several rows in a row, so the tree is only
+        recorded once the Gtk main loop is idle.
         """
-        pass
+        if self.journal is None or self.tree_record_pending == True:
+            return
+        self.tree_record_pending = True
+        GLib.idle_add(self.record_layer_tree)
+
+    def record_layer_tree(self):
+        """
+        Records the structure of the layer tree in the journal.
+
+        The entry holds the groups, the order, the labels and the visibility
+        of the layers, but not their data, and is only recorded if the tree
+        changed. Returns False so the idle-source is removed.
+        """
+        self.tree_record_pending = False
+        if self.journal is None:
+            return False
+        tree = self.get_project_tree(with_data=False)
+        if tree != self.recorded_tree:
+            self.journal.record({"op": "tree", "layers": tree})
+            self.recorded_tree = tree
+        return False
+
+    def replay_journal(self, entries):
+        """
+        Repeats the edits of a journal on top of the opened project.
+
+        New layers are created as they were recorded and the other entries
+        are passed to the layer they belong to (see replay_entries). The
+        last recorded layer tree is then rebuilt from the layers.
+        """
+        layers = {layer_obj.layer_id: layer_obj
+                  for layer_obj in self.get_layers()}
+        tree = replay_entries(entries, layers, self.new_layer)
+        if tree is not None:
+            self.layer_store.clear()
+            self.apply_layer_tree(tree, layers, None)
+
+    def apply_layer_tree(self, nodes, layers, itr):
+        """
+        Appends the nodes of a recorded layer tree below itr.
+
+        Expects a dictionary of the layer objects by their id.
+        """
+        for node in nodes:
+            if node["kind"] == "group":
+                group_itr = self.layer_store.append(itr,
+                    [node["visible"], self.settings.get_folder_icon(),
+                     node["label"], None])
+                self.apply_layer_tree(node["children"], layers, group_itr)
+            elif node["id"] in layers:
+                layer_obj = layers[node["id"]]
+                self.layer_store.append(itr, [node["visible"],
+                    layer_obj.get_pixbuf(), node["label"], layer_obj])
+
+    def on_journal_timeout(self):
+        """
+        Compacts the journal into the project file when it grows large.
+
+        Is called by a GLib-timeout every minute. Only a snapshot of the
+        layer tree is taken here (see get_project_tree). The project file is
+        written by the writer thread of the journal, which then empties the
+        journal. Untitled projects are compacted into their recovery
+        project. Returns True so the timeout keeps running.
+        """
+        if self.journal is None:
+            return True
+        error = self.journal.get_compact_error()
+        if error is not None:
+            self.statbar.push(1, "Autosave failed: {0}".format(error))
+        if self.journal.get_size() > COMPACT_JOURNAL_SIZE:
+            project_file = self.project_file or self.recovery_file
+            self.journal.compact(functools.partial(save_project,
+                                    project_file, self.get_project_tree(),
+                                    self.settings.get_settings_dict()))
+        return True
 
     def on_toolbutton_show_table_clicked(self, widget):
         # pylint: disable=unused-argument
@@ -285,7 +715,7 @@ class MainWindow(object):
             model.remove(itr)
 
         selection.unselect_all()
-        self.redraw_plot()
+        self.request_redraw("layer deleted")
 
     def on_toolbutton_plot_properties_clicked(self, widget):
         # pylint: disable=unused-argument
@@ -295,7 +725,8 @@ class MainWindow(object):
         Triggered when the toolbutton is pressed. Creates and instance of the
         StereonetProperties class, which is a Gtk DialogWindow and runs it.
         """
-        plot_properties = StereonetProperties(self.settings, self.redraw_plot)
+        plot_properties = StereonetProperties(self.settings,
+                                             self.request_redraw)
         plot_properties.run()
 
     def on_toolbutton_print_figure_clicked(self, widget):
@@ -316,10 +747,14 @@ class MainWindow(object):
         Opens a dialog to save the figure specified location and file-format.
 
         Opens the matplotlib dialog window that allows saving the current figure
-        in a specified location, name and file format.
+        in a specified location, name and file format. The toolbar that
+        provides the dialog is created once and reused for later saves.
         """
-        nav = NavigationToolbar(self.canvas, self.main_window)
-        nav.save_figure()
+        self.redraw_scheduler.flush()
+        if self.save_toolbar is None:
+            self.save_toolbar = NavigationToolbar(self.canvas,
+                                                  self.main_window)
+        self.save_toolbar.save_figure()
 
     def layer_view_clicked(self, treeview, button):
         # pylint: disable=unused-argument
@@ -351,39 +786,23 @@ class MainWindow(object):
         """
         Finds the optimal plane for a set of linears.
 
-        Iterates over all selected rows and collects the data. Finds the
-        optimal plane that can be fitted to the data.
+        Collects the data of all selected linear layers. Finds the optimal
+        plane that can be fitted to the data and adds it as a new plane
+        layer.
         """
-        selection = self.layer_view.get_selection()
-        model, row_list = selection.get_selected_rows()
-
-        #Check if all selected layers are planes or faultplanes.
-        only_linears = True
-        for row in row_list:
-            layer_obj = model[row][3]
-            if layer_obj.get_layer_type() == "plane":
-                only_linears = False
-
-        if only_linears is False:
+        layers = self.get_selected_layers()
+        if len(layers) == 0 or not all(layer_obj.get_layer_type() == "line"
+                                       for layer_obj in layers):
             return
 
-        total_dipdir = []
-        total_dip = []
-        for row in row_list:
-            layer_obj = model[row][3]
-            dipdir, dip, sense = self.parse_lines(
-                                            layer_obj.get_data_treestore())
-            for x in dipdir:
-                total_dipdir.append(x)
-            for y in dip:
-                total_dip.append(y)
-
-        fit_strike, fit_dip = mplstereonet.fit_girdle(total_dip, total_dipdir,
-                                measurement="lines")
+        trend, plunge = self.get_layer_orientations(layers)
+        if len(trend) == 0:
+            return
+        fit_dipdir, fit_dip = best_fit_plane(trend, plunge)
 
         store = self.add_layer_dataset("plane")
-        self.add_planar_feature(store, fit_strike + 90, fit_dip)
-        self.redraw_plot()
+        self.add_planar_feature(store, fit_dipdir, fit_dip)
+        self.request_redraw("layer added")
 
     def on_toolbutton_plane_intersect_clicked(self, widget):
         # pylint: disable=unused-argument
@@ -394,42 +813,20 @@ class MainWindow(object):
         layers. If linear layers are also selected nothing will be done.
         The best-fit intersection is added to the project as a new linear layer.
         """
-        selection = self.layer_view.get_selection()
-        model, row_list = selection.get_selected_rows()
-
-        if len(row_list) == 0:
+        layers = self.get_selected_layers()
+        if len(layers) == 0 or not all(layer_obj.get_layer_type() in
+                                       ("plane", "faultplane")
+                                       for layer_obj in layers):
             return
 
-        #Check if all selected layers are planes or faultplanes.
-        only_planes = True
-        for row in row_list:
-            layer_obj = model[row][3]
-            if layer_obj.get_layer_type() == "line":
-                only_planes = False
-
-        if only_planes is False:
+        dipdir, dip = self.get_layer_orientations(layers)
+        if len(dipdir) == 0:
             return
-
-        total_dipdir = []
-        total_dip = []
-
-        #Iterate over layers and rows, gather poles
-        for row in row_list:
-            layer_obj = model[row][3]
-            strike, dipdir, dip = self.parse_planes(
-                                            layer_obj.get_data_treestore())
-            for x in strike:
-                total_dipdir.append(270 + x)
-            for y in dip:
-                total_dip.append(90 - y)
-        
-        self.ax_stereo.line(total_dip, total_dipdir)
-        fit_strike, fit_dip = mplstereonet.fit_girdle(total_dip, total_dipdir,
-                                measurement="lines")
+        fit_dir, fit_dip = plane_intersection(dipdir, dip)
 
         store = self.add_layer_dataset("line")
-        self.add_linear_feature(store, fit_strike + 270, 90 - fit_dip)
-        self.redraw_plot()
+        self.add_linear_feature(store, fit_dir, fit_dip)
+        self.request_redraw("layer added")
 
     def on_toolbutton_linears_to_planes_clicked(self, toolbutton):
         # pylint: disable=unused-argument
@@ -440,34 +837,52 @@ class MainWindow(object):
         layers and adds them as a new plane dataset. This can be used to
         calculate the cross-section plane of a set of fold axis.
         """
-        selection = self.layer_view.get_selection()
-        model, row_list = selection.get_selected_rows()
-
-        if len(row_list) == 0:
+        layers = self.get_selected_layers()
+        if len(layers) == 0 or not all(layer_obj.get_layer_type() == "line"
+                                       for layer_obj in layers):
             return
 
-        #Check if all selected layers are linear layers.
-        only_lines = True
-        for row in row_list:
-            layer_obj = model[row][3]
-            if layer_obj.get_layer_type() == "plane":
-                only_lines = False
-            elif layer_obj.get_layer_type() == "faultplane":
-                only_lines = False
+        dipdir, dip = normal_planes(*self.get_layer_orientations(layers))
+        self.add_analysis_layer("plane", dipdir, dip)
 
-        if only_lines is False:
-            return
+    def get_selected_layers(self):
+        """
+        Returns the layer objects of the selected rows.
 
-        store = self.add_layer_dataset("plane")
+        Selected groups are left out.
+        """
+        selection = self.layer_view.get_selection()
+        model, row_list = selection.get_selected_rows()
+        return [model[row][3] for row in row_list
+                if model[row][3] is not None]
 
-        for row in row_list:
-            layer_obj = model[row][3]
-            strike, dipdir, sense = self.parse_lines(
-                                            layer_obj.get_data_treestore())
-            for strike, dipdir in zip(strike, dipdir):
-                self.add_linear_feature(store, strike + 180, 90 - dipdir)
+    def get_layer_orientations(self, layers):
+        """
+        Returns the first two data columns of layers as two arrays.
 
-        self.redraw_plot()
+        These are the dip directions and dips of planes, or the trends and
+        plunges of linears. The columns of several layers are concatenated.
+        """
+        first = [np.empty(0)]
+        second = [np.empty(0)]
+        for layer_obj in layers:
+            columns = layer_obj.get_data_columns()
+            first.append(columns.get_column(0))
+            second.append(columns.get_column(1))
+        return np.concatenate(first), np.concatenate(second)
+
+    def add_analysis_layer(self, layer_type, dipdir, dip):
+        """
+        Adds a new plane- or line-layer with the results of an analysis.
+
+        The rows are appended to the layer at once. The text column is empty.
+        """
+        layer_obj = self.create_layer(layer_type,
+                                      self.get_new_layer_parent())
+        text = np.empty(len(dipdir), dtype=object)
+        text.fill("")
+        layer_obj.append_data_arrays([dipdir, dip, text])
+        self.request_redraw("layer added")
 
     def layer_row_activated(self, treeview, path, column):
         """
@@ -479,7 +894,7 @@ class MainWindow(object):
         """
         layer_obj = self.layer_store[path][3]
         if layer_obj is not None:
-            layer_prop = LayerProperties(layer_obj, self.redraw_plot)
+            layer_prop = LayerProperties(layer_obj, self.request_redraw)
             layer_prop.run()
 
     def layer_selection_changed(self, selection):
@@ -516,6 +931,24 @@ class MainWindow(object):
                 self.sw_data.remove(child)
             #Add new treeview
             self.main_window.show_all()
+        self.show_statistics()
+
+    def show_statistics(self):
+        """
+        Shows the Fisher statistics of the selected layers in the statusbar.
+
+        Line-layers contribute their linears, plane- and faultplane-layers
+        the poles of their planes, as in the eigenvector analysis. The
+        statistics of each layer are cached for its data version, so after
+        style changes the cached results are only added up again.
+        """
+        #The statistics have their own context, so other messages stay
+        self.statbar.remove_all(2)
+        layers = self.get_selected_layers()
+        if len(layers) == 0:
+            return
+        statistics = self.fisher_cache.get_combined_statistics(layers)
+        self.statbar.push(2, statistics.get_summary())
 
     def on_layer_toggled(self, widget, path):
         # pylint: disable=unused-argument
@@ -524,59 +957,93 @@ class MainWindow(object):
         True (visible) and False (invisible).
         """
         self.layer_store[path][0] = not self.layer_store[path][0]
-        self.redraw_plot()
+        self.request_redraw("layer toggled")
 
-    def add_layer_dataset(self, layer_type):
+    def add_layer_dataset(self, layer_type, arrays=None, label=None):
         """
         Is called by the different "new layer" toolbuttons. If the number of
         selected rows are 0 or more than one, the layer is appended at the end.
         If just one row is selected, and the row is a group, then the new
         layer is created in that group. Otherwise it is added at the end of the
         same level as the selection.
+
+        Tools that create layers from results (e.g. the clustering) can pass
+        the arrays of the columns, which are appended at once, and a label.
         """
-        store = None
-
-        def add_layer(itr):
-            if layer_type == "plane":
-                store = Gtk.ListStore(float, float, str)
-                view = PlaneDataView(store, self.redraw_plot)
-                layer_obj = PlaneLayer(store, view)
-            elif layer_type == "faultplane":
-                store = Gtk.ListStore(float, float, float, float, str)
-                view = FaultPlaneDataView(store, self.redraw_plot)
-                layer_obj = FaultPlaneLayer(store, view)
-            elif layer_type == "line":
-                store = Gtk.ListStore(float, float, str)
-                view = LineDataView(store, self.redraw_plot)
-                layer_obj = LineLayer(store, view)
-            elif layer_type == "smallcircle":
-                store = Gtk.ListStore(float, float, float)
-                view = SmallCircleDataView(store, self.redraw_plot)
-                layer_obj = SmallCircleLayer(store, view)
-
-            pixbuf = layer_obj.get_pixbuf()
-            self.layer_store.append(itr,
-                [True, pixbuf, layer_obj.get_label(), layer_obj])
-            return store
+        layer_obj = self.create_layer(layer_type, self.get_new_layer_parent())
+        if label is not None:
+            layer_obj.set_label(label)
+        if arrays is not None:
+            layer_obj.append_data_arrays(arrays)
+        return layer_obj.get_data_treestore()
 
+    def get_new_layer_parent(self):
+        """
+        Returns the iter of the group in which a new layer is created.
+
+        Returns None (the top level) if no or several rows are selected. If
+        one group is selected, the group is returned. If one layer is
+        selected, the group of that layer is returned.
+        """
         selection = self.layer_view.get_selection()
         model, row_list = selection.get_selected_rows()
 
         rows = len(row_list)
         if rows == 0 or rows > 1:
-            store = add_layer(None)
-        else:
-            #If selected item is group, add to group, else: add to level
-            row = row_list[0]
-            layer_obj = model[row][3]
-            selection_itr = model.get_iter(row_list[0])
-            if layer_obj is None:
-                store = add_layer(selection_itr)
-            else:
-                parent_itr = model.iter_parent(selection_itr)
-                store = add_layer(parent_itr)
+            return None
 
-        return store
+        #If selected item is group, add to group, else: add to level
+        row = row_list[0]
+        layer_obj = model[row][3]
+        selection_itr = model.get_iter(row_list[0])
+        if layer_obj is None:
+            return selection_itr
+        else:
+            return model.iter_parent(selection_itr)
+
+    def new_layer(self, layer_type):
+        """
+        Returns a new layer of the given type with its data store and view.
+
+        The layer is not added to the layer-treestore.
+        """
+        if layer_type == "plane":
+            store = Gtk.ListStore(float, float, str)
+            view = PlaneDataView(store, self.request_redraw)
+            layer_obj = PlaneLayer(store, view)
+        elif layer_type == "faultplane":
+            store = Gtk.ListStore(float, float, float, float, str)
+            view = FaultPlaneDataView(store, self.request_redraw)
+            layer_obj = FaultPlaneLayer(store, view)
+        elif layer_type == "line":
+            store = Gtk.ListStore(float, float, str)
+            view = LineDataView(store, self.request_redraw)
+            layer_obj = LineLayer(store, view)
+        elif layer_type == "smallcircle":
+            store = Gtk.ListStore(float, float, float)
+            view = SmallCircleDataView(store, self.request_redraw)
+            layer_obj = SmallCircleLayer(store, view)
+        return layer_obj
+
+    def create_layer(self, layer_type, itr, label=None):
+        """
+        Creates a new layer and appends it to the layer-treestore.
+
+        The layer is appended as a child of itr, or at the top level if itr
+        is None. If a label is passed, it replaces the default label of the
+        layer. The new layer is recorded in the journal of the project.
+        Returns the new layer object.
+        """
+        layer_obj = self.new_layer(layer_type)
+        if self.journal is not None:
+            layer_obj.set_journal(self.journal)
+            layer_obj.record_edit("create", layer_type=layer_type)
+        if label is not None:
+            layer_obj.set_label(label)
+        pixbuf = layer_obj.get_pixbuf()
+        self.layer_store.append(itr,
+            [True, pixbuf, layer_obj.get_label(), layer_obj])
+        return layer_obj
 
     def on_toolbutton_create_plane_dataset_clicked(self, widget):
         # pylint: disable=unused-argument
@@ -610,367 +1077,70 @@ class MainWindow(object):
         """
         self.add_layer_dataset("smallcircle")
 
-    def parse_planes(self, treestore):
-        """
-        Parses planes and returns a list of strikes, dipdirs and dips.
-
-        Parsing converts from dip direction to strikes.
-        """
-        strike = []
-        dipdir = []
-        dip = []
-        for row in treestore:
-            strike.append(float(row[0]) - 90)
-            dipdir.append(float(row[0]))
-            dip.append(float(row[1]))
-        return strike, dipdir, dip
-
-    def parse_faultplanes(self, treestore):
-        """
-        Parses a faultplane treestore. Converts planes from dip-direction to
-        strikes so they can be plotted.
-        #lp_plane = linear-pole_plane (The great circles that connect the
-        lineation with the pole of the faultplane. Used for Hoeppener-Plots.
-        """
-        strike = []
-        plane_dir = []
-        plane_dip = []
-        line_dir = []
-        line_dip = []
-        sense = []
-        line_sense_dir = []
-        line_sense_dip = []
-        lp_plane_dir = []
-        lp_plane_dip = []
-        for row in treestore:
-            strike.append(float(row[0] - 90))
-            plane_dir.append(float(row[0]))
-            plane_dip.append(float(row[1]))
-            line_dir.append(float(row[2]))
-            line_dip.append(float(row[3]))
-            sense.append(row[4])
-            if row[4] == "up":
-                line_sense_dir.append(float(row[2]) + 180)
-                line_sense_dip.append(90 - float(row[3]))
-            elif row[4] == "dn":
-                line_sense_dir.append(float(row[2]))
-                line_sense_dip.append(float(row[3]))
-            fit_strike, fit_dip = mplstereonet.fit_girdle(
-                                [float(row[3]), 90 - float(row[1])],
-                                [float(row[2]), float(row[0]) + 180],
-                                measurement="lines")
-            lp_plane_dir.append(fit_strike)
-            lp_plane_dip.append(fit_dip)
-        return strike, plane_dir, plane_dip, line_dir, line_dip, sense, \
-               line_sense_dir, line_sense_dip, lp_plane_dir, lp_plane_dip
-
-    def parse_lines(self, treestore):
-        """
-        Parses linear data with the 3 columns dip direction, dip and sense.
-        Returns a python-list for each column.
-        """
-        line_dir = []
-        line_dip = []
-        sense = []
-        for row in treestore:
-            line_dir.append(float(row[0]))
-            line_dip.append(float(row[1]))
-            sense.append(row[2])
-        return line_dir, line_dip, sense
-
-    def parse_smallcircles(self, treestore):
-        """
-        Parses small circle data. Data has 3 columns: Dip direction, dip and
-        opening angle.
-        """
-        line_dir = []
-        line_dip = []
-        angle = []
-        for row in treestore:
-            line_dir.append(float(row[0]))
-            line_dip.append(float(row[1]))
-            angle.append(float(row[2]))
-        return line_dir, line_dip, angle
-
-    def draw_plane(self, layer_obj, dipdir, dip):
-        """
-        Function draws a great circle in the stereonet. It calls the formatting
-        from the layer object.
-        """
-        self.ax_stereo.plane(dipdir, dip, color=layer_obj.get_line_color(),
-                    label=layer_obj.get_label(),
-                    linewidth=layer_obj.get_line_width(),
-                    linestyle=layer_obj.get_line_style(),
-                    dash_capstyle=layer_obj.get_capstyle(),
-                    alpha=layer_obj.get_line_alpha(), clip_on=False)
-
-    def draw_line(self, layer_obj, dipdir, dip):
-        """
-        Function draws a linear element in the stereonet. It calls the
-        formatting from the layer object.
-        """
-        #ax.line takes dip first and then dipdir (as strike)
-        self.ax_stereo.line(dip, dipdir, marker=layer_obj.get_marker_style(),
-                    markersize=layer_obj.get_marker_size(),
-                    color=layer_obj.get_marker_fill(),
-                    label=layer_obj.get_label(),
-                    markeredgewidth=layer_obj.get_marker_edge_width(),
-                    markeredgecolor=layer_obj.get_marker_edge_color(),
-                    alpha=layer_obj.get_marker_alpha(), clip_on=False)
-
-    def draw_smallcircles(self, layer_obj, dipdir, dip, angle):
-        """
-        Function draws small circles in the stereonet. It calls the formatting
-        from the layer object.
-        """
-        #ax.cone takes dip first and then dipdir!
-        #facecolor needs to be "None" because there is a bug with which side to fill
-        #Is not added to the legend yet. Matplotlib bug?
-        self.ax_stereo.cone(dip, dipdir, angle, facecolor="None",
-                    color=layer_obj.get_line_color(),
-                    linewidth=layer_obj.get_line_width(),
-                    label=layer_obj.get_label(),
-                    linestyle=layer_obj.get_line_style())
-
-    def draw_poles(self, layer_obj, dipdir, dip):
-        """
-        Function draws a plane pole in the stereonet. It calls the formatting
-        from the layer object.
-        """
-        self.ax_stereo.pole(dipdir, dip, marker=layer_obj.get_pole_style(),
-                    markersize=layer_obj.get_pole_size(),
-                    color=layer_obj.get_pole_fill(),
-                    label="Poles of {0}".format(layer_obj.get_label()),
-                    markeredgewidth=layer_obj.get_pole_edge_width(),
-                    markeredgecolor=layer_obj.get_pole_edge_color(),
-                    alpha=layer_obj.get_pole_alpha(), clip_on=False)
-
-    def draw_contours(self, layer_obj, dipdir, dips, measure_type):
-        """
-        MplStereonet accepts measurements as "poles" for planes and
-        "lines" for linear measurements.
+    def on_stress_error(self, layer_obj, error):
         """
-        if len(dipdir) == 0:
-            return None
+        Reports a stress inversion that failed.
 
-        #Implement hatches = (['-', '+', 'x', '\\', '*', 'o', 'O', '.'])
-        if layer_obj.get_draw_contour_fills() == True:
-            cbar = self.ax_stereo.density_contourf(dipdir, dips,
-                              measurement=measure_type,
-                              method = layer_obj.get_contour_method(),
-                              gridsize = layer_obj.get_contour_resolution(),
-                              cmap = layer_obj.get_colormap(),
-                              sigma = layer_obj.get_contour_sigma())
-        else:
-            cbar = None
-
-        if layer_obj.get_draw_contour_lines() == True:
-            if layer_obj.get_use_line_color() == True:
-                clines = self.ax_stereo.density_contour(dipdir, dips,
-                                measurement=measure_type,
-                                method = layer_obj.get_contour_method(),
-                                gridsize = layer_obj.get_contour_resolution(),
-                                sigma = layer_obj.get_contour_sigma(),
-                                colors = layer_obj.get_contour_line_color(),
-                                linewidths = layer_obj.get_contour_line_width(),
-                                linestyles = layer_obj.get_contour_line_style())
-            else:
-                clines = self.ax_stereo.density_contour(dipdir, dips,
-                                measurement=measure_type,
-                                method = layer_obj.get_contour_method(),
-                                gridsize = layer_obj.get_contour_resolution(),
-                                sigma = layer_obj.get_contour_sigma(),
-                                cmap = layer_obj.get_colormap(),
-                                linewidths = layer_obj.get_contour_line_width(),
-                                linestyles = layer_obj.get_contour_line_style())                
-
-        if layer_obj.get_draw_contour_labels() == True:
-            if clines is not None:
-                self.ax_stereo.clabel(clines,
-                                fontsize = layer_obj.get_contour_label_size())
-
-        return cbar
-
-    def draw_hoeppener(self, layer_obj, plane_dir, plane_dip, line_dir,
-                        line_dip, lp_plane_dir, lp_plane_dip, sense):
-        """
-        Receives data from a faultplane and draws a Hoeppener arrow.
-
-        Triggered by the redraw_plot function.
-        Receives a plane (direction and dip), linear (direction and dip), and
-        the plane that connects them to each other (direction and dip). Finds
-        the closest index to the pole on the pole-linear-plane and uses that
-        index as the center of the arrow. The arrow connects the two points on
-        the pole-linear-plane that lie f = 2 indexes in either direction. The
-        length is corrected if it obviously crosses the stereonet (length > 1).
-        Then the start and end direction is determined by the shear sense. If
-        the datapoint has no shear sense no arrow is drawn. Unknown shear sense
-        is just a line. The arrow direction is determined like this:
-        -------------
-        "up" (overthrust) Arrow should point away from equator.
-        "dn" (downthrust) Arrow should point towards the equator.
-        "sin" (sinistral strike-slip) Arrows should point left.
-        "dex" (dextral strike-slip) Arrows should point right.
-        __!!__ Still has a bug. Some orientations are wrong!
-        """
-        if len(line_dir) == 0:
-            return
+        Called by the StressWorker in the main thread. The stress axes of the
+        layer are not drawn, so the error is shown in the statusbar.
+        """
+        self.statbar.push(1, "Could not invert the stress of {0}: {1}".format(
+                                               layer_obj.get_label(), error))
 
-        def find_nearest_point(plane_stack, point):
-            """
-            Finds the closest index to the pole on the pole-linear-plane.
+    def on_eigenvector_error(self, error):
+        """
+        Reports an eigenvector analysis that failed.
 
-            The pole lies on the pole-linear plane. The index that is closest to
-            this point is returned and further used as the center of the arrow.
-            """
-            tree = scipy.spatial.cKDTree(plane_stack)
-            dist, index = tree.query(point)
-            return index
-
-        for k, x in enumerate(plane_dir):
-            plane_lons, plane_lats = mplstereonet.plane(lp_plane_dir[k],
-                                                        lp_plane_dip[k])
-            line_lons, line_lats = mplstereonet.pole(plane_dir[k] - 90,
-                                                     plane_dip[k])
-            plane_stack = np.dstack([plane_lons.ravel(), plane_lats.ravel()])[0]
-            point = np.array([line_lons, line_lats]).transpose()
-            i = find_nearest_point(plane_stack, point)
-
-            #This solution works well for short arrows. Longer arrows bypass
-            #the pole point. If length of arrow is a concern this needs to be
-            #redone in a different way.
-            f = 2
-
-            lon_start = plane_lons[i-f][0][0]
-            lat_start = plane_lats[i-f][0][0]
-            lon_end = plane_lons[i+f][0][0]
-            lat_end = plane_lats[i+f][0][0]
-            dlon = lon_end - lon_start
-            dlat = lat_end - lat_start
-            
-            #If the arrow crosses the stereonet, the arrow is moved so long
-            #until the closer point touches the edge of the stereonet
-            c = 0
-            while dlon > 1 or dlat > 1:
-                c = c + 1
-                if abs(lon_start) > abs(lon_end) or abs(lat_start) > (lat_end):
-                    lon_start = plane_lons[i-f+c][0][0]
-                    lat_start = plane_lats[i-f+c][0][0]
-                    lon_end = plane_lons[i+f+c][0][0]
-                    lat_end = plane_lats[i+f+c][0][0]
-                else:
-                    lon_start = plane_lons[i-f-c][0][0]
-                    lat_start = plane_lats[i-f-c][0][0]
-                    lon_end = plane_lons[i+f-c][0][0]
-                    lat_end = plane_lats[i+f-c][0][0]
-                
-                dlon = lon_end - lon_start
-                dlat = lat_end - lat_start
-
-            #Correct the direction of the arrow
-            if sense[k] == "up":
-                if abs(lon_start) > abs(lon_end):
-                    lon_start, lon_end = lon_end, lon_start
-                    lat_start, lat_end = lat_end, lat_start
-
-            elif sense[k] == "dn":
-                if abs(lon_start) < abs(lon_end):
-                    lon_start, lon_end = lon_end, lon_start
-                    lat_start, lat_end = lat_end, lat_start
-
-            elif sense[k] == "sin":
-                if lon_start > lon_end:
-                    lon_start, lon_end = lon_end, lon_start
-                    lat_start, lat_end = lat_end, lat_start
-
-            elif sense[k] == "dex":
-                if lon_start < lon_end:
-                    lon_start, lon_end = lon_end, lon_start
-                    lat_start, lat_end = lat_end, lat_start
-
-            #Draw line for "uk", nothing for "" and arrow for everything else
-            #__!!__ The arrows direction might not be determined by
-            #xy = start and xytext = end
-            if sense[k] == "uk":
-                self.ax_stereo.annotate("", xy = (lon_end, lat_end),
-                                        xytext = (lon_start, lat_start),
-                                        xycoords = "data",
-                                        textcoords = "data",
-                                        arrowprops = dict(arrowstyle = "-",
-                                                      connectionstyle = "arc3"))
-            elif sense[k] == "":
-                pass
-            else:
-                self.ax_stereo.annotate("", xy = (lon_end, lat_end),
-                                        xytext = (lon_start, lat_start),
-                                        xycoords = "data",
-                                        textcoords = "data",
-                                        arrowprops = dict(arrowstyle = "->",
-                                                      connectionstyle = "arc3"))
+        Called by the EigenvectorWorker in the main thread.
+        """
+        self.statbar.push(1, "Could not calculate the eigenvectors: "
+                             "{0}".format(error))
+
+    def on_density_error(self, layer_obj, error):
+        """
+        Reports a density grid that could not be estimated.
+
+        Called by the DensityWorker in the main thread. The contours of the
+        layer are not drawn, so the error is shown in the statusbar.
+        """
+        self.statbar.push(1, "Could not contour {0}: {1}".format(
+                                            layer_obj.get_label(), error))
+
+    def request_redraw(self, reason="", checkout_canvas=False):
+        """
+        Requests a redraw of the plot once the Gtk main loop is idle.
+
+        Handlers call this method instead of redrawing the plot directly. The
+        RedrawScheduler collapses all requests that arrive in a burst (e.g.
+        tabbing through a row of the data-view) into a single call of the
+        redraw_plot-method. The reason is a short description of the change.
+        """
+        self.redraw_scheduler.request_redraw(reason, checkout_canvas)
 
     def redraw_plot(self, checkout_canvas = False):
         """
         This function is called after any changes to the datasets or when
-        adding or deleting layer. The plot is cleared and then redrawn.
+        adding or deleting layer. Only the layers that changed are redrawn.
+
+        The visible layers are collected from the layer-view and passed to
+        the draw_layers-method, which only draws the layers whose data or
+        style changed. When the view is changed, or the plot settings require
+        a new canvas, the axes are created again and all layers are drawn.
+        The canvas is drawn with draw_idle. Handlers should not call this
+        method directly but use request_redraw.
         layer[3] = layer object
         """
         if self.view_changed == True or checkout_canvas == True:
             self.view_changed = False
-            if self.view_mode == "stereonet":
-                self.inv = self.settings.get_inverse_transform()
-                self.ax_stereo = self.settings.get_stereonet()
-            elif self.view_mode == "stereo_rose":
-                self.inv = self.settings.get_inverse_transform()
-                self.ax_stereo, self.ax_rose = self.settings.get_stereo_rose()
-            elif self.view_mode == "rose":
-                self.inv = self.settings.get_inverse_transform()
-                self.ax_rose = self.settings.get_rose_diagram()
-            elif self.view_mode == "pt":
-                self.inv = self.settings.get_inverse_transform()
-                self.ax_stereo, self.ax_fluc, self.ax_mohr = (
-                                            self.settings.get_pt_view())
-
-        if self.view_mode == "stereonet":
-            self.ax_stereo.cla()
-        elif self.view_mode == "stereo_rose":
-            self.ax_rose.cla()
-            self.ax_stereo.cla()
-        elif self.view_mode == "rose":
-            self.ax_rose.cla()
-        elif self.view_mode == "pt":
-            self.ax_stereo.cla()
-            self.ax_fluc.cla()
-            self.ax_mohr.cla()
-
-        if self.settings.get_draw_grid_state() == True:
-            self.ax_stereo.grid(linestyle = self.settings.get_grid_linestyle(),
-                                color = self.settings.get_grid_color(),
-                                linewidth = self.settings.get_grid_width())
-
-        if self.settings.get_show_cross() == True:
-            self.ax_stereo.annotate("", xy = (-0.03, 0),
-                                    xytext = (0.03, 0),
-                                    xycoords = "data",
-                                    arrowprops = dict(arrowstyle = "-",
-                                                      connectionstyle = "arc3"))
-            self.ax_stereo.annotate("", xy = (0, -0.03),
-                                    xytext = (0, 0.03),
-                                    xycoords = "data",
-                                    arrowprops = dict(arrowstyle = "-",
-                                                      connectionstyle = "arc3"))
-
-        if self.settings.get_show_north() == True:
-            self.ax_stereo.set_azimuth_ticks([0], labels=['N'])
+            self.create_axes()
 
+        layers = []
         deselected = []
         def iterate_over_rows(model, path, itr):
             layer_obj = model[path][3]
             if layer_obj is not None:
-                layer_type = layer_obj.get_layer_type()
                 model[path][2] = layer_obj.get_label()
                 model[path][1] = layer_obj.get_pixbuf()
-            else:
-                layer_type = "group"
 
             if model[path][0] == False:
                 deselected.append(str(path))
@@ -981,101 +1151,13 @@ class MainWindow(object):
                 if str(path).startswith(d) == True:
                     draw = False
 
-            if draw == False:
-                return
-
-            if layer_type == "plane":
-                strike, dipdir, dip = self.parse_planes(
-                                            layer_obj.get_data_treestore())
-                if layer_obj.get_render_gcircles() == True:
-                    self.draw_plane(layer_obj, strike, dip)
-                if layer_obj.get_render_poles() == True:
-                    self.draw_poles(layer_obj, strike, dip)
-                self.draw_contours(layer_obj, strike, dip, "poles")
-
-                num_bins = 360 / layer_obj.get_rose_spacing()
-                bin_width = 2 * np.pi / num_bins
-                dipdir = np.radians(dipdir)
-                values, bin_edges = np.histogram(dipdir, num_bins,
-                                                     range = (0, 2 * np.pi))
-
-                if self.ax_rose is not None:
-                    self.ax_rose.bar(left = bin_edges[:-1], height = values,
-                                     width = bin_width, alpha = 0.5,
-                                     color = layer_obj.get_line_color(),
-                                     edgecolor = layer_obj.get_pole_edge_color(),
-                                     bottom = layer_obj.get_rose_bottom())
-
-            if layer_type == "faultplane":
-                strike, plane_dir, plane_dip, line_dir, line_dip, \
-                    sense, line_sense_dir, line_sense_dip, \
-                    lp_plane_dir, lp_plane_dip = (
-                        self.parse_faultplanes(layer_obj.get_data_treestore()))
-
-                if layer_obj.get_render_gcircles() == True:
-                    self.draw_plane(layer_obj, strike, plane_dip)
-                if layer_obj.get_render_poles() == True:
-                    self.draw_poles(layer_obj, strike, plane_dip)
-                if layer_obj.get_render_linears() == True:
-                    self.draw_line(layer_obj, line_dir, line_dip)
-                if layer_obj.get_draw_lp_plane() == True:
-                    self.ax_stereo.plane(lp_plane_dir, lp_plane_dip,
-                                         linestyle = "dotted",
-                                         color = "#000000")
-                if layer_obj.get_draw_hoeppener() == True:
-                    self.draw_hoeppener(layer_obj, plane_dir, plane_dip,
-                                        line_dir, line_dip, lp_plane_dir,
-                                        lp_plane_dip, sense)
-
-                if layer_obj.get_render_pole_contours() == True:
-                    self.draw_contours(layer_obj, strike, plane_dip, "poles")
-                else:
-                    self.draw_contours(layer_obj, line_dip, line_dir, "lines")
-
-            if layer_type == "line":
-                dipdir, dip, sense = self.parse_lines(
-                                         layer_obj.get_data_treestore())
-                if layer_obj.get_render_linears() == True:
-                    self.draw_line(layer_obj, dipdir, dip)
-                self.draw_contours(layer_obj, dip, dipdir, "lines")
-
-                num_bins = 360 / layer_obj.get_rose_spacing()
-                bin_width = 2 * np.pi / num_bins
-                dipdir = np.radians(dipdir)
-                values, bin_edges = np.histogram(dipdir, num_bins,
-                                                     range = (0, 2 * np.pi))
-
-                if self.ax_rose is not None:
-                    self.ax_rose.bar(left = bin_edges[:-1], height = values,
-                                     width = bin_width, alpha = 0.5,
-                                     color = layer_obj.get_marker_fill(),
-                                     edgecolor = layer_obj.get_marker_edge_color(),
-                                     bottom = layer_obj.get_rose_bottom())
-
-            if layer_type == "smallcircle":
-                dipdir, dip, angle = self.parse_smallcircles(
-                                        layer_obj.get_data_treestore())
-                self.draw_smallcircles(layer_obj, dipdir, dip, angle)
+            if draw == True and layer_obj is not None:
+                layers.append(layer_obj)
 
         self.layer_store.foreach(iterate_over_rows)
-
-        if self.settings.get_draw_legend() == True:
-            handles, labels = self.ax_stereo.get_legend_handles_labels()
-            newLabels, newHandles = [], []
-            for handle, label in zip(handles, labels):
-                if label not in newLabels:
-                    newLabels.append(label)
-                    newHandles.append(handle)
-            if len(handles) is not 0:
-                self.ax_stereo.legend(newHandles, newLabels,
-                                      bbox_to_anchor=(1.3, 1.1))
-        self.canvas.draw()
-
-            #print("Setting ticklabel")
-            #labels = self.ax_stereo.get_xticklabels().tolist()
-            #print(labels)
-            #labels[0] = "N"
-            #self.ax_stereo.set_xticklabels(labels)
+        self.draw_layers(layers)
+        self.canvas.draw_idle()
+        self.show_statistics()
 
     def on_toolbutton_create_group_layer_clicked(self, widget):
         """
@@ -1145,7 +1227,7 @@ class MainWindow(object):
         if layer_obj is not None:
             layer_obj.set_label(new_label)
 
-        self.redraw_plot()
+        self.request_redraw("layer renamed")
 
     def on_menuitem_about_activate(self, widget):
         """
@@ -1161,6 +1243,13 @@ class MainWindow(object):
         Triggered when the main window is closed from the menu. Terminates the
         Gtk main loop.
         """
+        self.density_worker.shutdown()
+        self.stress_worker.shutdown()
+        self.eigenvector_worker.shutdown()
+        self.batch_importer.cancel()
+        shutdown_process_pool()
+        self.stop_journal()
+        self.remove_recovery()
         Gtk.main_quit()
 
     def on_main_window_destroy(self, widget):
@@ -1168,6 +1257,13 @@ class MainWindow(object):
         Triggered when the main window is closed with the x-Button.
         Terminates the Gtk main loop
         """
+        self.density_worker.shutdown()
+        self.stress_worker.shutdown()
+        self.eigenvector_worker.shutdown()
+        self.batch_importer.cancel()
+        shutdown_process_pool()
+        self.stop_journal()
+        self.remove_recovery()
         Gtk.main_quit()
 
     def on_toolbutton_remove_feature_clicked(self, widget):
@@ -1192,7 +1288,7 @@ class MainWindow(object):
 
             data_selection.unselect_all()
 
-        self.redraw_plot()
+        self.request_redraw("features removed")
 
     def convert_xy_to_dirdip(self, event):
         """
@@ -1310,7 +1406,7 @@ class MainWindow(object):
                 if layer_type == "smallcircle":
                     self.add_smallcircle_feature(data_treestore, alpha_deg,
                                             gamma_deg)
-                self.redraw_plot()
+                self.request_redraw("feature drawn")
 
     def update_cursor_position(self, event):
         """
@@ -1352,11 +1448,134 @@ class MainWindow(object):
         if len(row_list) == 1:
             row = row_list[0]
             layer_obj = model[row][3]
-            fp = FileParseDialog(text_file, layer_obj, self.redraw_plot,
-                                 self.add_planar_feature,
-                                 self.add_linear_feature,
-                                 self.add_faultplane_feature)
+            fp = FileParseDialog(text_file, layer_obj, self.request_redraw,
+                                 functools.partial(self.statbar.push, 1))
             fp.run()
+            if fp.get_column_mapping() is not None:
+                self.column_mapping = fp.get_column_mapping()
+
+    def on_menuitem_import_arrays_activate(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Opens the filechooserdialog for importing binary array files.
+
+        Triggered when the user clicks "File -> Import Arrays" in the MenuBar.
+        """
+        fc = FileChooserArrays(self.run_array_import)
+        fc.run()
+
+    def run_array_import(self, array_file):
+        """
+        Creates a new layer that uses the columns of an array file as data.
+
+        The new layer has the type of the selected layer (a plane-layer if no
+        layer is selected) and is created at the same place as a layer from
+        the toolbuttons. The file is memory-mapped and not copied. If the file
+        can not be attached, the new layer is removed again and the error is
+        shown in the statusbar.
+        """
+        selection = self.layer_view.get_selection()
+        model, row_list = selection.get_selected_rows()
+        layer_type = "plane"
+        if len(row_list) == 1 and model[row_list[0]][3] is not None:
+            layer_type = model[row_list[0]][3].get_layer_type()
+
+        label = os.path.splitext(os.path.basename(array_file))[0]
+        parent = self.get_new_layer_parent()
+        layer_obj = self.create_layer(layer_type, parent, label)
+        try:
+            layer_obj.attach_array_file(array_file)
+        except (ValueError, OSError) as error:
+            #The layer was appended as the last child of the parent
+            last = self.layer_store.iter_n_children(parent) - 1
+            self.layer_store.remove(
+                            self.layer_store.iter_nth_child(parent, last))
+            self.statbar.push(1, "Could not import {0}: {1}".format(
+                                                            label, error))
+            return
+        self.request_redraw("arrays imported")
+
+    def on_menuitem_batch_import_activate(self, widget):
+        # pylint: disable=unused-argument
+        """
+        Opens the filechooserdialog for batch imports.
+
+        Triggered when the user clicks "File -> Batch Import" in the MenuBar.
+        """
+        fc = FileChooserBatchImport(self.run_batch_import)
+        fc.run()
+
+    def run_batch_import(self, directory, pattern="", group_column=-1,
+                         save_mapping=False):
+        """
+        Imports the text files of a folder into a new layer group.
+
+        All text files of the folder are imported, or the files that match
+        the glob-pattern inside the folder. The files are read with the
+        column mapping that is saved in the folder (MAPPING_FILE_NAME). If
+        the folder has no mapping yet, the mapping of the last file that was
+        imported with the file-parse dialog is used. The rows are grouped
+        into layers by the group column that was chosen in the dialog. The
+        mapping is only written into the folder if save_mapping is True. The
+        files are parsed in parallel by the BatchImporter.
+        """
+        mapping_path = os.path.join(directory, MAPPING_FILE_NAME)
+        if os.path.isfile(mapping_path):
+            mapping = ColumnMapping.load(mapping_path)
+        elif self.column_mapping is not None:
+            mapping = ColumnMapping.from_dict(self.column_mapping.to_dict())
+        else:
+            self.statbar.push(1, "No column mapping: import one file of the "
+                                 "folder with the file-parse dialog first")
+            return
+        mapping.group_column = group_column
+
+        if save_mapping:
+            try:
+                mapping.save(mapping_path)
+            except OSError as error:
+                self.statbar.push(1, "Could not save the column mapping: "
+                                     "{0}".format(error))
+
+        if pattern == "":
+            paths = find_files(directory)
+        else:
+            paths = find_files(os.path.join(directory, pattern))
+        group_name = os.path.basename(os.path.normpath(directory))
+        if len(paths) == 0:
+            self.statbar.push(1, "No files to import in {0}".format(
+                                                                group_name))
+            return
+        self.batch_importer.start(paths, mapping,
+            lambda results, errors: self.on_batch_import_done(
+                                    group_name, mapping, results, errors))
+
+    def on_batch_import_done(self, group_name, mapping, results, errors):
+        """
+        Creates a layer for each result of a batch import.
+
+        The layers are created in a new layer group and their data is
+        appended as arrays. The plot is redrawn once, after all layers are
+        filled. Files that could not be read are reported in the statusbar.
+        No group is created if no file could be imported.
+        """
+        if len(results) == 0:
+            self.statbar.push(1, "No layers were imported from {0}: {1} of "
+                                 "{1} files could not be read".format(
+                                     group_name, len(errors)))
+            return
+
+        group_itr = self.layer_store.append(None,
+                    [True, self.settings.get_folder_icon(), group_name, None])
+        for label, arrays in results:
+            layer_obj = self.create_layer(mapping.layer_type, group_itr,
+                                          label)
+            layer_obj.append_data_arrays(arrays)
+
+        if len(errors) > 0:
+            self.statbar.push(1, "Could not import {0} of {1} files".format(
+                                      len(errors), len(results) + len(errors)))
+        self.request_redraw("files imported")
 
     def on_menuitem_online_help_activate(self, menuitem):
         # pylint: disable=unused-argument
@@ -0,0 +1,427 @@
+#!/usr/bin/python3
+
+"""
+This module calculates PT-axes and paleostress tensors of faultplane-layers.
+
+Each fault with a sense of movement ("up", "dn", "sin" or "dex") gives the
+normal of its plane (pointing into the hanging wall) and the direction in
+which the hanging wall moved. The P- and T-axes lie halfway between these
+two vectors. The stress inversion is a grid search over reduced stress
+tensors: the orientations of the principal axes and the stress ratio
+R = (s2 - s3) / (s1 - s3) are sampled on a regular grid, and the tensor
+whose shear tractions (Wallace-Bott) deviate least from the observed slip
+directions is kept. The deviations are calculated for blocks of tensors and
+all faults at once, and the blocks can run in a pool of processes. The
+StressInversionCache keeps the results of each layer until its data changes.
+The StressWorker runs inversions in the background, so the main window does
+not wait for them. All vectors are in North-East-Down coordinates.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import weakref
+import numpy as np
+
+from .analysis import line_vectors, plane_poles, vector_lines
+from .process_pool import get_process_pool
+
+#The spacing of the grid of principal axis orientations in degrees
+STRESS_GRID_STEP = 10
+
+#The number of stress ratios between 0 and 1 that are tried
+STRESS_RATIO_STEPS = 11
+
+#The number of misfit angles (tensors times faults) of one block
+STRESS_CHUNK_VALUES = 2 ** 21
+
+#The least number of faults with a known sense for an inversion
+MIN_INVERSION_FAULTS = 4
+
+
+def fault_vectors(plane_dir, plane_dip, line_dir, line_dip, sense):
+    """
+    Returns the normals and slip directions of the faults with a known sense.
+
+    The normals point into the hanging wall (upwards). The lineations are
+    projected onto their planes and point in the direction of movement of
+    the hanging wall: downwards for "dn", upwards for "up", in the strike
+    direction for "sin" and against it for "dex". Returns the two arrays of
+    unit vectors and the boolean array of the faults that were used.
+    """
+    sense = np.asarray(sense, dtype=object)
+    used = np.isin(sense, ["up", "dn", "sin", "dex"])
+    normals = -line_vectors(*plane_poles(np.asarray(plane_dir)[used],
+                                         np.asarray(plane_dip)[used]))
+    slips = line_vectors(np.asarray(line_dir)[used],
+                         np.asarray(line_dip)[used])
+    slips = slips - np.sum(slips * normals, axis=1)[:, np.newaxis] * normals
+    length = np.sqrt(np.sum(slips ** 2, axis=1))
+    valid = length > 1e-9
+    normals = normals[valid]
+    slips = slips[valid] / length[valid, np.newaxis]
+    sense = sense[used][valid]
+    used[used] = valid
+
+    strikes = line_vectors(np.asarray(plane_dir)[used] - 90,
+                           np.zeros(len(sense)))
+    along_strike = np.sum(slips * strikes, axis=1)
+    flip = ((sense == "up") & (slips[:, 2] > 0)) | \
+           ((sense == "dn") & (slips[:, 2] < 0)) | \
+           ((sense == "sin") & (along_strike < 0)) | \
+           ((sense == "dex") & (along_strike > 0))
+    slips[flip] *= -1
+    return normals, slips, used
+
+
+def pt_axes(normals, slips):
+    """
+    Returns the P- and T-axes of faults as unit vectors.
+
+    P is the normalized difference and T the normalized sum of the normal
+    and the slip direction of each fault.
+    """
+    p_axes = normals - slips
+    t_axes = normals + slips
+    p_axes /= np.sqrt(np.sum(p_axes ** 2, axis=1))[:, np.newaxis]
+    t_axes /= np.sqrt(np.sum(t_axes ** 2, axis=1))[:, np.newaxis]
+    return p_axes, t_axes
+
+
+def stress_frames(step=STRESS_GRID_STEP):
+    """
+    Returns the grid of orientations of the principal stress axes.
+
+    The s1-axes are spread evenly over the lower hemisphere, with rings of
+    the same plunge. For each s1-axis the s3-axis is turned around it in
+    steps of the same size. Returns an array of shape (frames, 3, 3), whose
+    columns are the s1-, s2- and s3-axes.
+    """
+    frames = []
+    for plunge in np.arange(0, 90 + step / 2.0, step):
+        #Horizontal axes only need half a circle, because axes have no sign
+        circle = 180 if plunge == 0 else 360
+        count = max(1, int(round(circle * np.cos(np.radians(plunge)) / step)))
+        trends = np.arange(count) * (float(circle) / count)
+        sigma1 = line_vectors(trends, np.full(count, plunge))
+        #Two axes perpendicular to each s1-axis
+        helper = np.where(np.abs(sigma1[:, 2:3]) > 0.9, [[1.0, 0, 0]],
+                          [[0, 0, 1.0]])
+        first = np.cross(sigma1, helper)
+        first /= np.sqrt(np.sum(first ** 2, axis=1))[:, np.newaxis]
+        second = np.cross(sigma1, first)
+        for angle in np.radians(np.arange(0, 180, step)):
+            sigma3 = np.cos(angle) * first + np.sin(angle) * second
+            sigma2 = np.cross(sigma3, sigma1)
+            frames.append(np.stack((sigma1, sigma2, sigma3), axis=2))
+    return np.concatenate(frames)
+
+
+def slip_misfits(frames, ratios, normals, slips):
+    """
+    Returns the misfit angles of the faults for frames and stress ratios.
+
+    For each tensor the shear traction on each fault is calculated in the
+    frame of the principal axes, where the reduced tensor is the diagonal
+    (1, R, 0). Stresses are positive in compression, so the hanging wall
+    moves against the shear traction on the upward normal. The misfit is the
+    angle in degrees between this direction and the observed slip direction.
+    Returns an array of shape (frames, ratios, faults).
+    """
+    local_normals = np.einsum("kji,fj->kfi", frames, normals)
+    local_slips = np.einsum("kji,fj->kfi", frames, slips)
+    misfits = np.empty((len(frames), len(ratios), len(normals)))
+    for r, ratio in enumerate(ratios):
+        traction = local_normals * np.array([1.0, ratio, 0.0])
+        normal_stress = np.sum(traction * local_normals, axis=2)
+        shear = traction - normal_stress[:, :, np.newaxis] * local_normals
+        length = np.sqrt(np.sum(shear ** 2, axis=2))
+        cosine = -np.sum(shear * local_slips, axis=2) / \
+                 np.maximum(length, 1e-12)
+        misfits[:, r] = np.degrees(np.arccos(np.clip(cosine, -1, 1)))
+    return misfits
+
+
+def search_frames(frames, ratios, normals, slips):
+    """
+    Returns the best tensor of a block of frames.
+
+    Runs in the processes of the pool. Returns the mean misfit, the index of
+    the frame in the block and the index of the ratio.
+    """
+    mean = np.mean(slip_misfits(frames, ratios, normals, slips), axis=2)
+    frame, ratio = np.unravel_index(np.argmin(mean), mean.shape)
+    return mean[frame, ratio], frame, ratio
+
+
+def invert_stress(normals, slips, step=STRESS_GRID_STEP,
+                  ratio_steps=STRESS_RATIO_STEPS, executor=None):
+    """
+    Finds the reduced stress tensor that fits the faults best.
+
+    The grid of stress_frames is combined with ratio_steps stress ratios
+    and the tensor with the smallest mean misfit is returned. The frames are
+    searched in blocks of about STRESS_CHUNK_VALUES misfits. The blocks run
+    in the executor if one is passed (e.g. the shared pool of the
+    process_pool-module), otherwise one after the other. Returns the frame
+    of the principal axes (columns s1, s2, s3) and the stress ratio.
+    """
+    frames = stress_frames(step)
+    ratios = np.linspace(0, 1, ratio_steps)
+    size = max(1, STRESS_CHUNK_VALUES // (len(ratios) * len(normals)))
+    starts = list(range(0, len(frames), size))
+    blocks = [frames[start:start + size] for start in starts]
+    arguments = (blocks, [ratios] * len(blocks), [normals] * len(blocks),
+                 [slips] * len(blocks))
+    if executor is not None and len(blocks) > 1:
+        results = list(executor.map(search_frames, *arguments))
+    else:
+        results = list(map(search_frames, *arguments))
+    best = min(range(len(results)), key=lambda k: results[k][0])
+    misfit, frame, ratio = results[best]
+    return frames[starts[best] + frame], ratios[ratio]
+
+
+class PaleostressResult(object):
+
+    """
+    Stores the PT-axes and the stress inversion of a faultplane-layer.
+
+    The stress tensor is None if the layer has fewer than
+    MIN_INVERSION_FAULTS faults with a known sense.
+    """
+
+    def __init__(self, normals, slips, frame=None, ratio=None):
+        """
+        Initializes the result with the fault vectors and the tensor.
+        """
+        self.normals = normals
+        self.slips = slips
+        self.frame = frame
+        self.ratio = ratio
+        self.misfits = None
+        if frame is not None:
+            self.misfits = slip_misfits(frame[np.newaxis], [ratio], normals,
+                                        slips)[0, 0]
+
+    def get_pt_axes(self):
+        """
+        Returns the trends and plunges of the P- and T-axes.
+
+        Returns four arrays: P-trends, P-plunges, T-trends and T-plunges.
+        """
+        p_axes, t_axes = pt_axes(self.normals, self.slips)
+        p_trend, p_plunge = vector_lines(p_axes)
+        t_trend, t_plunge = vector_lines(t_axes)
+        return p_trend, p_plunge, t_trend, t_plunge
+
+    def has_tensor(self):
+        """
+        Returns True if a stress tensor was found.
+        """
+        return self.frame is not None
+
+    def get_stress_axes(self):
+        """
+        Returns the trends and plunges of the s1-, s2- and s3-axes.
+        """
+        return vector_lines(self.frame.T)
+
+    def get_ratio(self):
+        """
+        Returns the stress ratio R = (s2 - s3) / (s1 - s3).
+        """
+        return self.ratio
+
+    def get_misfits(self):
+        """
+        Returns the misfit angle of each fault in degrees.
+
+        The misfits are the fluctuations between the observed and the
+        calculated slip directions.
+        """
+        return self.misfits
+
+    def get_mohr_points(self):
+        """
+        Returns the normal and shear stress on each fault.
+
+        The stresses belong to the reduced tensor with s1 = 1 and s3 = 0.
+        """
+        local = np.dot(self.normals, self.frame)
+        traction = local * np.array([1.0, self.ratio, 0.0])
+        normal_stress = np.sum(traction * local, axis=1)
+        shear_stress = np.sqrt(np.maximum(np.sum(traction ** 2, axis=1) -
+                                          normal_stress ** 2, 0))
+        return normal_stress, shear_stress
+
+
+def paleostress(plane_dir, plane_dip, line_dir, line_dip, sense,
+                executor=None):
+    """
+    Returns the PaleostressResult of the columns of a faultplane-layer.
+
+    The executor is passed on to invert_stress.
+    """
+    normals, slips, used = fault_vectors(plane_dir, plane_dip, line_dir,
+                                         line_dip, sense)
+    if len(normals) < MIN_INVERSION_FAULTS:
+        return PaleostressResult(normals, slips)
+    frame, ratio = invert_stress(normals, slips, executor=executor)
+    return PaleostressResult(normals, slips, frame, ratio)
+
+
+class StressInversionCache(object):
+
+    """
+    Stores the paleostress results of each faultplane-layer.
+
+    The results are stored together with the data version of the layer and
+    are calculated again when the data changes. Deleted layers are dropped
+    from the cache automatically.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty cache.
+        """
+        self.results = weakref.WeakKeyDictionary()
+
+    def lookup(self, layer_obj):
+        """
+        Returns the PaleostressResult of a layer if it is up to date, or else
+        None.
+        """
+        cached = self.results.get(layer_obj)
+        if cached is not None and cached[0] == layer_obj.get_data_version():
+            return cached[1]
+        return None
+
+    def store(self, layer_obj, data_version, result):
+        """
+        Stores the result of a layer for a version of its data.
+        """
+        self.results[layer_obj] = (data_version, result)
+
+    def get_result(self, layer_obj):
+        """
+        Returns the PaleostressResult of a faultplane-layer.
+
+        A result that is not in the cache is calculated at once, in this
+        thread.
+        """
+        result = self.lookup(layer_obj)
+        if result is not None:
+            return result
+
+        columns = layer_obj.get_data_columns()
+        result = paleostress(*[columns.get_column(k) for k in range(5)])
+        self.store(layer_obj, layer_obj.get_data_version(), result)
+        return result
+
+
+class StressWorker(object):
+
+    """
+    Runs stress inversions in the background.
+
+    Works like the DensityWorker: each job belongs to a layer and is tagged
+    with the version of the layer when it was submitted. A new job of the
+    same layer replaces the old one. The inversion is driven from a thread,
+    which hands the blocks of tensors to the executor (the shared pool of
+    processes by default). The finished result is stored in the cache and
+    handed to the callback through the post function (GLib.idle_add in the
+    main window), so both run in the main thread. Errors of the inversion
+    are handed to the error function in the same way.
+    """
+
+    def __init__(self, cache, post_function, executor=None,
+                 error_function=None):
+        """
+        Initializes the thread that drives the inversions.
+
+        Expects the StressInversionCache that stores the results and the
+        function that runs a callback in the main thread. The error function
+        receives the layer and the exception of an inversion that failed,
+        e.g. to show it in the statusbar.
+        """
+        self.cache = cache
+        self.post_function = post_function
+        self.error_function = error_function
+        self.executor = executor
+        self.thread_pool = ThreadPoolExecutor(max_workers=1)
+        self.jobs = {}
+
+    def submit(self, layer_obj, version, callback):
+        """
+        Starts the stress inversion of a faultplane-layer.
+
+        If the inversion of the same data is already running, only the
+        version and the callback of the job are replaced, so a style change
+        or a new view does not start it again. Otherwise the old job is
+        discarded and the data columns are copied, because the layer can
+        change while the inversion runs. Once the result is ready the
+        callback receives the layer, the version and the PaleostressResult.
+        """
+        data_version = layer_obj.get_data_version()
+        job = self.jobs.get(layer_obj)
+        if job is not None and job[2] == data_version:
+            self.jobs[layer_obj] = (version, job[1], data_version, callback)
+            return
+
+        self.cancel(layer_obj)
+        columns = layer_obj.get_data_columns()
+        arrays = [np.array(columns.get_column(k)) for k in range(5)]
+        future = self.thread_pool.submit(paleostress, *arrays,
+                        executor=self.executor or get_process_pool())
+        self.jobs[layer_obj] = (version, future, data_version, callback)
+        future.add_done_callback(
+            lambda done: self.post_function(self.on_job_done, layer_obj,
+                                            done))
+
+    def on_job_done(self, layer_obj, future):
+        """
+        Stores a finished result and hands it to the callback. Runs in the
+        main thread.
+
+        The result is discarded if the job was replaced by a newer one or was
+        cancelled. The exception of a failed job is handed to the error
+        function. Returns False so the idle-source is removed.
+        """
+        job = self.jobs.get(layer_obj)
+        if job is None or job[1] is not future:
+            return False
+        del self.jobs[layer_obj]
+        if future.cancelled():
+            return False
+        if future.exception() is not None:
+            if self.error_function is not None:
+                self.error_function(layer_obj, future.exception())
+            return False
+        version, future, data_version, callback = job
+        self.cache.store(layer_obj, data_version, future.result())
+        callback(layer_obj, version, future.result())
+        return False
+
+    def is_pending(self, layer_obj):
+        """
+        Returns True if the inversion of the layer is running.
+        """
+        return layer_obj in self.jobs
+
+    def cancel(self, layer_obj):
+        """
+        Discards the job of a layer.
+
+        A job that has not started yet is cancelled. The result of a running
+        job is ignored when it finishes.
+        """
+        job = self.jobs.pop(layer_obj, None)
+        if job is not None:
+            job[1].cancel()
+
+    def shutdown(self):
+        """
+        Discards all jobs and stops the thread.
+        """
+        for layer_obj in list(self.jobs):
+            self.cancel(layer_obj)
+        self.thread_pool.shutdown(wait=False)
@@ -9,10 +9,16 @@ plot-settings dialog will call the instance of this class to change the
 different settings. This class also stores the figure and can return different
 subplot-layouts. This class also stores the normal and inverse transformations
 of the stereonet, and will return the correct one for either the Schmidt- or
-Wulff-Net.
+Wulff-Net. Gtk is only needed for the folder icon and the canvas color of
+the GUI, so the settings can also be used by the headless renderer.
 """
 
-from gi.repository import Gtk, Gdk
+try:
+    from gi.repository import Gtk, Gdk
+except ImportError:
+    #Headless rendering does not need the icon and RGBA-colors
+    Gtk = None
+    Gdk = None
 from matplotlib.figure import Figure
 from matplotlib.gridspec import GridSpec
 import mplstereonet
@@ -31,15 +37,22 @@ class PlotSettings(object):
     one for either the Schmidt- or Wulff-Net.
     """
 
+    #Settings that are saved in project files
+    saved_settings = ("draw_grid", "equal_area_projection",
+        "minor_grid_spacing", "major_grid_spacing", "grid_cutoff_lat",
+        "show_north", "show_cross", "pixel_density", "grid_linestyle",
+        "grid_color", "grid_width", "draw_legend", "canvas_color")
+
     def __init__(self):
         """
         Initalizes the default values, colors and the matplotlib-figure.
 
         Initializes and stores the default settings. Initializes the
-        matplotlib-figure, a folder-icon for the group-layers of the layer-view.
+        matplotlib-figure. The folder-icon for the group-layers of the
+        layer-view is loaded when it is first needed, so the settings can be
+        created without a display.
         """
-        self.folder_icon = Gtk.IconTheme.get_default().load_icon(
-            "folder", 16, 0)
+        self.folder_icon = None
         self.draw_grid = True
         self.equal_area_projection = True
         self.minor_grid_spacing = 2
@@ -121,8 +134,11 @@ class PlotSettings(object):
         Always returns the "folder" icon from the Gtk.IconTheme. The folder
         will therefore match the desktop-theme set by the user. This method is
         called by the MainWindow "on_toolbutton_create_group_layer_clicked"-
-        method.
+        method. The icon is loaded on the first call.
         """
+        if self.folder_icon is None:
+            self.folder_icon = Gtk.IconTheme.get_default().load_icon(
+                "folder", 16, 0)
         return self.folder_icon
 
     def get_pixel_density(self):
@@ -323,7 +339,7 @@ class PlotSettings(object):
         sp_mohr = gridspec.new_subplotspec((1, 3), colspan=2)
         ax_stereo = self.fig.add_subplot(sp_stereo,
                                          projection=self.get_projection())
-        ax_fluc = self.fig.add_subplot(sp_fluc, aspect="equal")
+        ax_fluc = self.fig.add_subplot(sp_fluc)
         ax_mohr = self.fig.add_subplot(sp_mohr, aspect="equal")
         return ax_stereo, ax_fluc, ax_mohr
 
@@ -362,3 +378,23 @@ class PlotSettings(object):
         means it will not be drawn.
         """
         self.show_cross = new_state
+
+    def get_settings_dict(self):
+        """
+        Returns the settings of the plot as a dictionary.
+
+        The dictionary holds the attributes in saved_settings and is saved in
+        project files.
+        """
+        return {name: getattr(self, name) for name in self.saved_settings}
+
+    def set_settings_dict(self, settings):
+        """
+        Sets the settings of the plot from a dictionary.
+
+        Unknown keys are ignored. The new settings are used when the plot is
+        redrawn.
+        """
+        for name in self.saved_settings:
+            if name in settings:
+                setattr(self, name, settings[name])
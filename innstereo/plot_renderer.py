@@ -0,0 +1,725 @@
+#!/usr/bin/python3
+
+"""
+This module contains the StereonetRenderer-class that draws the layers.
+
+The StereonetRenderer creates the axes of the current view and draws the
+layers on them with the styles that the layers store. It keeps a registry of
+the artists of each layer, so only layers that changed are drawn again. The
+MainWindow inherits the drawing from this class and shows the figure in a
+Gtk-canvas. Only the MainWindow imports Gtk, so without it the figure is
+drawn on an Agg-canvas and can be saved to PNG, SVG or PDF files, e.g. by the
+headless-module.
+"""
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.artist import Artist
+from matplotlib.collections import LineCollection
+import numpy as np
+
+from .polar_axes import NorthPolarAxes
+from .density import DensityGridCache
+from .rose_histogram import RoseHistogramCache, rose_bin_edges
+from .fisher_statistics import FisherStatisticsCache
+from .paleostress import StressInversionCache
+from .fault_geometry import (fault_strikes, sense_lineations,
+                             lineation_pole_planes, hoeppener_arrows)
+
+
+class StereonetRenderer(object):
+
+    """
+    Draws layers on the axes of the stereonet and rose diagram.
+
+    The renderer needs the PlotSettings, which hold the figure, and the
+    view mode ("stereonet", "stereo_rose", "rose" or "pt"). Contours and
+    stress inversions are calculated at once, unless a DensityWorker and a
+    StressWorker are assigned to the density_worker- and
+    stress_worker-attributes, which the MainWindow does.
+    """
+
+    def __init__(self, settings, view_mode="stereonet"):
+        """
+        Initializes the renderer with an Agg-canvas and creates the axes.
+
+        The MainWindow does not call this method, because it sets up the
+        same attributes with a Gtk-canvas.
+        """
+        self.settings = settings
+        self.fig = self.settings.get_fig()
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.view_mode = view_mode
+        self.view_changed = False
+        self.density_cache = DensityGridCache()
+        self.density_worker = None
+        self.rose_cache = RoseHistogramCache()
+        self.fisher_cache = FisherStatisticsCache()
+        self.stress_cache = StressInversionCache()
+        self.stress_worker = None
+        self.create_axes()
+
+    def parse_planes(self, layer_obj):
+        """
+        Parses planes and returns arrays of strikes, dipdirs and dips.
+
+        Parsing converts from dip direction to strikes. The dip directions and
+        dips are views of the data columns of the layer.
+        """
+        columns = layer_obj.get_data_columns()
+        dipdir = columns.get_column(0)
+        dip = columns.get_column(1)
+        strike = dipdir - 90
+        return strike, dipdir, dip
+
+    def parse_faultplanes(self, layer_obj):
+        """
+        Parses a faultplane layer. Converts planes from dip-direction to
+        strikes so they can be plotted.
+        #lp_plane = linear-pole_plane (The great circles that connect the
+        lineation with the pole of the faultplane. Used for Hoeppener-Plots.
+        All values are calculated for the whole layer at once by the
+        functions of the fault_geometry-module.
+        """
+        columns = layer_obj.get_data_columns()
+        plane_dir = columns.get_column(0)
+        plane_dip = columns.get_column(1)
+        line_dir = columns.get_column(2)
+        line_dip = columns.get_column(3)
+        sense = columns.get_column(4)
+        strike = fault_strikes(plane_dir)
+        line_sense_dir, line_sense_dip = sense_lineations(line_dir, line_dip,
+                                                          sense)
+        lp_plane_dir, lp_plane_dip = lineation_pole_planes(plane_dir,
+                                                           plane_dip,
+                                                           line_dir, line_dip)
+        return strike, plane_dir, plane_dip, line_dir, line_dip, sense, \
+               line_sense_dir, line_sense_dip, lp_plane_dir, lp_plane_dip
+
+    def parse_lines(self, layer_obj):
+        """
+        Parses linear data with the 3 columns dip direction, dip and sense.
+        Returns a view of the data columns of the layer for each column.
+        """
+        columns = layer_obj.get_data_columns()
+        return columns.get_column(0), columns.get_column(1), \
+               columns.get_column(2)
+
+    def parse_smallcircles(self, layer_obj):
+        """
+        Parses small circle data. Data has 3 columns: Dip direction, dip and
+        opening angle. Returns a view of the data columns of the layer for
+        each column.
+        """
+        columns = layer_obj.get_data_columns()
+        return columns.get_column(0), columns.get_column(1), \
+               columns.get_column(2)
+
+    def draw_plane(self, layer_obj, dipdir, dip):
+        """
+        Function draws a great circle in the stereonet. It calls the formatting
+        from the layer object. Returns the list of lines that were drawn.
+        """
+        return self.ax_stereo.plane(dipdir, dip,
+                    color=layer_obj.get_line_color(),
+                    label=layer_obj.get_label(),
+                    linewidth=layer_obj.get_line_width(),
+                    linestyle=layer_obj.get_line_style(),
+                    dash_capstyle=layer_obj.get_capstyle(),
+                    alpha=layer_obj.get_line_alpha(), clip_on=False)
+
+    def draw_line(self, layer_obj, dipdir, dip):
+        """
+        Function draws a linear element in the stereonet. It calls the
+        formatting from the layer object. Returns the list of lines that were
+        drawn.
+        """
+        #ax.line takes dip first and then dipdir (as strike)
+        return self.ax_stereo.line(dip, dipdir,
+                    marker=layer_obj.get_marker_style(),
+                    markersize=layer_obj.get_marker_size(),
+                    color=layer_obj.get_marker_fill(),
+                    label=layer_obj.get_label(),
+                    markeredgewidth=layer_obj.get_marker_edge_width(),
+                    markeredgecolor=layer_obj.get_marker_edge_color(),
+                    alpha=layer_obj.get_marker_alpha(), clip_on=False)
+
+    def draw_smallcircles(self, layer_obj, dipdir, dip, angle):
+        """
+        Function draws small circles in the stereonet. It calls the formatting
+        from the layer object. Returns the collection that was drawn.
+        """
+        #ax.cone takes dip first and then dipdir!
+        #facecolor needs to be "None" because there is a bug with which side
+        #to fill
+        #Is not added to the legend yet. Matplotlib bug?
+        return self.ax_stereo.cone(dip, dipdir, angle, facecolor="None",
+                    color=layer_obj.get_line_color(),
+                    linewidth=layer_obj.get_line_width(),
+                    label=layer_obj.get_label(),
+                    linestyle=layer_obj.get_line_style())
+
+    def draw_fisher_cone(self, layer_obj):
+        """
+        Draws the Fisher mean of a layer and its 95% confidence cone.
+
+        The statistics come from the cache, so they are only calculated again
+        when the data of the layer changes. The mean is drawn as a star in the
+        colors of the markers, the cone as a small circle in the style of the
+        lines. Nothing is drawn for less than two linears.
+        """
+        statistics = self.fisher_cache.get_statistics(layer_obj)
+        if statistics.get_count() < 2:
+            return None
+        trend, plunge = statistics.get_mean()
+        mean = self.ax_stereo.line(plunge, trend, marker="*",
+                    markersize=layer_obj.get_marker_size() * 1.5,
+                    color=layer_obj.get_marker_fill(),
+                    label="Fisher mean of {0}".format(layer_obj.get_label()),
+                    markeredgewidth=layer_obj.get_marker_edge_width(),
+                    markeredgecolor=layer_obj.get_marker_edge_color(),
+                    clip_on=False)
+        cone = self.draw_smallcircles(layer_obj, [trend], [plunge],
+                                      [statistics.get_alpha95()])
+        return [mean, cone]
+
+    def draw_paleostress(self, layer_obj):
+        """
+        Draws the PT-axes and the stress inversion of a faultplane-layer.
+
+        Only used in the paleostress view. The results come from the
+        StressInversionCache, so they are only calculated again when the data
+        of the layer changes. If the result is not in the cache, it is
+        calculated by the StressWorker and drawn by the
+        on_stress_result_ready-method once it is ready. Returns the list of
+        artists that were drawn.
+        """
+        result = self.stress_cache.lookup(layer_obj)
+        if result is None and self.stress_worker is not None:
+            self.stress_worker.submit(layer_obj, layer_obj.get_version(),
+                                      self.on_stress_result_ready)
+            return []
+        elif result is None:
+            result = self.stress_cache.get_result(layer_obj)
+        return self.draw_stress_result(layer_obj, result)
+
+    def on_stress_result_ready(self, layer_obj, version, result):
+        """
+        Draws the stress inversion of a layer when its result is ready.
+
+        Called by the StressWorker in the main thread. The result is not
+        drawn if the layer was changed, removed or hidden since the job was
+        submitted, or if the paleostress view was left. The new artists are
+        added to the artists of the layer, so the next redraw can remove them.
+        """
+        entry = self.layer_artists.get(layer_obj)
+        if entry is None or entry[0] != version or self.ax_fluc is None:
+            return
+        entry[1].extend(self.draw_stress_result(layer_obj, result))
+        for axis in (self.ax_fluc, self.ax_mohr):
+            axis.relim()
+            axis.autoscale_view()
+        self.canvas.draw_idle()
+
+    def draw_stress_result(self, layer_obj, result):
+        """
+        Draws the PaleostressResult of a faultplane-layer.
+
+        The P- and T-axes and the principal stress axes are drawn in the
+        stereonet. The misfits of the faults are drawn in the fluctuation
+        histogram and their normal and shear stresses in the Mohr circle.
+        Returns the list of artists that were drawn.
+        """
+        artists = []
+        label = layer_obj.get_label()
+        p_trend, p_plunge, t_trend, t_plunge = result.get_pt_axes()
+        if len(p_trend) == 0:
+            return artists
+
+        artists.extend(self.ax_stereo.line(p_plunge, p_trend, marker="o",
+                            markersize=4, color="#ffffff",
+                            markeredgecolor="#000000",
+                            label="P-axes of {0}".format(label)))
+        artists.extend(self.ax_stereo.line(t_plunge, t_trend, marker="o",
+                            markersize=4, color="#000000",
+                            markeredgecolor="#000000",
+                            label="T-axes of {0}".format(label)))
+        if result.has_tensor() == False:
+            return artists
+
+        axis_trend, axis_plunge = result.get_stress_axes()
+        for k, marker in enumerate(("s", "^", "o")):
+            artists.extend(self.ax_stereo.line(axis_plunge[k], axis_trend[k],
+                                marker=marker, markersize=12,
+                                color="#ffffff", markeredgewidth=2,
+                                markeredgecolor=layer_obj.get_line_color(),
+                                label="s{0} of {1}".format(k + 1, label)))
+
+        self.collect_artists(self.ax_fluc.hist(result.get_misfits(),
+                                bins=np.arange(0, 181, 10),
+                                color=layer_obj.get_line_color(),
+                                alpha=0.7)[2], artists)
+
+        #The three Mohr circles of the reduced tensor (s1 = 1, s3 = 0)
+        ratio = result.get_ratio()
+        angle = np.linspace(0, np.pi, 90)
+        for high, low in ((1, 0), (1, ratio), (ratio, 0)):
+            center = (high + low) / 2.0
+            radius = (high - low) / 2.0
+            artists.extend(self.ax_mohr.plot(
+                                center + radius * np.cos(angle),
+                                radius * np.sin(angle), color="#000000",
+                                linewidth=1))
+        normal_stress, shear_stress = result.get_mohr_points()
+        artists.extend(self.ax_mohr.plot(normal_stress, shear_stress, "o",
+                            markersize=3, color=layer_obj.get_line_color()))
+        artists.append(self.ax_mohr.text(0.98, 0.95,
+                            "R = {0:.2f}\nmisfit = {1:.1f}".format(
+                                ratio, np.mean(result.get_misfits())),
+                            transform=self.ax_mohr.transAxes,
+                            horizontalalignment="right",
+                            verticalalignment="top", fontsize=8,
+                            bbox={"facecolor": "#ffffff", "linewidth": 0}))
+        return artists
+
+    def draw_poles(self, layer_obj, dipdir, dip):
+        """
+        Function draws a plane pole in the stereonet. It calls the formatting
+        from the layer object. Returns the list of lines that were drawn.
+        """
+        return self.ax_stereo.pole(dipdir, dip,
+                    marker=layer_obj.get_pole_style(),
+                    markersize=layer_obj.get_pole_size(),
+                    color=layer_obj.get_pole_fill(),
+                    label="Poles of {0}".format(layer_obj.get_label()),
+                    markeredgewidth=layer_obj.get_pole_edge_width(),
+                    markeredgecolor=layer_obj.get_pole_edge_color(),
+                    alpha=layer_obj.get_pole_alpha(), clip_on=False)
+
+    def draw_rose(self, layer_obj, dipdir, color, edgecolor):
+        """
+        Draws the rose diagram of a layer or updates its bars.
+
+        The counts are taken from the RoseHistogramCache. The bars of each
+        layer are stored in a registry, together with the style version of
+        the layer. If the style did not change since the bars were drawn, only
+        their heights are updated. Otherwise the old bars are removed and new
+        bars are drawn.
+        """
+        counts = self.rose_cache.get_counts(layer_obj, dipdir,
+                                            layer_obj.get_rose_spacing())
+        style_version = layer_obj.get_style_version()
+        registered = self.rose_bars.get(layer_obj)
+        if registered is not None:
+            if registered[0] == style_version and \
+               len(registered[1]) == len(counts):
+                for bar, count in zip(registered[1], counts):
+                    bar.set_height(count)
+                return
+            self.remove_artists(registered[1])
+
+        left_edges, bin_width = rose_bin_edges(layer_obj.get_rose_spacing())
+        bars = self.ax_rose.bar(left_edges, counts, width = bin_width,
+                                align = "edge", alpha = 0.5, color = color,
+                                edgecolor = edgecolor,
+                                bottom = layer_obj.get_rose_bottom())
+        self.rose_bars[layer_obj] = (style_version, list(bars))
+
+    def draw_contours(self, layer_obj, dipdir, dips, measure_type):
+        """
+        MplStereonet accepts measurements as "poles" for planes and
+        "lines" for linear measurements. The measure_type "beta" contours the
+        intersections of all pairs of planes and expects their dip directions
+        instead of the strikes. The density grid is taken from the
+        DensityGridCache, so the contour fills, contour lines and labels
+        share one grid that is only calculated when the data or the contour
+        settings change. If the grid is not in the cache, it is calculated
+        by the DensityWorker and the contours are drawn by the
+        on_contour_grid_ready-method once it is ready. Returns a list of the
+        contour fills, contour lines and labels that were drawn.
+        """
+        artists = []
+        if len(dipdir) == 0:
+            return artists
+        if layer_obj.get_draw_contour_fills() == False and \
+           layer_obj.get_draw_contour_lines() == False:
+            return artists
+
+        grid_args = (dipdir, dips, measure_type,
+                     layer_obj.get_contour_method(),
+                     layer_obj.get_contour_sigma(),
+                     layer_obj.get_contour_resolution())
+        grid = self.density_cache.lookup(*grid_args)
+        if grid is None and self.density_worker is not None:
+            self.density_worker.submit(layer_obj, layer_obj.get_version(),
+                                       grid_args, self.on_contour_grid_ready)
+            return artists
+        elif grid is None:
+            grid = self.density_cache.get_grid(*grid_args)
+        return self.draw_contour_grid(layer_obj, grid)
+
+    def on_contour_grid_ready(self, layer_obj, version, grid):
+        """
+        Draws the contours of a layer when its density grid is ready.
+
+        Called by the DensityWorker in the main thread. The grid is discarded
+        if the layer was changed, removed or hidden since the job was
+        submitted, or if the axes were created again. The new artists are
+        added to the artists of the layer, so the next redraw can remove them.
+        """
+        entry = self.layer_artists.get(layer_obj)
+        if entry is None or entry[0] != version or self.ax_stereo is None:
+            return
+        entry[1].extend(self.draw_contour_grid(layer_obj, grid))
+        self.canvas.draw_idle()
+
+    def draw_contour_grid(self, layer_obj, grid):
+        """
+        Draws the contour fills, lines and labels of a density grid.
+
+        Returns a list of the artists that were drawn.
+        """
+        artists = []
+        lon, lat, totals = grid
+
+        #Implement hatches = (['-', '+', 'x', '\\', '*', 'o', 'O', '.'])
+        if layer_obj.get_draw_contour_fills() == True:
+            cbar = self.ax_stereo.contourf(lon, lat, totals,
+                              cmap = layer_obj.get_colormap())
+            self.collect_artists(cbar, artists)
+
+        clines = None
+        if layer_obj.get_draw_contour_lines() == True:
+            if layer_obj.get_use_line_color() == True:
+                clines = self.ax_stereo.contour(lon, lat, totals,
+                                colors = layer_obj.get_contour_line_color(),
+                                linewidths = layer_obj.get_contour_line_width(),
+                                linestyles = layer_obj.get_contour_line_style())
+            else:
+                clines = self.ax_stereo.contour(lon, lat, totals,
+                                cmap = layer_obj.get_colormap(),
+                                linewidths = layer_obj.get_contour_line_width(),
+                                linestyles = layer_obj.get_contour_line_style())
+            self.collect_artists(clines, artists)
+
+        if layer_obj.get_draw_contour_labels() == True:
+            if clines is not None:
+                labels = self.ax_stereo.clabel(clines,
+                                fontsize = layer_obj.get_contour_label_size())
+                self.collect_artists(labels, artists)
+
+        return artists
+
+    def draw_hoeppener(self, layer_obj, plane_dir, plane_dip, line_dir,
+                        line_dip, sense):
+        """
+        Receives data from a faultplane-layer and draws its Hoeppener arrows.
+
+        Triggered by the redraw_plot function.
+        Receives the planes (direction and dip), linears (direction and dip)
+        and the shear sense of all faults. The start and end points of the
+        arrows are calculated for all faults at once by the
+        fault_geometry-module. The arrows are then projected and drawn as a
+        single LineCollection of the shafts and the strokes of the
+        arrowheads. Arrows with a shear sense get an open arrowhead. Unknown
+        shear sense is just a line. Faults without shear sense get no arrow.
+        Returns the list of artists that were drawn.
+        """
+        arrows = []
+        if len(line_dir) == 0:
+            return arrows
+
+        lon_start, lat_start, lon_end, lat_end, heads = hoeppener_arrows(
+                                    plane_dir, plane_dip, line_dir, line_dip,
+                                    sense)
+        if len(lon_start) == 0:
+            return arrows
+
+        #Build the arrows in the projected coordinates of the stereonet, so
+        #the arrowheads are not distorted by the projection.
+        projection = self.ax_stereo.transProjection
+        start = projection.transform(np.column_stack((lon_start, lat_start)))
+        end = projection.transform(np.column_stack((lon_end, lat_end)))
+        shaft = end - start
+        normal = np.column_stack((-shaft[:, 1], shaft[:, 0]))
+        head_left = end - 0.4 * shaft + 0.2 * normal
+        head_right = end - 0.4 * shaft - 0.2 * normal
+
+        #One shaft per arrow and two strokes per arrowhead, all as segments
+        #of two points
+        segments = np.concatenate((np.stack((start, end), axis=1),
+                                   np.stack((head_left[heads], end[heads]),
+                                            axis=1),
+                                   np.stack((head_right[heads], end[heads]),
+                                            axis=1)))
+
+        collection = LineCollection(segments, colors = "#000000",
+                            linewidths = 1, clip_on = False,
+                            transform = self.ax_stereo.transAffine +
+                                        self.ax_stereo.transAxes)
+        self.ax_stereo.add_collection(collection, autolim = False)
+        arrows.append(collection)
+        return arrows
+
+    def collect_artists(self, result, artists):
+        """
+        Adds the artists returned by a plotting function to a list.
+
+        Plotting functions return single artists, lists of artists or
+        containers (e.g. the bars of a rose diagram). Older versions of
+        Matplotlib return contour sets that are not artists themselves. In
+        that case the collections of the contour set are added.
+        """
+        if result is None:
+            return
+        if isinstance(result, Artist):
+            artists.append(result)
+        elif isinstance(result, (list, tuple)):
+            for item in result:
+                self.collect_artists(item, artists)
+        elif hasattr(result, "collections"):
+            artists.extend(result.collections)
+
+    def remove_artists(self, artists):
+        """
+        Removes a list of artists from the axes they were drawn on.
+        """
+        for artist in artists:
+            try:
+                artist.remove()
+            except (ValueError, NotImplementedError):
+                #Artist was already removed from its axes
+                pass
+
+    def create_axes(self):
+        """
+        Creates the axes for the current view mode and draws the stereonet.
+
+        Switching the view or applying new plot settings resets the figure.
+        The registries of the layer-artists and rose bars are emptied, so all
+        layers are drawn again on the new axes. The grid, the center cross
+        and the North symbol only depend on the plot settings and are drawn
+        once, when the axes are created.
+        """
+        self.inv = self.settings.get_inverse_transform()
+        self.ax_stereo = None
+        self.ax_rose = None
+        self.ax_fluc = None
+        self.ax_mohr = None
+        if self.view_mode == "stereonet":
+            self.ax_stereo = self.settings.get_stereonet()
+        elif self.view_mode == "stereo_rose":
+            self.ax_stereo, self.ax_rose = self.settings.get_stereo_rose()
+        elif self.view_mode == "rose":
+            self.ax_rose = self.settings.get_rose_diagram()
+        elif self.view_mode == "pt":
+            self.ax_stereo, self.ax_fluc, self.ax_mohr = (
+                                        self.settings.get_pt_view())
+        self.layer_artists = {}
+        self.rose_bars = {}
+
+        if self.ax_fluc is not None:
+            self.ax_fluc.set_title("Fluctuation histogram")
+            self.ax_fluc.set_xlabel("Misfit angle (degrees)")
+            self.ax_fluc.set_ylabel("Faults")
+            self.ax_mohr.set_title("Mohr circle")
+            self.ax_mohr.set_xlabel("Normal stress")
+            self.ax_mohr.set_ylabel("Shear stress")
+
+        if self.ax_stereo is None:
+            return
+
+        if self.settings.get_draw_grid_state() == True:
+            self.ax_stereo.grid(linestyle = self.settings.get_grid_linestyle(),
+                                color = self.settings.get_grid_color(),
+                                linewidth = self.settings.get_grid_width())
+
+        if self.settings.get_show_cross() == True:
+            self.ax_stereo.annotate("", xy = (-0.03, 0),
+                                    xytext = (0.03, 0),
+                                    xycoords = "data",
+                                    arrowprops = dict(arrowstyle = "-",
+                                                      connectionstyle = "arc3"))
+            self.ax_stereo.annotate("", xy = (0, -0.03),
+                                    xytext = (0, 0.03),
+                                    xycoords = "data",
+                                    arrowprops = dict(arrowstyle = "-",
+                                                      connectionstyle = "arc3"))
+
+        if self.settings.get_show_north() == True:
+            self.ax_stereo.set_azimuth_ticks([0], labels=['N'])
+
+    def draw_layer(self, layer_obj):
+        """
+        Draws a single layer and returns the list of artists it created.
+
+        The data of the layer is parsed and drawn according to its type and
+        settings. Stereonet elements are only drawn if the current view has a
+        stereonet and rose diagrams only if it has a rose diagram. The bars of
+        the rose diagram are not returned, because they are kept by the
+        draw_rose-method.
+        """
+        artists = []
+        layer_type = layer_obj.get_layer_type()
+        ax_stereo = self.ax_stereo
+
+        if layer_type == "plane":
+            strike, dipdir, dip = self.parse_planes(layer_obj)
+            if ax_stereo is not None:
+                if layer_obj.get_render_gcircles() == True:
+                    self.collect_artists(
+                        self.draw_plane(layer_obj, strike, dip), artists)
+                if layer_obj.get_render_poles() == True:
+                    self.collect_artists(
+                        self.draw_poles(layer_obj, strike, dip), artists)
+                if layer_obj.get_contour_beta() == True:
+                    self.collect_artists(
+                        self.draw_contours(layer_obj, dipdir, dip, "beta"),
+                        artists)
+                else:
+                    self.collect_artists(
+                        self.draw_contours(layer_obj, strike, dip, "poles"),
+                        artists)
+
+            if self.ax_rose is not None:
+                self.draw_rose(layer_obj, dipdir, layer_obj.get_line_color(),
+                               layer_obj.get_pole_edge_color())
+
+        if layer_type == "faultplane" and ax_stereo is not None:
+            strike, plane_dir, plane_dip, line_dir, line_dip, \
+                sense, line_sense_dir, line_sense_dip, \
+                lp_plane_dir, lp_plane_dip = (
+                    self.parse_faultplanes(layer_obj))
+
+            if layer_obj.get_render_gcircles() == True:
+                self.collect_artists(
+                    self.draw_plane(layer_obj, strike, plane_dip), artists)
+            if layer_obj.get_render_poles() == True:
+                self.collect_artists(
+                    self.draw_poles(layer_obj, strike, plane_dip), artists)
+            if layer_obj.get_render_linears() == True:
+                self.collect_artists(
+                    self.draw_line(layer_obj, line_dir, line_dip), artists)
+            if layer_obj.get_draw_lp_plane() == True:
+                self.collect_artists(
+                    ax_stereo.plane(lp_plane_dir, lp_plane_dip,
+                                    linestyle = "dotted",
+                                    color = "#000000"), artists)
+            if layer_obj.get_draw_hoeppener() == True:
+                self.collect_artists(
+                    self.draw_hoeppener(layer_obj, plane_dir, plane_dip,
+                                        line_dir, line_dip, sense), artists)
+
+            if self.ax_fluc is not None:
+                self.collect_artists(self.draw_paleostress(layer_obj),
+                                     artists)
+
+            if layer_obj.get_render_pole_contours() == True:
+                self.collect_artists(
+                    self.draw_contours(layer_obj, strike, plane_dip,
+                                       "poles"), artists)
+            else:
+                self.collect_artists(
+                    self.draw_contours(layer_obj, line_dip, line_dir,
+                                       "lines"), artists)
+
+        if layer_type == "line":
+            dipdir, dip, sense = self.parse_lines(layer_obj)
+            if ax_stereo is not None:
+                if layer_obj.get_render_linears() == True:
+                    self.collect_artists(
+                        self.draw_line(layer_obj, dipdir, dip), artists)
+                if layer_obj.get_draw_fisher_cone() == True:
+                    self.collect_artists(self.draw_fisher_cone(layer_obj),
+                                         artists)
+                self.collect_artists(
+                    self.draw_contours(layer_obj, dip, dipdir, "lines"),
+                    artists)
+
+            if self.ax_rose is not None:
+                self.draw_rose(layer_obj, dipdir, layer_obj.get_marker_fill(),
+                               layer_obj.get_marker_edge_color())
+
+        if layer_type == "smallcircle" and ax_stereo is not None:
+            dipdir, dip, angle = self.parse_smallcircles(layer_obj)
+            self.collect_artists(
+                self.draw_smallcircles(layer_obj, dipdir, dip, angle), artists)
+
+        return artists
+
+    def draw_layers(self, layers):
+        """
+        Draws a list of layers and removes the artists of all other layers.
+
+        The artists of each layer are stored in a registry, together with the
+        data and style version of the layer at the time it was drawn. Layers
+        whose versions did not change keep their artists. Changed layers have
+        their artists removed and are drawn again. Artists of layers that are
+        no longer in the list (hidden or deleted) are removed and their
+        pending contour jobs are discarded. Finally the legend is drawn again.
+        """
+        drawn = set()
+        for layer_obj in layers:
+            drawn.add(layer_obj)
+            key = layer_obj.get_version()
+            registered = self.layer_artists.get(layer_obj)
+            if registered is not None:
+                if registered[0] == key:
+                    continue
+                self.remove_artists(registered[1])
+            self.layer_artists[layer_obj] = (key, self.draw_layer(layer_obj))
+
+        #Remove the artists of layers that were hidden or deleted
+        for layer_obj in list(self.layer_artists):
+            if layer_obj not in drawn:
+                key, artists = self.layer_artists.pop(layer_obj)
+                self.remove_artists(artists)
+                if self.density_worker is not None:
+                    self.density_worker.cancel(layer_obj)
+                if self.stress_worker is not None:
+                    self.stress_worker.cancel(layer_obj)
+                if layer_obj in self.rose_bars:
+                    self.remove_artists(self.rose_bars.pop(layer_obj)[1])
+
+        #Scale the rose diagram and the paleostress plots to what is left
+        for axis in (self.ax_rose, self.ax_fluc, self.ax_mohr):
+            if axis is not None:
+                axis.relim()
+                axis.autoscale_view()
+
+        if self.ax_stereo is not None:
+            legend = self.ax_stereo.get_legend()
+            if legend is not None:
+                legend.remove()
+
+        if self.ax_stereo is not None and \
+                    self.settings.get_draw_legend() == True:
+            handles, labels = self.ax_stereo.get_legend_handles_labels()
+            newLabels, newHandles = [], []
+            for handle, label in zip(handles, labels):
+                if label not in newLabels:
+                    newLabels.append(label)
+                    newHandles.append(handle)
+            if len(handles) != 0:
+                self.ax_stereo.legend(newHandles, newLabels,
+                                      bbox_to_anchor=(1.3, 1.1))
+
+    def save_figure(self, path, layers, dpi=None):
+        """
+        Draws the layers and saves the figure to a file.
+        """
+        self.draw_layers(layers)
+        self.write_figure(path, dpi)
+
+    def write_figure(self, path, dpi=None):
+        """
+        Saves the figure as it is drawn to a file.
+
+        The format is taken from the extension of the path (e.g. ".png",
+        ".svg" or ".pdf"). If no dpi is passed, the pixel density of the
+        plot settings is used.
+        """
+        if dpi is None:
+            dpi = self.settings.get_pixel_density()
+        self.fig.savefig(path, dpi=dpi,
+                         facecolor=self.fig.get_facecolor(),
+                         bbox_inches="tight")
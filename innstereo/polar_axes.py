@@ -14,7 +14,6 @@ matplotlib-polar-plot-go-clockwise-with-0%C2%B0-at-the-to?lq=1
 
 import numpy as np
 from matplotlib.projections import PolarAxes, register_projection
-from matplotlib.transforms import Affine2D, Bbox, IdentityTransform
 
 
 class NorthPolarAxes(PolarAxes):
@@ -23,117 +22,21 @@ class NorthPolarAxes(PolarAxes):
     """
     Custom MPL-PolarAxes with theta 0 in the north and counting clockwise.
 
-    This class inherits from, and overrides some of the methods of the
-    Matplotlib PolarAxes-class. This class contains the NorthPolarTransfrom-
-    and InvertedNorthPolarTransform-class. It also overrides the name-string
-    and the '_set_lim_and_transforms'-function.
+    This class inherits from the Matplotlib PolarAxes-class. It only
+    overrides the name-string and the default theta offset and direction,
+    which the PolarAxes keep when they are cleared. The transformations of
+    the PolarAxes-class are used, so the projection works on every backend,
+    including the Agg-backend of the headless renderer.
     """
 
     name = "northpolar"
 
-    class NorthPolarTransform(PolarAxes.PolarTransform):
-        # pylint: disable=no-init
-
-        """
-        Custom normal transformation for the NorthPolarAxes.
-
-        This class contains two function that override function in the
-        Matplotlib PolarAxes.PolarTransform-class. The transformation is
-        changed so 0 degrees is in the North and theta counts clockwise.
-        """
-
-        def transform(self, tr):
-            # pylint: disable=no-self-use,invalid-name
-            """
-            Overrides the transformation of the PolarTranform-class.
-
-            This method overrides the same method in the PolarTransform-class.
-            The new tranformation is North-up and counts clockwise positive.
-            """
-            xy = np.zeros(tr.shape, np.float_)
-            t = tr[:, 0:1]  # pylint: disable=invalid-name
-            r = tr[:, 1:2]  # pylint: disable=invalid-name
-            x = xy[:, 0:1]  # pylint: disable=invalid-name
-            y = xy[:, 1:2]  # pylint: disable=invalid-name
-            x[:] = r * np.sin(t)
-            y[:] = r * np.cos(t)
-            return xy
-
-        transform_non_affine = transform
-
-        def inverted(self):
-            # pylint: disable=no-self-use
-            """
-            Returns the inverted transformation class.
-
-            The transformation also has to have a method to return the
-            inverted transformation.
-            """
-            return NorthPolarAxes.InvertedNorthPolarTransform()
-
-    class InvertedNorthPolarTransform(PolarAxes.InvertedPolarTransform):
-        # pylint: disable=no-init
-
-        """
-        Custom inverted transformation for the NorthPolarAxes.
-
-        This class contains two function that override function in the
-        Matplotlib PolarAxes.InvertedPolarTransform-class. The transformation
-        is changed so 0 degrees is in the North and theta counts clockwise.
-        """
-
-        def transform(self, xy):
-            # pylint: disable=no-self-use,invalid-name
-            """
-            Overrides the transformation of the InvertedPolarTransform-class.
-
-            This method overrides the same method in the
-            InvertedPolarTransform-class. The new tranformation is North-up
-            and counts clockwise positive.
-            """
-            x = xy[:, 0:1]  # pylint: disable=invalid-name
-            y = xy[:, 1:]  # pylint: disable=invalid-name
-            r = np.sqrt(x * x + y * y)  # pylint: disable=invalid-name
-            theta = np.arctan2(y, x)
-            return np.concatenate((theta, r), 1)
-
-        def inverted(self):
-            # pylint: disable=no-self-use
-            """
-            Returns the normal transformation class.
-
-            The inverted transformation also has to have a method to return the
-            normal transformation.
-            """
-            return NorthPolarAxes.NorthPolarTransform()
-
-    def _set_lim_and_transforms(self):
+    def __init__(self, *args, **kwargs):
         """
-        Overrides the method with the same name in the PolarAxes-class.
-
-        This method replaces the same method in the PolarAxes-class. It ensures
-        that the limits and label placement fit the north-polar projection.
+        Initializes the axes with theta 0 in the North, counting clockwise.
         """
-        PolarAxes._set_lim_and_transforms(self)
-        self.transProjection = self.NorthPolarTransform()
-        # pylint: attribute-defined-outside-init,invalid-name
-        self.transData = (
-            self.transScale + 
-            self.transProjection + 
-            (self.transProjectionAffine + self.transAxes))
-        # pylint: attribute-defined-outside-init,invalid-name
-        self._xaxis_transform = (
-            self.transProjection +
-            self.PolarAffine(IdentityTransform(), Bbox.unit()) +
-            self.transAxes)  # pylint: attribute-defined-outside-init
-        self._xaxis_text1_transform = (
-            self._theta_label1_position +
-            self._xaxis_transform)  # pylint: attribute-defined-outside-init
-        self._yaxis_transform = (
-            Affine2D().scale(np.pi * 2.0, 1.0) +
-            self.transData)  # pylint: attribute-defined-outside-init
-        self._yaxis_text1_transform = (
-            Affine2D().scale(1.0 / 360.0, 1.0) +
-            self._yaxis_transform)  # pylint: attribute-defined-outside-init
+        kwargs.setdefault("theta_offset", np.pi / 2)
+        kwargs.setdefault("theta_direction", -1)
+        PolarAxes.__init__(self, *args, **kwargs)
 
 register_projection(NorthPolarAxes)
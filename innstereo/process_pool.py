@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+
+"""
+This module holds the pool of processes that the program shares.
+
+Parsing text files, clustering orientations and inverting paleostress
+tensors hold the GIL for most of the time, so they run in processes instead
+of threads. The main window also runs threads (e.g. the journal writer and
+the density workers) and forking a process with running threads can
+deadlock, so the processes of the pool are started with the "spawn"-method.
+The pool is created when it is first used and reused for all later jobs, so
+the processes only start once. The worker processes import the package
+without the main window.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+
+#The shared pool, created by get_process_pool
+shared_pool = None
+
+
+def get_process_pool():
+    """
+    Returns the shared pool of processes.
+
+    The pool has one process per processor. It is created the first time
+    this function is called.
+    """
+    global shared_pool
+    if shared_pool is None:
+        shared_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1,
+                            mp_context=multiprocessing.get_context("spawn"))
+    return shared_pool
+
+
+def shutdown_process_pool():
+    """
+    Stops the processes of the shared pool.
+
+    Jobs that have not started yet are cancelled. A later call of
+    get_process_pool creates a new pool.
+    """
+    global shared_pool
+    if shared_pool is not None:
+        shared_pool.shutdown(wait=False, cancel_futures=True)
+        shared_pool = None
@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+
+"""
+This module saves and loads InnStereo projects.
+
+A project file is a zip-archive. It holds a small JSON-file with the layer
+tree, the style of each layer and the plot settings. The data of each layer
+is stored column by column as little-endian .npy-members. The members are not
+compressed, so the ProjectArchive-class can memory-map the columns directly
+from the archive. Opening a project only reads the JSON-file, and the data of
+a layer is only read from the disk when the layer is used.
+"""
+
+import io
+import json
+import os
+import struct
+import zipfile
+import numpy as np
+
+#The version of the project format that this module writes
+PROJECT_FORMAT_VERSION = 1
+
+#The extension of project files
+PROJECT_EXTENSION = ".innstereo"
+
+#The name of the member that holds the layer tree and settings
+METADATA_NAME = "project.json"
+
+#The fixed part of the local file header of a zip-member
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+
+
+def column_member_name(layer_number, column_number):
+    """
+    Returns the name of the archive member of a column of a layer.
+    """
+    return "layers/{0}/column_{1}.npy".format(layer_number, column_number)
+
+
+def prepare_column(column):
+    """
+    Returns a column as a little-endian array that can be memory-mapped.
+
+    Float columns are stored as float64. Text columns are stored as
+    fixed-width unicode arrays, because arrays of python objects can not be
+    memory-mapped.
+    """
+    column = np.asarray(column)
+    if column.dtype.kind == "f":
+        return np.ascontiguousarray(column, dtype="<f8")
+    strings = np.array([str(value) for value in column.tolist()], dtype=str)
+    if strings.dtype.itemsize == 0:
+        strings = strings.astype("<U1")
+    return strings.astype(strings.dtype.newbyteorder("<"))
+
+
+def save_project(path, tree, settings):
+    """
+    Writes a project to a file.
+
+    The tree is a list of nodes. A group is a dictionary with the keys
+    "kind" ("group"), "label", "visible" and "children". A layer has the keys
+    "kind" ("layer"), "label", "visible", "layer_type", "style" and "columns",
+    which is a list of arrays. The settings are a dictionary of the plot
+    settings. The project is written to a temporary file first, which then
+    replaces the old file. Layers that are still memory-mapped from the old
+    file keep their data.
+    """
+    temp_path = path + ".tmp"
+    layer_count = [0]
+
+    with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_STORED,
+                         allowZip64=True) as archive:
+
+        def write_nodes(nodes):
+            saved = []
+            for node in nodes:
+                node = dict(node)
+                if node["kind"] == "group":
+                    node["children"] = write_nodes(node["children"])
+                else:
+                    names = []
+                    for k, column in enumerate(node["columns"]):
+                        name = column_member_name(layer_count[0], k)
+                        with archive.open(name, "w",
+                                          force_zip64=True) as member:
+                            np.lib.format.write_array(member,
+                                                      prepare_column(column),
+                                                      allow_pickle=False)
+                        names.append(name)
+                    node["columns"] = names
+                    layer_count[0] += 1
+                saved.append(node)
+            return saved
+
+        metadata = {"format_version": PROJECT_FORMAT_VERSION,
+                    "settings": settings,
+                    "layers": write_nodes(tree)}
+        archive.writestr(METADATA_NAME, json.dumps(metadata, indent=1,
+                                                   sort_keys=True))
+    os.replace(temp_path, path)
+
+
+class ProjectArchive(object):
+
+    """
+    Reads a project file.
+
+    The layer tree and settings are read when the archive is opened. The
+    columns of the layers are read on demand with the read_column-method.
+    Uncompressed members are memory-mapped, so only the parts of a column
+    that are used are read from the disk.
+    """
+
+    def __init__(self, path):
+        """
+        Opens a project file and reads its metadata.
+
+        Raises a ValueError if the file was written by a newer version of
+        the project format.
+        """
+        self.path = path
+        with zipfile.ZipFile(path, "r") as archive:
+            self.members = {info.filename: info
+                            for info in archive.infolist()}
+            self.metadata = json.loads(
+                                archive.read(METADATA_NAME).decode("utf-8"))
+        if self.metadata.get("format_version", 0) > PROJECT_FORMAT_VERSION:
+            raise ValueError("The project was saved by a newer version.")
+
+    def get_layer_tree(self):
+        """
+        Returns the list of nodes of the layer tree.
+
+        The nodes are the same as for save_project, but the "columns" of a
+        layer are the names of the archive members.
+        """
+        return self.metadata["layers"]
+
+    def get_settings(self):
+        """
+        Returns the dictionary of the plot settings.
+        """
+        return self.metadata.get("settings", {})
+
+    def get_data_offset(self, info):
+        """
+        Returns the offset of the data of a member in the archive file.
+        """
+        with open(self.path, "rb") as project_file:
+            project_file.seek(info.header_offset)
+            header = LOCAL_HEADER.unpack(
+                                project_file.read(LOCAL_HEADER.size))
+        return info.header_offset + LOCAL_HEADER.size + header[10] + \
+               header[11]
+
+    def read_column(self, name):
+        """
+        Returns the array of a member.
+
+        Members that are stored without compression are memory-mapped in
+        copy-on-write mode, so edits of the layers never change the file.
+        Compressed members (e.g. if the archive was packed again by another
+        program) are read into memory.
+        """
+        info = self.members[name]
+        if info.compress_type != zipfile.ZIP_STORED:
+            with zipfile.ZipFile(self.path, "r") as archive:
+                return np.load(io.BytesIO(archive.read(name)),
+                               allow_pickle=False)
+
+        offset = self.get_data_offset(info)
+        with open(self.path, "rb") as project_file:
+            project_file.seek(offset)
+            version = np.lib.format.read_magic(project_file)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(project_file)
+            else:
+                header = np.lib.format.read_array_header_2_0(project_file)
+            data_offset = project_file.tell()
+        shape, fortran_order, dtype = header
+
+        if int(np.prod(shape)) == 0:
+            return np.zeros(shape, dtype=dtype)
+        order = "F" if fortran_order else "C"
+        return np.memmap(self.path, dtype=dtype, mode="c",
+                         offset=data_offset, shape=shape, order=order)
+
+    def read_columns(self, names):
+        """
+        Returns a list with the arrays of several members.
+        """
+        return [self.read_column(name) for name in names]
@@ -0,0 +1,130 @@
+#!/usr/bin/python3
+
+"""
+This module contains the RedrawScheduler-class.
+
+Editing cells in the data-view, applying dialogs or creating layers all
+require the plot to be redrawn. Instead of redrawing the plot right away, these
+actions request a redraw from the scheduler. The scheduler collects all
+requests that arrive before the Gtk main loop becomes idle and runs a single
+redraw for them.
+"""
+
+from gi.repository import GLib
+import time
+
+
+class RedrawScheduler(object):
+
+    """
+    Collapses bursts of redraw requests into a single redraw.
+
+    The first request schedules the redraw function on GLib idle. Further
+    requests only add their reason to the pending redraw until it has run.
+    An optional minimum interval (in milliseconds) delays a redraw that
+    would follow the previous redraw too closely.
+    """
+
+    def __init__(self, redraw_function, min_interval=0):
+        """
+        Initializes the scheduler with the function that redraws the plot.
+
+        The redraw function has to accept the checkout_canvas keyword of the
+        MainWindow redraw_plot-method. The minimum interval between two
+        redraws is given in milliseconds. The default of 0 redraws as soon as
+        the main loop is idle.
+        """
+        self.redraw_function = redraw_function
+        self.min_interval = min_interval
+        self.source_id = None
+        self.reasons = []
+        self.checkout_canvas = False
+        self.last_redraw = None
+
+    def request_redraw(self, reason="", checkout_canvas=False):
+        """
+        Requests a redraw of the plot.
+
+        The reason is a short string that describes what changed (e.g.
+        "dip edited"). If the canvas has to be checked out again for any
+        of the pending requests, the redraw does so once.
+        """
+        self.reasons.append(reason)
+        if checkout_canvas == True:
+            self.checkout_canvas = True
+        if self.source_id is not None:
+            return
+
+        wait = self.get_remaining_interval()
+        if wait > 0:
+            self.source_id = GLib.timeout_add(wait, self.on_redraw_due)
+        else:
+            self.source_id = GLib.idle_add(self.on_redraw_due)
+
+    def get_remaining_interval(self):
+        """
+        Returns the milliseconds until the minimum interval has passed.
+
+        Returns 0 if there is no minimum interval or if it has already passed
+        since the last redraw.
+        """
+        if self.min_interval <= 0 or self.last_redraw is None:
+            return 0
+        elapsed = (time.monotonic() - self.last_redraw) * 1000
+        return max(0, int(self.min_interval - elapsed))
+
+    def get_pending_reasons(self):
+        """
+        Returns the reasons of all requests that are waiting for the redraw.
+        """
+        return list(self.reasons)
+
+    def is_pending(self):
+        """
+        Returns True if a redraw is scheduled but has not run yet.
+        """
+        return self.source_id is not None
+
+    def on_redraw_due(self):
+        """
+        Runs the pending redraw. Called from the GLib main loop.
+
+        Returns False so GLib removes the idle- or timeout-source after it
+        has run once.
+        """
+        self.source_id = None
+        self.run_redraw()
+        return False
+
+    def run_redraw(self):
+        """
+        Resets the pending requests and calls the redraw function.
+        """
+        checkout_canvas = self.checkout_canvas
+        self.reasons = []
+        self.checkout_canvas = False
+        self.last_redraw = time.monotonic()
+        self.redraw_function(checkout_canvas=checkout_canvas)
+
+    def flush(self):
+        """
+        Runs a pending redraw immediately.
+
+        This is used when the plot has to be up to date before the main loop
+        becomes idle (e.g. before saving the figure).
+        """
+        if self.source_id is None:
+            return
+        GLib.source_remove(self.source_id)
+        self.source_id = None
+        self.run_redraw()
+
+    def cancel(self):
+        """
+        Drops a pending redraw without running it.
+        """
+        if self.source_id is not None:
+            GLib.source_remove(self.source_id)
+            self.source_id = None
+        self.reasons = []
+        self.checkout_canvas = False
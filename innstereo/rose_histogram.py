@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+
+"""
+This module calculates the histograms of the rose diagram.
+
+Plane- and line-layers show the distribution of their dip directions in the
+rose diagram. The azimuths are assigned to bins of the spacing that is set in
+the layer properties and counted with numpy.bincount. The
+RoseHistogramCache-class keeps the counts of each layer until its data or the
+spacing changes.
+"""
+
+import weakref
+import numpy as np
+
+
+def rose_bins(azimuths, spacing):
+    """
+    Returns the index of the bin for each azimuth.
+
+    Expects the azimuths in degrees and the spacing of the bins in degrees.
+    Azimuths are wrapped into the range of 0 to 360 degrees first, so 360 is
+    counted in the same bin as 0.
+    """
+    num_bins = int(360 / spacing)
+    azimuths = np.mod(np.asarray(azimuths, dtype=np.float64), 360)
+    bins = (azimuths * (num_bins / 360.0)).astype(np.intp)
+    bins[bins >= num_bins] = num_bins - 1
+    return bins
+
+
+def rose_counts(azimuths, spacing):
+    """
+    Returns the number of azimuths in each bin of the rose diagram.
+
+    Returns an integer array with int(360 / spacing) bins. The first bin
+    starts at 0 degrees.
+    """
+    num_bins = int(360 / spacing)
+    return np.bincount(rose_bins(azimuths, spacing), minlength=num_bins)
+
+
+def rose_bin_edges(spacing):
+    """
+    Returns the left edges (in radians) and the width of the bins.
+    """
+    num_bins = int(360 / spacing)
+    width = 2 * np.pi / num_bins
+    return np.arange(num_bins) * width, width
+
+
+class RoseHistogramCache(object):
+
+    """
+    Stores the rose diagram counts of each layer.
+
+    The counts are stored together with the data version of the layer and the
+    spacing of the bins. They are calculated again when either of them
+    changes. Deleted layers are dropped from the cache automatically.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty cache.
+        """
+        self.counts = weakref.WeakKeyDictionary()
+
+    def get_counts(self, layer_obj, azimuths, spacing):
+        """
+        Returns the counts of the azimuths of a layer.
+
+        The azimuths have to be the dip directions of the layer in degrees.
+        The counts are shared with the cache and must not be modified.
+        """
+        key = (layer_obj.get_data_version(), spacing)
+        cached = self.counts.get(layer_obj)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        counts = rose_counts(azimuths, spacing)
+        self.counts[layer_obj] = (key, counts)
+        return counts
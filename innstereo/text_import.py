@@ -0,0 +1,287 @@
+#!/usr/bin/python3
+
+"""
+This module contains the LineOffsetIndex-class for reading large text files.
+
+Field-logger exports can be hundreds of megabytes large. The file-parse
+dialog only shows a small window of the rows of such a file. The
+LineOffsetIndex scans the file once and stores the byte offset of the start
+of each line. Any window of lines can then be read with a single seek. The
+functions of this module convert the columns of the whole file into
+NumPy-arrays for the import.
+"""
+
+import numpy as np
+
+#The number of bytes that are read at once while the file is scanned
+SCAN_BLOCK_SIZE = 2 ** 24
+
+
+class LineOffsetIndex(object):
+
+    """
+    Stores the byte offsets of the line starts of a text file.
+
+    The file is opened in binary mode and kept open until the close-method
+    is called. The offsets are stored in a NumPy-array, which has one more
+    entry than the file has lines. The last entry is the size of the file.
+    """
+
+    def __init__(self, path, encoding="utf-8"):
+        """
+        Opens the file and scans it for line breaks.
+
+        Lines are separated by "\\n". A "\\r" before it is removed when the
+        lines are decoded, so files with Windows line endings work as well.
+        """
+        self.path = path
+        self.encoding = encoding
+        self.file = open(path, "rb")
+        self.offsets = self.scan()
+
+    def scan(self):
+        """
+        Returns the offsets of all line starts and the end of the file.
+
+        The file is read in blocks of SCAN_BLOCK_SIZE bytes and the line
+        breaks of each block are found with NumPy.
+        """
+        starts = [np.zeros(1, dtype=np.int64)]
+        position = 0
+        self.file.seek(0)
+        while True:
+            block = self.file.read(SCAN_BLOCK_SIZE)
+            if len(block) == 0:
+                break
+            breaks = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 10)
+            starts.append(breaks.astype(np.int64) + position + 1)
+            position += len(block)
+
+        offsets = np.concatenate(starts)
+        if offsets[-1] != position:
+            #The last line has no line break
+            offsets = np.append(offsets, position)
+        return offsets
+
+    def get_line_count(self):
+        """
+        Returns the number of lines in the file.
+        """
+        return len(self.offsets) - 1
+
+    def get_offset(self, line):
+        """
+        Returns the byte offset of the start of a line.
+        """
+        return int(self.offsets[line])
+
+    def read_bytes(self, start, count=None):
+        """
+        Returns the raw bytes of count lines, beginning at the start line.
+
+        If count is None all lines until the end of the file are returned.
+        """
+        line_count = self.get_line_count()
+        start = min(max(0, int(start)), line_count)
+        if count is None:
+            end = line_count
+        else:
+            end = min(start + int(count), line_count)
+        self.file.seek(self.offsets[start])
+        return self.file.read(int(self.offsets[end] - self.offsets[start]))
+
+    def read_text(self, start, count=None):
+        """
+        Returns count lines, beginning at the start line, as one string.
+
+        Bytes that can not be decoded are replaced.
+        """
+        return self.read_bytes(start, count).decode(self.encoding,
+                                                    errors="replace")
+
+    def read_lines(self, start, count=None):
+        """
+        Returns a list of count lines, beginning at the start line.
+
+        The lines are decoded and returned without their line breaks.
+        """
+        text = self.read_text(start, count)
+        lines = text.split("\n")
+        if len(lines) > 0 and lines[-1] == "":
+            lines.pop()
+        return [line.rstrip("\r") for line in lines]
+
+    def iter_lines(self, start=0, block_lines=100000):
+        """
+        Iterates over all lines, beginning at the start line.
+
+        The lines are read in blocks of block_lines, so the whole file does
+        not have to be held in memory.
+        """
+        line_count = self.get_line_count()
+        for block_start in range(int(start), line_count, block_lines):
+            for line in self.read_lines(block_start, block_lines):
+                yield line
+
+    def close(self):
+        """
+        Closes the file.
+        """
+        if not self.file.closed:
+            self.file.close()
+
+
+def split_text_columns(text, columns, dialect=None):
+    """
+    Splits the rows of a text into columns and returns the chosen columns.
+
+    Without a dialect the columns of a row are separated by semicolons or
+    commas. A TextDialect (see text_sniffer) converts its delimiter into
+    semicolons first, or splits each row itself if the text has quoted
+    fields. Expects a list of column numbers. Returns a list with a list of
+    strings for each column number. Rows that are too short get empty
+    strings. A column number of -1 returns None instead of a list. If all
+    rows have the same number of columns, which is the usual case, the whole
+    text is split in one step and the columns are sliced out of the result.
+    """
+    if text == "":
+        return [None if column < 0 else [] for column in columns]
+    text = text.replace("\r", "")
+    if text.endswith("\n"):
+        text = text[:-1]
+    if dialect is None:
+        text = text.replace(",", ";")
+    else:
+        normalized = dialect.normalize(text)
+        if normalized is None:
+            rows = [dialect.split_line(line) for line in text.split("\n")]
+            return [None if column < 0 else
+                    [row[column] if len(row) > column else "" for row in rows]
+                    for column in columns]
+        text = normalized
+
+    #Count the separators of each row
+    data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+    row_ends = np.append(np.flatnonzero(data == 10), len(data))
+    separators = np.searchsorted(np.flatnonzero(data == 59), row_ends)
+    per_row = np.diff(separators, prepend=0)
+    row_count = len(row_ends)
+
+    if np.all(per_row == per_row[0]):
+        width = int(per_row[0]) + 1
+        fields = text.replace("\n", ";").split(";")
+        get_column = lambda column: fields[column::width]
+    else:
+        rows = [line.split(";") for line in text.split("\n")]
+        width = None
+        get_column = lambda column: [row[column] if len(row) > column
+                                     else "" for row in rows]
+
+    selected = []
+    for column in columns:
+        if column < 0:
+            selected.append(None)
+        elif width is not None and column >= width:
+            selected.append([""] * row_count)
+        else:
+            selected.append(get_column(column))
+    return selected
+
+
+def convert_floats(strings):
+    """
+    Converts a list of strings into a float-array.
+
+    Strings that are not numbers (e.g. headers or empty cells) are returned
+    as NaN.
+    """
+    try:
+        return np.array(strings, dtype=np.float64)
+    except ValueError:
+        values = np.empty(len(strings), dtype=np.float64)
+        for k, string in enumerate(strings):
+            try:
+                values[k] = float(string)
+            except ValueError:
+                values[k] = np.nan
+        return values
+
+
+def map_codes(strings, mapping, default=""):
+    """
+    Translates the first character of each string with a dictionary.
+
+    This is used for sense-codes (e.g. "1" = "up" in TectonicsFP files).
+    Returns an object-array of the translated strings. Strings whose first
+    character is not in the mapping are translated to the default.
+    """
+    codes = np.array(strings, dtype="U1")
+    keys = np.array(sorted(mapping), dtype="U1")
+    values = np.array([mapping[key] for key in sorted(mapping)], dtype=object)
+    result = np.empty(len(codes), dtype=object)
+    result.fill(default)
+    if len(keys) == 0 or len(codes) == 0:
+        return result
+    positions = np.minimum(np.searchsorted(keys, codes), len(keys) - 1)
+    found = keys[positions] == codes
+    result[found] = values[positions[found]]
+    return result
+
+
+def convert_strings(strings):
+    """
+    Converts a list of strings into an object-array of stripped strings.
+    """
+    values = np.empty(len(strings), dtype=object)
+    values[:] = [string.strip() for string in strings]
+    return values
+
+
+def read_column_arrays(index, start_line, float_columns, text_column,
+                       sense_codes=None, group_column=-1, dialect=None):
+    """
+    Reads the chosen columns of all rows of a file into arrays.
+
+    Expects a LineOffsetIndex, the first line that holds data, the numbers of
+    the columns that hold the values (e.g. dip direction and dip) and the
+    number of the column that holds the text (stratigraphy or sense). Columns
+    that are not assigned (-1) are filled with 0 or an empty string. If a
+    dictionary of sense_codes is passed, the text column holds codes that are
+    translated with it (e.g. TectonicsFP files). Rows where an assigned value
+    is not a number (e.g. a header) are left out. Returns a list of arrays in
+    the order of the columns of the layer and an array with the stripped
+    values of the group column, which is None if no group column is set. A
+    TextDialect sets the delimiter and decimal separator of the file.
+    """
+    text = index.read_text(start_line)
+    columns = split_text_columns(text, float_columns +
+                                       [text_column, group_column], dialect)
+    row_count = max(0, index.get_line_count() - start_line)
+
+    arrays = []
+    for column in columns[:-2]:
+        if column is None:
+            arrays.append(np.zeros(row_count))
+        elif dialect is not None:
+            arrays.append(dialect.to_floats(column))
+        else:
+            arrays.append(convert_floats(column))
+
+    if columns[-2] is None:
+        text_values = np.empty(row_count, dtype=object)
+        text_values.fill("")
+    elif sense_codes is not None:
+        text_values = map_codes(columns[-2], sense_codes)
+    else:
+        text_values = convert_strings(columns[-2])
+    arrays.append(text_values)
+
+    valid = np.ones(row_count, dtype=bool)
+    for values in arrays[:-1]:
+        valid &= ~np.isnan(values)
+
+    if columns[-1] is None:
+        groups = None
+    else:
+        groups = convert_strings(columns[-1])[valid]
+    return [values[valid] for values in arrays], groups
@@ -0,0 +1,360 @@
+#!/usr/bin/python3
+
+"""
+This module detects the layout of text files before they are imported.
+
+Exports of field-loggers and spreadsheets use different delimiters (tabs,
+semicolons, commas or spaces), quoted fields, decimal commas and header
+rows. The sniff_dialect-function samples the first lines of a file and
+returns a TextDialect that describes the layout. The dialect also guesses
+which columns hold the dip directions, dips and senses, so the file-parse
+dialog can select them in advance. The TextDialect splits the whole file for
+the import.
+"""
+
+import csv
+import re
+from collections import Counter
+import numpy as np
+
+from .text_import import convert_floats
+
+#The number of lines at the start of a file that are sampled
+SNIFF_LINES = 200
+
+#The delimiters that are tried, in the order of preference. A space stands
+#for any number of spaces and tabs.
+DELIMITERS = ("\t", ";", ",", "|", " ")
+
+#The share of lines that must have the same number of fields
+CONSISTENCY = 0.9
+
+#The most header lines that are detected
+MAX_HEADER_LINES = 20
+
+#Values of a sense column
+SENSE_WORDS = {"up", "dn", "dex", "sin", "uk", "ukn", "unk", ""}
+
+#Patterns for the column names of a header
+NAME_PATTERNS = {
+    "dipdir": re.compile(r"dip.?dir|azimuth|^dd$|^dipaz|trend|bearing"),
+    "dip": re.compile(r"^dip$|^dip[^a-z]|dip$|plunge|inclination"),
+    "sense": re.compile(r"sense|movement|kinemati|shear"),
+    "text": re.compile(r"strat|unit|formation|label|comment|name|layer"),
+    "linear": re.compile(r"lin|plunge|trend|striae|stria")}
+
+NUMBER_DOT = re.compile(r"^[+-]?\d+\.\d+$")
+NUMBER_COMMA = re.compile(r"^[+-]?\d+,\d+$")
+WHITESPACE = re.compile(r"[ \t]+")
+LINE_EDGES = re.compile(r"^[ \t]+|[ \t]+$", re.MULTILINE)
+
+
+class TextDialect(object):
+
+    """
+    Describes the layout of a text file and splits its lines.
+
+    The dialect stores the delimiter (a space means any whitespace), the
+    decimal separator, the quote character (None if the file has no quoted
+    fields), the number of header lines, the column names and types and
+    the columns that were guessed for the dip directions, dips and senses.
+    """
+
+    def __init__(self, delimiter=";", decimal=".", quote=None,
+                 header_lines=0, column_names=None, column_types=None,
+                 suggestions=None):
+        """
+        Initializes the dialect.
+        """
+        self.delimiter = delimiter
+        self.decimal = decimal
+        self.quote = quote
+        self.header_lines = header_lines
+        self.column_names = column_names or []
+        self.column_types = column_types or []
+        self.suggestions = suggestions or {}
+
+    def to_dict(self):
+        """
+        Returns the dialect as a dictionary, e.g. for a ColumnMapping.
+        """
+        return {"delimiter": self.delimiter, "decimal": self.decimal,
+                "quote": self.quote, "header_lines": self.header_lines,
+                "column_names": self.column_names,
+                "column_types": self.column_types,
+                "suggestions": self.suggestions}
+
+    @classmethod
+    def from_dict(cls, values):
+        """
+        Returns a new dialect from a dictionary.
+        """
+        return cls(values.get("delimiter", ";"), values.get("decimal", "."),
+                   values.get("quote"), values.get("header_lines", 0),
+                   values.get("column_names"), values.get("column_types"),
+                   values.get("suggestions"))
+
+    def get_suggestion(self, key):
+        """
+        Returns the guessed column for a key, or -1 if there is none.
+
+        The keys are "plane_dipdir", "plane_dip", "line_dipdir", "line_dip",
+        "sense" and "text".
+        """
+        return self.suggestions.get(key, -1)
+
+    def get_layer_columns(self, layer_type):
+        """
+        Returns the guessed columns for a type of layer.
+
+        Returns the list of float columns, the text column and True if the
+        text column holds TectonicsFP sense-codes. A line-layer takes the
+        first pair of columns if no linear columns were named, and its text
+        column is the sense. Unknown columns are -1.
+        """
+        get = self.get_suggestion
+        plane = [get("plane_dipdir"), get("plane_dip")]
+        line = [get("line_dipdir"), get("line_dip")]
+        sense = get("sense")
+        use_tfpl = self.suggestions.get("sense_codes", False)
+        if layer_type == "line":
+            if line[0] == -1:
+                line = plane
+            if sense == -1:
+                sense = get("text")
+            return line, sense, use_tfpl
+        elif layer_type == "faultplane":
+            return plane + line, sense, use_tfpl
+        elif layer_type == "smallcircle":
+            return plane + [-1], -1, False
+        return plane, get("text"), False
+
+    def split_line(self, line):
+        """
+        Splits one line into a list of fields.
+        """
+        if self.quote is not None:
+            if self.delimiter == " ":
+                reader = csv.reader([line.strip()], delimiter=" ",
+                                    quotechar=self.quote,
+                                    skipinitialspace=True)
+            else:
+                reader = csv.reader([line], delimiter=self.delimiter,
+                                    quotechar=self.quote)
+            return next(reader, [])
+        elif self.delimiter == " ":
+            return line.split()
+        else:
+            return line.split(self.delimiter)
+
+    def normalize(self, text):
+        """
+        Returns the text with semicolons between all fields, or None.
+
+        This is the fast path for split_text_columns. None is returned if
+        the text can not be converted by replacing characters (e.g. because
+        of quoted fields or semicolons inside fields).
+        """
+        if self.quote is not None and self.quote in text:
+            return None
+        if self.delimiter == ";":
+            return text
+        if ";" in text:
+            return None
+        if self.delimiter == " ":
+            return WHITESPACE.sub(";", LINE_EDGES.sub("", text))
+        return text.replace(self.delimiter, ";")
+
+    def to_floats(self, strings):
+        """
+        Converts a list of strings into a float-array.
+
+        Decimal commas are replaced by points first.
+        """
+        if self.decimal == "," and len(strings) > 0:
+            strings = "\n".join(strings).replace(",", ".").split("\n")
+        return convert_floats(strings)
+
+
+def count_fields(lines, delimiter, quote):
+    """
+    Returns the most common number of fields and the share of lines with it.
+    """
+    dialect = TextDialect(delimiter, quote=quote)
+    counts = Counter(len(dialect.split_line(line)) for line in lines)
+    fields, count = counts.most_common(1)[0]
+    return fields, count / float(len(lines))
+
+
+def detect_delimiter(lines, quote):
+    """
+    Returns the delimiter of the sampled lines.
+
+    The first delimiter in DELIMITERS that splits the lines into the same
+    number (at least two) of fields is chosen. A comma is only chosen if
+    the fields of the other consistent delimiters do not hold decimal
+    commas, because "123,4 56,7" splits into the same number of fields at
+    the commas as well. If no delimiter is consistent, the most consistent
+    one is returned.
+    """
+    best = (0, ";")
+    consistent = []
+    for delimiter in DELIMITERS:
+        fields, share = count_fields(lines, delimiter, quote)
+        if fields < 2:
+            continue
+        if share >= CONSISTENCY:
+            consistent.append(delimiter)
+        best = max(best, (share, delimiter))
+    if len(consistent) == 0:
+        return best[1]
+
+    if consistent[0] == ",":
+        for delimiter in consistent[1:]:
+            dialect = TextDialect(delimiter, quote=quote)
+            rows = [dialect.split_line(line) for line in lines]
+            if detect_decimal(rows) == ",":
+                return delimiter
+    return consistent[0]
+
+
+def detect_decimal(rows):
+    """
+    Returns "," if the fields use decimal commas, otherwise ".".
+    """
+    dots = 0
+    commas = 0
+    for row in rows:
+        for field in row:
+            field = field.strip()
+            if NUMBER_DOT.match(field):
+                dots += 1
+            elif NUMBER_COMMA.match(field):
+                commas += 1
+    return "," if commas > dots else "."
+
+
+def guess_columns(names, types, rows, dialect):
+    """
+    Guesses which columns hold the dip directions, dips and senses.
+
+    The names of the header are checked first. Columns without a helpful
+    name are guessed from their values: Azimuths lie between 0 and 360 and
+    are followed by a dip between 0 and 90. The first such pair is the
+    plane, the second the linear. A text column that only holds sense-words,
+    or a number column that only holds TectonicsFP codes (0 to 4), is the
+    sense if it has no name. Returns a dictionary of column numbers.
+    """
+    suggestions = {}
+    names = [name.strip().strip("\"'").lower() for name in names]
+
+    for k, name in enumerate(names):
+        linear = NAME_PATTERNS["linear"].search(name) is not None
+        prefix = "line_" if linear else "plane_"
+        if NAME_PATTERNS["dipdir"].search(name):
+            suggestions.setdefault(prefix + "dipdir", k)
+        elif NAME_PATTERNS["dip"].search(name):
+            suggestions.setdefault(prefix + "dip", k)
+        elif NAME_PATTERNS["sense"].search(name):
+            suggestions.setdefault("sense", k)
+        elif NAME_PATTERNS["text"].search(name):
+            suggestions.setdefault("text", k)
+
+    used = set(suggestions.values())
+    ranges = {}
+    for k, col_type in enumerate(types):
+        if col_type != "float" or k in used:
+            continue
+        values = dialect.to_floats([row[k] if len(row) > k else ""
+                                    for row in rows])
+        values = values[~np.isnan(values)]
+        if len(values) > 0:
+            ranges[k] = (values.min(), values.max(),
+                         np.all(values == np.round(values)))
+
+    pairs = []
+    columns = sorted(ranges)
+    for k, l in zip(columns[:-1], columns[1:]):
+        if l != k + 1 or k in used or l in used:
+            continue
+        if ranges[k][0] >= 0 and ranges[k][1] <= 360 and \
+                ranges[l][0] >= 0 and ranges[l][1] <= 90:
+            pairs.append((k, l))
+            used.update((k, l))
+    for prefix, pair in zip(("plane_", "line_"), pairs):
+        if prefix + "dipdir" not in suggestions:
+            suggestions[prefix + "dipdir"] = pair[0]
+            suggestions[prefix + "dip"] = pair[1]
+
+    if "sense" not in suggestions:
+        for k, col_type in enumerate(types):
+            #Named columns that did not match a pattern are something else
+            if k in used or (k < len(names) and names[k] != ""):
+                continue
+            column = [row[k].strip().lower() for row in rows if len(row) > k]
+            if col_type == "text" and set(column) <= SENSE_WORDS:
+                suggestions["sense"] = k
+                break
+            elif k in ranges and ranges[k][2] and ranges[k][0] >= 0 and \
+                    ranges[k][1] <= 4:
+                suggestions["sense"] = k
+                suggestions["sense_codes"] = True
+                break
+
+    if "text" not in suggestions:
+        for k, col_type in enumerate(types):
+            if col_type == "text" and k not in suggestions.values():
+                suggestions["text"] = k
+                break
+    return suggestions
+
+
+def sniff_dialect(lines):
+    """
+    Detects the layout of a text file from its first lines.
+
+    Expects a list of lines without line breaks (e.g. from the read_lines-
+    method of a LineOffsetIndex). Detects the quote character, delimiter,
+    decimal separator, the number of header lines and the type ("float" or
+    "text") of each column. Returns a TextDialect.
+    """
+    sample = [line for line in lines[:SNIFF_LINES] if line.strip() != ""]
+    if len(sample) == 0:
+        return TextDialect()
+
+    quote = '"' if any('"' in line for line in sample) else None
+    dialect = TextDialect(detect_delimiter(sample, quote), quote=quote)
+    rows = [dialect.split_line(line) for line in sample]
+    dialect.decimal = detect_decimal(rows)
+
+    #A column is a float column if most rows in the second half are numbers
+    width = max(len(row) for row in rows)
+    body = rows[len(rows) // 2:]
+    column_types = []
+    for k in range(width):
+        values = dialect.to_floats([row[k] if len(row) > k else ""
+                                    for row in body])
+        share = np.mean(~np.isnan(values))
+        column_types.append("float" if share >= 0.8 else "text")
+    dialect.column_types = column_types
+
+    #Header lines are the first lines where a float column is no number
+    float_columns = [k for k, col_type in enumerate(column_types)
+                     if col_type == "float"]
+    header_lines = 0
+    for row in rows[:MAX_HEADER_LINES]:
+        values = dialect.to_floats([row[k] if len(row) > k else ""
+                                    for k in float_columns])
+        if len(values) > 0 and not np.any(np.isnan(values)):
+            break
+        header_lines += 1
+    if header_lines == len(rows):
+        header_lines = 0
+    dialect.header_lines = header_lines
+
+    if header_lines > 0:
+        dialect.column_names = rows[header_lines - 1]
+    body = rows[header_lines:]
+    dialect.suggestions = guess_columns(dialect.column_names, column_types,
+                                        body, dialect)
+    return dialect
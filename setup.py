@@ -20,12 +20,13 @@ setup(
         "Topic :: Scientific/Engineering",
         ],
     packages = ["innstereo"],
-    scripts = ["bin/innstereo"],
-    install_requires = ["numpy >= 1.6.0",
+    scripts = ["bin/innstereo", "bin/innstereo-render",
+               "bin/innstereo-export"],
+    install_requires = ["numpy >= 1.17",
                         "scipy >= 0.13",
                         "matplotlib >= 1.4.0",
                         "mplstereonet >= 0.4"],
-    setup_requires = ["numpy >= 1.6.0",
+    setup_requires = ["numpy >= 1.17",
                       "scipy >= 0.13",
                       "matplotlib >= 1.4.0",
                       "mplstereonet >= 0.4"],
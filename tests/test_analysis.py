@@ -0,0 +1,200 @@
+#!/usr/bin/python3
+
+"""
+Tests the orientation analysis of innstereo.analysis.
+"""
+
+import queue
+import numpy as np
+import pytest
+import mplstereonet
+from innstereo.analysis import (line_vectors, vector_lines, plane_poles,
+                                normal_planes, orientation_tensor,
+                                eigenvectors, bootstrap_cones,
+                                EigenvectorWorker, best_fit_plane,
+                                plane_intersection, pairwise_intersections,
+                                count_intersections)
+
+
+def line_angles(trend_a, plunge_a, trend_b, plunge_b):
+    """
+    Returns the angles in degrees between two sets of axial linears.
+    """
+    cosines = np.abs(np.sum(line_vectors(trend_a, plunge_a) *
+                            line_vectors(trend_b, plunge_b), axis=1))
+    return np.degrees(np.arccos(np.clip(cosines, 0, 1)))
+
+
+def test_line_vectors_are_north_east_down():
+    """
+    Linears are converted into unit vectors in North-East-Down coordinates.
+    """
+    vectors = line_vectors([0, 90, 45, 123], [0, 0, 90, 30])
+    np.testing.assert_allclose(vectors[:3], [[1, 0, 0], [0, 1, 0],
+                                             [0, 0, 1]], atol=1e-12)
+    np.testing.assert_allclose(np.sum(vectors ** 2, axis=1), 1)
+
+
+def test_vector_lines_round_trip():
+    """
+    Converting linears into vectors and back gives the same linears, also
+    for vectors that point upwards.
+    """
+    rng = np.random.RandomState(1)
+    trend = rng.uniform(0, 360, 100)
+    plunge = rng.uniform(0.5, 89.5, 100)
+    vectors = line_vectors(trend, plunge)
+    for sign in (1, -1):
+        result_trend, result_plunge = vector_lines(sign * vectors * 3)
+        np.testing.assert_allclose(result_trend, trend)
+        np.testing.assert_allclose(result_plunge, plunge)
+
+
+def test_poles_and_normal_planes_are_inverse():
+    """
+    The normal planes of the poles of planes are the planes.
+    """
+    pole_trend, pole_plunge = plane_poles([0, 120, 300], [10, 45, 90])
+    np.testing.assert_allclose(pole_trend, [180, 300, 120])
+    np.testing.assert_allclose(pole_plunge, [80, 45, 0])
+    dipdir, dip = normal_planes(pole_trend, pole_plunge)
+    np.testing.assert_allclose(dipdir, [0, 120, 300])
+    np.testing.assert_allclose(dip, [10, 45, 90])
+
+
+def test_orientation_tensor_needs_measurements():
+    """
+    The tensor of no measurements raises a ValueError.
+    """
+    with pytest.raises(ValueError):
+        orientation_tensor([], [])
+
+
+def test_eigenvectors_of_a_cluster_and_a_girdle():
+    """
+    The eigenvalues are in descending order and sum to one. The first
+    eigenvector is the axis of a cluster, the last the pole of a girdle.
+    """
+    values, trend, plunge = eigenvectors([10, 12, 8, 10, 10],
+                                         [40, 40, 40, 42, 38])
+    assert np.all(np.diff(values) <= 0)
+    np.testing.assert_allclose(np.sum(values), 1)
+    assert line_angles(trend[:1], plunge[:1], [10], [40])[0] < 0.1
+
+    girdle = np.arange(0, 180, 10)
+    values, trend, plunge = eigenvectors(girdle, np.zeros(len(girdle)))
+    np.testing.assert_allclose(values[2], 0, atol=1e-12)
+    np.testing.assert_allclose(plunge[2], 90)
+
+
+def test_fold_axis_of_cylindrical_folds():
+    """
+    The intersection of planes that share an axis is that axis, and the
+    best-fit plane of their poles is normal to it.
+    """
+    rng = np.random.RandomState(2)
+    axis_trend, axis_plunge = 65.0, 25.0
+    axis = line_vectors([axis_trend], [axis_plunge])[0]
+    #Poles of planes that contain the axis are normal to it
+    poles = np.cross(axis, rng.normal(size=(50, 3)))
+    pole_trend, pole_plunge = vector_lines(poles)
+    dipdir, dip = normal_planes(pole_trend, pole_plunge)
+
+    trend, plunge = plane_intersection(dipdir, dip)
+    assert line_angles([trend], [plunge], [axis_trend],
+                       [axis_plunge])[0] < 1e-6
+    fit_dipdir, fit_dip = best_fit_plane(pole_trend, pole_plunge)
+    fit_trend, fit_plunge = plane_poles(fit_dipdir, fit_dip)
+    assert line_angles([fit_trend], [fit_plunge], [axis_trend],
+                       [axis_plunge])[0] < 1e-6
+
+
+def scattered_lines(rng, size, trend, plunge, spread):
+    """
+    Returns linears that are scattered around one direction.
+    """
+    vectors = line_vectors([trend], [plunge]) + \
+                                rng.normal(scale=spread, size=(size, 3))
+    return vector_lines(vectors / np.sqrt(np.sum(vectors ** 2, axis=1,
+                                                 keepdims=True)))
+
+
+def test_eigenvectors_match_mplstereonet_fits():
+    """
+    The first eigenvector is the pole of fit_pole and the last one the pole
+    of fit_girdle.
+    """
+    rng = np.random.RandomState(8)
+    trend, plunge = scattered_lines(rng, 200, 140, 35, 0.3)
+    values, vector_trend, vector_plunge = eigenvectors(trend, plunge)
+    for fit, k in [(mplstereonet.fit_pole, 0), (mplstereonet.fit_girdle, 2)]:
+        strike, dip = fit(plunge, trend, measurement="lines")
+        pole_trend, pole_plunge = plane_poles(strike + 90, dip)
+        assert line_angles([pole_trend], [pole_plunge], vector_trend[k:k + 1],
+                           vector_plunge[k:k + 1])[0] < 1e-4
+
+
+def test_bootstrap_cones_shrink_with_more_measurements():
+    """
+    The cones are reproducible with a seed and get smaller for larger
+    samples of the same distribution.
+    """
+    rng = np.random.RandomState(9)
+    cones = []
+    for size in (30, 300, 3000):
+        trend, plunge = scattered_lines(rng, size, 200, 60, 0.2)
+        cone = bootstrap_cones(trend, plunge, resamples=300, seed=4)
+        np.testing.assert_array_equal(
+            cone, bootstrap_cones(trend, plunge, resamples=300, seed=4))
+        cones.append(cone[0])
+    assert cones[0] > cones[1] > cones[2] > 0
+
+
+def test_eigenvector_worker_posts_results_and_errors():
+    """
+    The worker hands the eigenvectors and cones to the callback in the main
+    thread, and the exception of an empty selection to the error function.
+    """
+    posted = queue.Queue()
+    errors = []
+    worker = EigenvectorWorker(lambda function, *args: posted.put((function,
+                                                                   args)),
+                               error_function=errors.append)
+    trend, plunge = scattered_lines(np.random.RandomState(2), 50, 120, 40,
+                                    0.2)
+    results = []
+    worker.submit(trend, plunge, lambda *args: results.append(args))
+    function, args = posted.get(timeout=60)
+    assert worker.is_pending()
+    assert function(*args) == False
+    assert not worker.is_pending()
+    values, vector_trend, vector_plunge, cones = results[0]
+    np.testing.assert_allclose(values, eigenvectors(trend, plunge)[0])
+    assert len(cones) == 3 and cones[0] > 0
+
+    worker.submit([], [], lambda *args: results.append(args))
+    function, args = posted.get(timeout=60)
+    assert function(*args) == False
+    worker.shutdown()
+    assert len(results) == 1
+    assert len(errors) == 1 and isinstance(errors[0], ValueError)
+
+
+@pytest.mark.parametrize("max_pairs", [None, 500])
+def test_count_intersections_matches_the_intersections(max_pairs):
+    """
+    Counting the pairs gives the number of intersections that are yielded,
+    also if some planes are parallel and if the pairs are subsampled.
+    """
+    rng = np.random.RandomState(6)
+    dipdir = rng.uniform(0, 360, 60)
+    dip = rng.uniform(0, 90, 60)
+    dipdir = np.concatenate((dipdir, dipdir[:10]))
+    dip = np.concatenate((dip, dip[:10]))
+    count = sum(len(vectors) for vectors in
+                pairwise_intersections(dipdir, dip, max_pairs, seed=3,
+                                       chunk_pairs=128))
+    assert count_intersections(dipdir, dip, max_pairs, seed=3,
+                               chunk_pairs=128) == count
+    if max_pairs is None:
+        assert count == 70 * 69 // 2 - 10
@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+
+"""
+Tests the names of the figures and the export of innstereo.batch_export.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import pytest
+from innstereo.batch_export import (output_paths, export_figures,
+                                    MANIFEST_FILE_NAME)
+
+#The directory of the project, which holds the package and the scripts
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_planes(path, dip):
+    """
+    Writes a small text file of planes.
+    """
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, "w") as text_file:
+        text_file.write("dipdir;dip\n")
+        for dipdir in range(0, 360, 30):
+            text_file.write("{0};{1}\n".format(dipdir, dip))
+
+
+def test_output_paths_are_unique():
+    """
+    Inputs of the same name keep their directories or extensions.
+    """
+    out = os.path.join("out")
+    assert output_paths(["data/a.csv", "data/b.csv"], out, "png") == \
+            [os.path.join(out, "a.png"), os.path.join(out, "b.png")]
+    assert output_paths(["data/a/s.csv", "data/b/s.csv"], out, "png") == \
+            [os.path.join(out, "a", "s.png"), os.path.join(out, "b", "s.png")]
+    assert output_paths(["data/x.csv", "data/x.innstereo"], out, "pdf") == \
+            [os.path.join(out, "x.csv.pdf"),
+             os.path.join(out, "x.innstereo.pdf")]
+    with pytest.raises(ValueError):
+        output_paths(["data/x.csv", "data/x.csv"], out, "png")
+
+
+def test_export_keeps_figures_of_the_same_name(tmp_path):
+    """
+    Two files called s.csv in different directories give two figures.
+    """
+    inputs = [str(tmp_path / "a" / "s.csv"), str(tmp_path / "b" / "s.csv")]
+    write_planes(inputs[0], 10)
+    write_planes(inputs[1], 80)
+    output_dir = str(tmp_path / "figures")
+    manifest = export_figures(inputs, output_dir, max_workers=1)
+
+    assert manifest["failed_count"] == 0
+    outputs = [figure["output"] for figure in manifest["figures"]]
+    assert outputs == [os.path.join(output_dir, "a", "s.png"),
+                       os.path.join(output_dir, "b", "s.png")]
+    for path in outputs:
+        assert os.path.getsize(path) > 0
+    with open(os.path.join(output_dir, MANIFEST_FILE_NAME)) as manifest_file:
+        assert json.load(manifest_file)["figure_count"] == 2
+
+
+@pytest.mark.parametrize("command", [["-m", "innstereo.batch_export"],
+                                     [os.path.join(PROJECT_DIR, "bin",
+                                                   "innstereo-export")]])
+def test_command_exports_a_directory(tmp_path, command):
+    """
+    The module and the script render all files of a directory.
+    """
+    write_planes(str(tmp_path / "outcrops" / "north.csv"), 30)
+    write_planes(str(tmp_path / "outcrops" / "south.txt"), 60)
+    environment = dict(os.environ, PYTHONPATH=PROJECT_DIR, MPLBACKEND="Agg")
+    result = subprocess.run([sys.executable] + command +
+                            ["outcrops", "-o", "figures", "--workers", "1"],
+                            cwd=str(tmp_path), env=environment,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            timeout=300)
+    assert result.returncode == 0, result.stderr.decode()
+    assert b"Rendered 2 of 2" in result.stdout
+    assert sorted(os.listdir(str(tmp_path / "figures"))) == \
+                        [MANIFEST_FILE_NAME, "north.png", "south.png"]
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+
+"""
+Tests the axial k-means of innstereo.clustering.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+from innstereo.analysis import line_vectors
+from innstereo.clustering import cluster_orientations
+
+
+def axial_clusters(rng, axes, sizes, spread):
+    """
+    Returns vectors scattered around axes, half of them flipped to the
+    opposite side, and the number of the axis of each vector.
+    """
+    vectors = []
+    truth = []
+    for k, (axis, size) in enumerate(zip(axes, sizes)):
+        cluster = axis + rng.normal(scale=spread, size=(size, 3))
+        cluster[::2] *= -1
+        vectors.append(cluster / np.sqrt(np.sum(cluster ** 2, axis=1,
+                                                keepdims=True)))
+        truth.append(np.full(size, k))
+    return np.vstack(vectors), np.concatenate(truth)
+
+
+def test_antipodal_clusters_are_separated():
+    """
+    Vectors and their opposites belong to the same set, and the sets are
+    numbered by their size.
+    """
+    rng = np.random.RandomState(12)
+    axes = line_vectors([30, 120], [10, 50])
+    vectors, truth = axial_clusters(rng, axes, [300, 200], 0.1)
+    labels, centers = cluster_orientations(vectors, 2, seed=3)
+    np.testing.assert_array_equal(labels, truth)
+    np.testing.assert_allclose(np.abs(np.sum(centers * axes, axis=1)), 1,
+                               atol=0.01)
+
+
+def test_executor_gives_the_same_sets():
+    """
+    Running the restarts in an executor does not change the result.
+    """
+    rng = np.random.RandomState(13)
+    axes = line_vectors([0, 90, 200], [80, 5, 30])
+    vectors = axial_clusters(rng, axes, [100, 150, 50], 0.3)[0]
+    labels, centers = cluster_orientations(vectors, 3, seed=5)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        other_labels, other_centers = cluster_orientations(
+                                    vectors, 3, seed=5, executor=executor)
+    np.testing.assert_array_equal(labels, other_labels)
+    np.testing.assert_array_equal(centers, other_centers)
+
+
+def test_fewer_measurements_than_sets():
+    """
+    Asking for more sets than there are measurements raises a ValueError.
+    """
+    with pytest.raises(ValueError):
+        cluster_orientations(np.eye(3)[:2], 3)
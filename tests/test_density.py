@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+
+"""
+Compares the density grids of innstereo.density with mplstereonet.
+"""
+
+import queue
+import numpy as np
+import mplstereonet
+import pytest
+from innstereo.density import (density_grid, count_beta, METHODS,
+                               DensityGridCache, DensityWorker)
+
+
+@pytest.mark.parametrize("method", METHODS)
+@pytest.mark.parametrize("use_index", [False, True])
+@pytest.mark.parametrize("size", [40, 2500])
+def test_density_grid_matches_mplstereonet(method, use_index, size):
+    """
+    Both ways of counting return the grid of mplstereonet.
+    """
+    rng = np.random.RandomState(size)
+    strikes = rng.uniform(0, 360, size)
+    dips = rng.uniform(0, 90, size)
+    for measurement in ["poles", "lines"]:
+        expected = mplstereonet.density_grid(strikes, dips,
+                                             measurement=measurement,
+                                             method=method, sigma=3,
+                                             gridsize=(30, 40))
+        result = density_grid(strikes, dips, measurement=measurement,
+                              method=method, sigma=3, gridsize=(30, 40),
+                              use_index=use_index)
+        for expected_values, values in zip(expected, result):
+            assert values.shape == expected_values.shape
+            np.testing.assert_allclose(values, expected_values,
+                                       rtol=1e-9, atol=1e-9)
+
+
+def brute_force_intersections(dipdirs, dips):
+    """
+    Returns the plunges and bearings of the intersections of all pairs of
+    planes, leaving out parallel pairs.
+    """
+    first, second = np.triu_indices(len(dipdirs), 1)
+    parallel = (dipdirs[first] == dipdirs[second]) & \
+               (dips[first] == dips[second])
+    first = first[~parallel]
+    second = second[~parallel]
+    return mplstereonet.plane_intersection(dipdirs[first] - 90, dips[first],
+                                           dipdirs[second] - 90,
+                                           dips[second])
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_beta_density_matches_brute_force_intersections(method):
+    """
+    The beta density is the density of all pairwise intersections, with
+    the kernel and normalization set for the intersections that remain
+    after parallel pairs are left out.
+    """
+    rng = np.random.RandomState(14)
+    dipdirs = rng.uniform(0, 360, 50)
+    dips = rng.uniform(5, 85, 50)
+    #Repeated planes give parallel pairs without an intersection
+    dipdirs = np.concatenate((dipdirs, dipdirs[:10]))
+    dips = np.concatenate((dips, dips[:10]))
+    plunges, bearings = brute_force_intersections(dipdirs, dips)
+    assert len(plunges) == 60 * 59 // 2 - 10
+    expected = mplstereonet.density_grid(plunges, bearings,
+                                         measurement="lines", method=method,
+                                         sigma=3, gridsize=(30, 40))
+    result = count_beta(dipdirs, dips, method, 3, (30, 40))
+    for expected_values, values in zip(expected, result):
+        np.testing.assert_allclose(values, expected_values, rtol=1e-7,
+                                   atol=1e-7)
+
+
+class FailingGridCache(DensityGridCache):
+
+    """
+    A DensityGridCache whose grids can not be estimated.
+    """
+
+    def calculate_grid(self, *args):
+        """
+        Raises a ValueError instead of estimating a grid.
+        """
+        raise ValueError("no grid")
+
+
+def test_worker_hands_errors_to_the_error_function():
+    """
+    A failed job calls the error function with the owner and the
+    exception in the main thread, and not the callback.
+    """
+    posted = queue.Queue()
+    errors = []
+    worker = DensityWorker(FailingGridCache(),
+                           lambda function, *args: posted.put((function,
+                                                               args)),
+                           error_function=lambda owner, error:
+                                          errors.append((owner, error)))
+    results = []
+    worker.submit("layer", 1, ([10.0], [20.0], "poles", "kamb", 3,
+                               (10, 10)),
+                  lambda *args: results.append(args))
+    function, args = posted.get(timeout=30)
+    assert function(*args) == False
+    worker.shutdown()
+    assert results == []
+    assert len(errors) == 1 and errors[0][0] == "layer"
+    assert str(errors[0][1]) == "no grid"
+    assert not worker.is_pending("layer")
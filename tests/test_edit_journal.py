@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+
+"""
+Tests recording, compacting and replaying the journal of
+innstereo.edit_journal.
+"""
+
+import os
+import numpy as np
+from innstereo.edit_journal import (EditJournal, read_journal, journal_path,
+                                    replay_entries, find_recovery_projects,
+                                    new_recovery_path, claim_recovery_project)
+from innstereo.headless import load_project_layers, new_layer
+from innstereo.project_file import save_project, ProjectArchive
+
+
+def layer_node(layer_obj):
+    """
+    Returns the node of a layer for save_project.
+    """
+    columns = layer_obj.get_data_columns()
+    return {"kind": "layer", "label": layer_obj.get_label(), "visible": True,
+            "layer_type": layer_obj.get_layer_type(),
+            "id": layer_obj.layer_id, "style": layer_obj.get_style_dict(),
+            "columns": columns.snapshot()}
+
+
+def reopen(path):
+    """
+    Opens a project and replays its journal. Returns the layers by their id.
+    """
+    archive = ProjectArchive(path)
+    layers = {layer_obj.layer_id: layer_obj for layer_obj in
+              load_project_layers(archive, archive.get_layer_tree())}
+    replay_entries(read_journal(journal_path(path)), layers, new_layer)
+    return layers
+
+
+def record_edits(path):
+    """
+    Saves a project, records edits in its journal and returns the edited
+    layers as they are expected after replaying the journal.
+    """
+    layer_obj = new_layer("plane", "Bedding")
+    layer_obj.attach_data_arrays([np.array([10.0, 20.0, 30.0]),
+                                  np.array([40.0, 50.0, 60.0]),
+                                  np.array(["a", "b", "c"], dtype=object)])
+    save_project(path, [layer_node(layer_obj)], {})
+
+    journal = EditJournal(journal_path(path))
+    layer_obj.set_journal(journal)
+    layer_obj.append_data_arrays([[70.0, 80.0], [5.0, 6.0], ["d", "e"]])
+    layer_obj.set_line_color("#abcdef")
+    #Row edits come from the data TreeStore in the GUI
+    for entry in [{"op": "set", "row": 0, "values": [11.0, 41.0, "A"]},
+                  {"op": "delete", "row": 1},
+                  {"op": "insert", "row": 2, "values": [90.0, 9.0, "x"]},
+                  {"op": "reorder", "order": [4, 3, 2, 1, 0]}]:
+        layer_obj.record_edit(entry.pop("op"), **entry)
+    layer_obj.set_journal(None)
+    expected = [[80.0, 70.0, 90.0, 30.0, 11.0],
+                [6.0, 5.0, 9.0, 60.0, 41.0],
+                ["e", "d", "x", "c", "A"]]
+
+    other = new_layer("line")
+    other.set_journal(journal)
+    other.record_edit("create", layer_type="line")
+    other.append_data_arrays([[1.0], [2.0], ["l"]])
+    journal.record({"op": "tree", "layers": []})
+    journal.close()
+    return layer_obj, expected, other
+
+
+def test_replay_gives_the_edited_columns(tmp_path):
+    """
+    Replaying the journal on the saved project repeats all edits.
+    """
+    path = str(tmp_path / "test.innstereo")
+    layer_obj, expected, other = record_edits(path)
+    assert len(read_journal(journal_path(path))) == 9
+
+    layers = reopen(path)
+    replayed = layers[layer_obj.layer_id]
+    columns = replayed.get_data_columns()
+    for k in range(3):
+        assert columns.get_column(k).tolist() == expected[k]
+    assert replayed.get_line_color() == "#abcdef"
+    assert layers[other.layer_id].get_layer_type() == "line"
+    assert layers[other.layer_id].get_data_columns().get_column(2).tolist() \
+                                                                    == ["l"]
+
+
+def test_incomplete_last_line_is_ignored(tmp_path):
+    """
+    A line that was cut off by a crash ends the journal.
+    """
+    path = str(tmp_path / "test.journal")
+    journal = EditJournal(path)
+    journal.record({"op": "style", "layer": "x", "name": "label",
+                    "value": np.float64(1)})
+    journal.close()
+    with open(path, "a") as journal_file:
+        journal_file.write('{"op": "sty')
+    assert read_journal(path) == [{"op": "style", "layer": "x",
+                                   "name": "label", "value": 1.0}]
+
+
+def test_compact_saves_a_snapshot_in_the_writer_thread(tmp_path):
+    """
+    Compacting writes the snapshot taken at the call and empties the
+    journal. Edits after the snapshot do not change it and stay in the
+    journal.
+    """
+    path = str(tmp_path / "test.innstereo")
+    layer_obj = new_layer("plane", "Bedding")
+    layer_obj.attach_data_arrays([np.arange(4.0), np.arange(4.0), None])
+    save_project(path, [layer_node(layer_obj)], {})
+    journal = EditJournal(journal_path(path))
+    layer_obj.set_journal(journal)
+    layer_obj.append_data_arrays([[4.0], [4.0], [""]])
+
+    tree = [layer_node(layer_obj)]
+    journal.compact(lambda: save_project(path, tree, {}))
+    #Edited in place after the snapshot
+    layer_obj.get_data_columns().set_row(0, (99.0, 99.0, "late"))
+    layer_obj.record_edit("set", row=0, values=[99.0, 99.0, "late"])
+    journal.close()
+
+    assert journal.get_compact_error() is None
+    entries = read_journal(journal_path(path))
+    assert [entry["op"] for entry in entries] == ["set"]
+    archive = ProjectArchive(path)
+    node = archive.get_layer_tree()[0]
+    assert archive.read_columns(node["columns"])[0].tolist() == \
+                                                    [0.0, 1, 2, 3, 4]
+    columns = reopen(path)[layer_obj.layer_id].get_data_columns()
+    assert columns.get_column(0).tolist() == [99.0, 1, 2, 3, 4]
+    assert columns.get_column(2).tolist() == ["late", "", "", "", ""]
+
+
+def test_recovery_projects_of_crashed_processes_are_found(tmp_path):
+    """
+    Only recovery projects of processes that are not running are found,
+    and a claimed project is not found again.
+    """
+    directory = str(tmp_path)
+    own = new_recovery_path(directory)
+    open(journal_path(own), "w").close()
+    crashed = os.path.join(directory, "untitled-999999999-abc.innstereo")
+    open(crashed, "w").close()
+    open(journal_path(crashed), "w").close()
+    assert find_recovery_projects(directory) == [crashed]
+
+    claimed = claim_recovery_project(crashed, directory)
+    assert os.path.exists(claimed)
+    assert os.path.exists(journal_path(claimed))
+    assert find_recovery_projects(directory) == []
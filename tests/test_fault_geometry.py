@@ -0,0 +1,116 @@
+#!/usr/bin/python3
+
+"""
+Compares the faultplane functions of innstereo.fault_geometry with the
+per-fault calculations of mplstereonet.
+"""
+
+import numpy as np
+import mplstereonet
+from mplstereonet import stereonet_math
+from innstereo.fault_geometry import (lineation_pole_planes, hoeppener_arrows,
+                                      plunge_bearing_to_vectors)
+
+
+def plane_angles(strike_a, dip_a, strike_b, dip_b):
+    """
+    Returns the angles in degrees between the poles of two sets of planes.
+
+    Poles have no sign, so the angles are at most 90 degrees.
+    """
+    poles_a = np.column_stack(stereonet_math.sph2cart(
+                                    *mplstereonet.pole(strike_a, dip_a)))
+    poles_b = np.column_stack(stereonet_math.sph2cart(
+                                    *mplstereonet.pole(strike_b, dip_b)))
+    cosines = np.abs(np.sum(poles_a * poles_b, axis=1))
+    return np.degrees(np.arccos(np.clip(cosines, 0, 1)))
+
+
+def test_lineation_pole_planes_match_fit_girdle():
+    """
+    The planes are the girdles through the lineation and the pole of each
+    fault.
+    """
+    rng = np.random.RandomState(5)
+    size = 300
+    plane_dir = rng.uniform(0, 360, size)
+    plane_dip = rng.uniform(1, 89, size)
+    line_dir = rng.uniform(0, 360, size)
+    line_dip = rng.uniform(1, 89, size)
+    strikes, dips = lineation_pole_planes(plane_dir, plane_dip, line_dir,
+                                          line_dip)
+    expected = [mplstereonet.fit_girdle([line_dip[k], 90 - plane_dip[k]],
+                                        [line_dir[k], plane_dir[k] + 180],
+                                        measurement="lines")
+                for k in range(size)]
+    expected_strikes, expected_dips = np.array(expected).T
+    angles = plane_angles(strikes, dips, expected_strikes, expected_dips)
+    np.testing.assert_allclose(angles, 0, atol=1e-4)
+
+
+def arrow_vectors(plane_dir, plane_dip, line_dir, line_dip, sense):
+    """
+    Returns the start and end points of the Hoeppener-arrows as vectors.
+    """
+    lon_start, lat_start, lon_end, lat_end, heads = hoeppener_arrows(
+                            plane_dir, plane_dip, line_dir, line_dip, sense)
+    start = np.column_stack(stereonet_math.sph2cart(lon_start, lat_start))
+    end = np.column_stack(stereonet_math.sph2cart(lon_end, lat_end))
+    return start, end, heads
+
+
+def test_hoeppener_arrows_stay_inside_the_stereonet():
+    """
+    Arrows of steep faults are moved along their plane until they end on
+    the edge, without getting shorter.
+    """
+    rng = np.random.RandomState(6)
+    size = 200
+    plane_dir = rng.uniform(0, 360, size)
+    plane_dip = rng.uniform(80, 90, size)
+    line_dir = plane_dir + rng.choice([-90, 90], size)
+    line_dip = rng.uniform(0, 10, size)
+    start, end, heads = arrow_vectors(plane_dir, plane_dip, line_dir,
+                                      line_dip, ["dn"] * size)
+    assert len(start) == size
+    #The lower hemisphere has x >= 0 in the coordinates of mplstereonet
+    assert np.all(start[:, 0] >= -1e-12)
+    assert np.all(end[:, 0] >= -1e-12)
+    lengths = np.degrees(np.arccos(np.clip(np.sum(start * end, axis=1),
+                                           -1, 1)))
+    np.testing.assert_allclose(lengths, 7.2, atol=1e-6)
+    assert np.any(np.minimum(start[:, 0], end[:, 0]) < 1e-9)
+
+
+def test_hoeppener_arrows_point_in_the_direction_of_movement():
+    """
+    Each sense gives the direction of the arrow, unknown senses get no
+    arrowhead and faults without a sense are left out.
+    """
+    rng = np.random.RandomState(7)
+    size = 100
+    plane_dir = rng.uniform(0, 360, size)
+    plane_dip = rng.uniform(20, 70, size)
+    #Oblique lineations, so the arrows are not parallel to the strike
+    line_dir, line_dip = stereonet_math.geographic2plunge_bearing(
+        *stereonet_math.rake(plane_dir - 90, plane_dip,
+                             rng.uniform(20, 70, size)))[::-1]
+    lineations = plunge_bearing_to_vectors(line_dip, line_dir)
+    strikes = plunge_bearing_to_vectors(np.zeros(size), plane_dir - 90)
+    for sense, sign in [("dn", 1), ("up", -1)]:
+        start, end, heads = arrow_vectors(plane_dir, plane_dip, line_dir,
+                                          line_dip, [sense] * size)
+        assert np.all(heads)
+        towards = np.sum((end - start) * lineations, axis=1)
+        assert np.all(np.sign(towards) == sign)
+    for sense, sign in [("sin", 1), ("dex", -1)]:
+        start, end, heads = arrow_vectors(plane_dir, plane_dip, line_dir,
+                                          line_dip, [sense] * size)
+        along_strike = np.sum((end - start) * strikes, axis=1)
+        assert np.all(np.sign(along_strike) == sign)
+
+    senses = np.array(["uk", ""] * (size // 2), dtype=object)
+    start, end, heads = arrow_vectors(plane_dir, plane_dip, line_dir,
+                                      line_dip, senses)
+    assert len(heads) == size // 2
+    assert not np.any(heads)
@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+"""
+Tests the Fisher statistics and the cache of innstereo.fisher_statistics.
+"""
+
+import numpy as np
+from innstereo.analysis import line_vectors
+from innstereo.layer_types import LineLayer, PlaneLayer
+from innstereo.fisher_statistics import (FisherStatistics,
+                                         FisherStatisticsCache)
+
+
+def test_statistics_of_a_hand_computed_cone():
+    """
+    Four linears plunging 60 degrees towards north, east, south and west
+    have a vertical mean with R = 4 sin(60).
+    """
+    statistics = FisherStatistics.from_vectors(
+                            line_vectors([0, 90, 180, 270], [60] * 4))
+    length = 4 * np.sin(np.radians(60))
+    assert statistics.get_count() == 4
+    np.testing.assert_allclose(statistics.get_resultant_length(), length)
+    np.testing.assert_allclose(statistics.get_mean_resultant_length(),
+                               np.sqrt(3) / 2)
+    np.testing.assert_allclose(statistics.get_mean()[1], 90)
+    np.testing.assert_allclose(statistics.get_kappa(), 3 / (4 - length))
+    cosine = 1 - (4 - length) / length * (20 ** (1 / 3) - 1)
+    np.testing.assert_allclose(statistics.get_alpha95(),
+                               np.degrees(np.arccos(cosine)))
+    np.testing.assert_allclose(statistics.get_alpha95(), 42.71, atol=0.01)
+
+
+def test_statistics_of_few_or_equal_measurements():
+    """
+    Empty sets and single measurements have no spread, equal measurements
+    an infinite kappa and opposite ones no mean.
+    """
+    empty = FisherStatistics.from_vectors([])
+    assert np.isnan(empty.get_mean()[0])
+    assert np.isnan(empty.get_kappa())
+    assert empty.get_summary() == "No measurements"
+    assert np.isnan(FisherStatistics.from_vectors([[0, 0, 1]]).get_alpha95())
+    same = FisherStatistics.from_vectors([[0, 0.6, 0.8], [0, 0.6, 0.8]])
+    assert same.get_kappa() == np.inf
+    opposite = FisherStatistics.from_vectors([[1, 0, 0], [-1, 0, 0]])
+    assert opposite.get_alpha95() == 180
+
+
+def test_combined_statistics_equal_the_statistics_of_all_vectors():
+    """
+    Adding the statistics of two sets gives the statistics of their union.
+    """
+    rng = np.random.RandomState(11)
+    first = line_vectors(rng.uniform(0, 40, 30), rng.uniform(20, 50, 30))
+    second = line_vectors(rng.uniform(0, 40, 20), rng.uniform(20, 50, 20))
+    combined = FisherStatistics.combine(
+        [FisherStatistics.from_vectors(first),
+         FisherStatistics.from_vectors(second)])
+    union = FisherStatistics.from_vectors(np.vstack((first, second)))
+    assert combined.get_count() == 50
+    np.testing.assert_allclose(combined.get_kappa(), union.get_kappa())
+    np.testing.assert_allclose(combined.get_alpha95(), union.get_alpha95())
+
+
+def test_cache_keeps_statistics_until_the_data_changes():
+    """
+    The statistics of a layer are cached per data version, and planes are
+    counted by their poles.
+    """
+    layer_obj = LineLayer(None, None)
+    layer_obj.attach_data_arrays([np.array([10.0, 20]),
+                                  np.array([30.0, 40]), None])
+    cache = FisherStatisticsCache()
+    first = cache.get_statistics(layer_obj)
+    layer_obj.set_line_color("#123456")
+    assert cache.get_statistics(layer_obj) is first
+    layer_obj.append_data_arrays([[15.0], [35.0], [""]])
+    assert cache.get_statistics(layer_obj).get_count() == 3
+
+    plane_obj = PlaneLayer(None, None)
+    plane_obj.attach_data_arrays([np.array([180.0]), np.array([30.0]), None])
+    trend, plunge = cache.get_statistics(plane_obj).get_mean()
+    np.testing.assert_allclose((trend, plunge), (0, 60))
+    combined = cache.get_combined_statistics([layer_obj, plane_obj])
+    assert combined.get_count() == 4
@@ -0,0 +1,76 @@
+#!/usr/bin/python3
+
+"""
+Tests the innstereo-render command of innstereo.headless.
+"""
+
+import os
+import subprocess
+import sys
+import numpy as np
+
+#The directory of the project, which holds the package and the scripts
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#The first bytes of every PNG-file
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def write_csv(path):
+    """
+    Writes a small comma-separated file of planes with a header.
+    """
+    rng = np.random.RandomState(2)
+    with open(path, "w") as text_file:
+        text_file.write("dipdir,dip\n")
+        for dipdir, dip in zip(rng.uniform(0, 360, 20),
+                               rng.uniform(0, 90, 20)):
+            text_file.write("{0:.1f},{1:.1f}\n".format(dipdir, dip))
+
+
+def run_command(arguments, cwd):
+    """
+    Runs a command with the package directory on the path of Python.
+    """
+    environment = dict(os.environ, PYTHONPATH=PROJECT_DIR,
+                       MPLBACKEND="Agg")
+    return subprocess.run([sys.executable] + arguments, cwd=cwd,
+                          env=environment, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, timeout=300)
+
+
+def test_module_renders_a_text_file(tmp_path):
+    """
+    "python3 -m innstereo.headless" writes an image of a text file.
+    """
+    write_csv(str(tmp_path / "planes.csv"))
+    result = run_command(["-m", "innstereo.headless", "planes.csv",
+                          "planes.png"], str(tmp_path))
+    assert result.returncode == 0, result.stderr.decode()
+    with open(str(tmp_path / "planes.png"), "rb") as image:
+        assert image.read(8) == PNG_SIGNATURE
+
+
+def test_script_renders_a_text_file(tmp_path):
+    """
+    The script in bin/ is not shadowed by the other scripts next to it.
+    """
+    write_csv(str(tmp_path / "planes.csv"))
+    script = os.path.join(PROJECT_DIR, "bin", "innstereo-render")
+    result = run_command([script, "planes.csv", "planes.svg", "--view",
+                          "stereo_rose"], str(tmp_path))
+    assert result.returncode == 0, result.stderr.decode()
+    assert os.path.getsize(str(tmp_path / "planes.svg")) > 0
+
+
+def test_missing_columns_are_an_error(tmp_path):
+    """
+    A file without dip directions and dips gives an error, not a figure.
+    """
+    with open(str(tmp_path / "notes.txt"), "w") as text_file:
+        text_file.write("only\nwords\nhere\n")
+    result = run_command(["-m", "innstereo.headless", "notes.txt",
+                          "notes.png"], str(tmp_path))
+    assert result.returncode == 1
+    assert b"innstereo-render:" in result.stderr
+    assert not os.path.exists(str(tmp_path / "notes.png"))
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+
+"""
+Tests the DataColumns of innstereo.layer_data against a list of rows.
+"""
+
+import numpy as np
+from innstereo.layer_data import DataColumns
+
+
+def assert_rows_equal(columns, rows):
+    """
+    The columns hold the same values as the list of rows.
+    """
+    assert len(columns) == len(rows)
+    for k in range(len(columns.column_types)):
+        assert list(columns.get_column(k)) == [row[k] for row in rows]
+
+
+def test_edits_keep_columns_in_sync():
+    """
+    Random inserts, changes and deletions give the same rows as a list.
+    """
+    rng = np.random.RandomState(3)
+    columns = DataColumns([float, float, str])
+    rows = []
+    for step in range(500):
+        action = rng.randint(3) if len(rows) > 0 else 0
+        values = (float(rng.randint(360)), float(rng.randint(90)),
+                  "s{0}".format(step))
+        if action == 0:
+            index = rng.randint(len(rows) + 1)
+            columns.insert_row(index, values)
+            rows.insert(index, values)
+        elif action == 1:
+            index = rng.randint(len(rows))
+            columns.set_row(index, values)
+            rows[index] = values
+        else:
+            index = rng.randint(len(rows))
+            columns.delete_row(index)
+            del rows[index]
+        assert_rows_equal(columns, rows)
+
+
+def test_every_change_increases_the_version():
+    """
+    Each kind of change gives a new version, reading the columns does not.
+    """
+    columns = DataColumns([float, float, str])
+    versions = [columns.version]
+    columns.append_row((10, 20, None))
+    versions.append(columns.version)
+    columns.set_row(0, (30, 40, "a"))
+    versions.append(columns.version)
+    columns.extend([[1, 2], [3, 4], ["b", "c"]])
+    versions.append(columns.version)
+    columns.delete_row(1)
+    versions.append(columns.version)
+    columns.get_column(0)
+    assert columns.version == versions[-1]
+    columns.clear()
+    versions.append(columns.version)
+    columns.attach([np.arange(3.0), np.arange(3.0), None])
+    versions.append(columns.version)
+    assert len(set(versions)) == len(versions)
+    assert_rows_equal(columns, [(0, 0, ""), (1, 1, ""), (2, 2, "")])
+
+
+def test_text_cells_of_none_are_empty_strings():
+    """
+    Empty text cells of the ListStore are stored as empty strings.
+    """
+    columns = DataColumns([float, float, str])
+    columns.append_row((10, 20, None))
+    columns.append_row((30, 40, "x"))
+    columns.delete_row(0)
+    assert list(columns.get_column(2)) == ["x"]
+    assert columns.columns[2][1] == ""
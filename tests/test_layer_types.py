@@ -0,0 +1,58 @@
+#!/usr/bin/python3
+
+"""
+Tests the style and data versions of the layers of innstereo.layer_types.
+"""
+
+import numpy as np
+import pytest
+from innstereo.layer_types import (PlaneLayer, FaultPlaneLayer, LineLayer,
+                                   SmallCircleLayer)
+
+
+@pytest.mark.parametrize("layer_class", [PlaneLayer, FaultPlaneLayer,
+                                         LineLayer, SmallCircleLayer])
+def test_every_set_method_increases_the_style_version(layer_class):
+    """
+    Each set-method gives a new style version and keeps the data version.
+    """
+    layer_obj = layer_class(None, None)
+    for name in dir(layer_obj):
+        getter = getattr(layer_obj, "get_" + name[4:], None)
+        if not name.startswith("set_") or getter is None or \
+                name in ("set_journal", "set_data_loader",
+                         "set_style_dict"):
+            continue
+        version = layer_obj.get_version()
+        getattr(layer_obj, name)(getter())
+        assert layer_obj.get_style_version() == version[1] + 1, name
+        assert layer_obj.get_data_version() == version[0], name
+
+
+def test_data_changes_increase_the_data_version():
+    """
+    Attaching and appending rows gives a new data version.
+    """
+    layer_obj = PlaneLayer(None, None)
+    versions = [layer_obj.get_version()]
+    layer_obj.attach_data_arrays([np.arange(5.0), np.arange(5.0), None])
+    versions.append(layer_obj.get_version())
+    layer_obj.append_data_arrays([[1.0], [2.0], ["a"]])
+    versions.append(layer_obj.get_version())
+    assert len(set(data for data, style in versions)) == 3
+    assert len(set(style for data, style in versions)) == 1
+    assert len(layer_obj.get_data_columns()) == 6
+
+
+def test_style_dict_round_trip():
+    """
+    A style dictionary gives the same style and a new style version.
+    """
+    layer_obj = LineLayer(None, None)
+    layer_obj.set_marker_size(3)
+    layer_obj.set_line_color("#123456")
+    other = LineLayer(None, None)
+    version = other.get_style_version()
+    other.set_style_dict(layer_obj.get_style_dict())
+    assert other.get_style_dict() == layer_obj.get_style_dict()
+    assert other.get_style_version() > version
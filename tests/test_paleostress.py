@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+
+"""
+Tests the fault vectors and the stress inversion of innstereo.paleostress.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import numpy as np
+from innstereo.analysis import line_vectors, vector_lines
+from innstereo.layer_types import FaultPlaneLayer
+from innstereo.paleostress import (fault_vectors, paleostress, slip_misfits,
+                                   StressInversionCache, StressWorker)
+
+
+def synthetic_faults(rng, frame, ratio, size):
+    """
+    Returns the columns of faults that slipped in the direction of the
+    shear traction of a reduced stress tensor.
+
+    Faults whose slip is nearly horizontal are left out, so their sense
+    can be given as "up" or "dn".
+    """
+    tensor = np.dot(frame * np.array([1.0, ratio, 0.0]), frame.T)
+    plane_dir = rng.uniform(0, 360, size)
+    plane_dip = rng.uniform(20, 80, size)
+    #Upward normals, pointing into the hanging wall
+    normals = -line_vectors(plane_dir + 180, 90 - plane_dip)
+    traction = np.dot(normals, tensor)
+    shear = traction - np.sum(traction * normals, axis=1)[:, np.newaxis] * \
+                       normals
+    slips = -shear / np.sqrt(np.sum(shear ** 2, axis=1))[:, np.newaxis]
+    keep = np.abs(slips[:, 2]) > 0.2
+    line_dir, line_dip = vector_lines(slips[keep])
+    sense = np.where(slips[keep, 2] > 0, "dn", "up").astype(object)
+    return plane_dir[keep], plane_dip[keep], line_dir, line_dip, sense
+
+
+def axis_angles(first, second):
+    """
+    Returns the angles in degrees between the columns of two frames.
+    """
+    cosines = np.abs(np.sum(first * second, axis=0))
+    return np.degrees(np.arccos(np.clip(cosines, 0, 1)))
+
+
+def test_inversion_recovers_a_synthetic_tensor():
+    """
+    The principal axes and the stress ratio of the tensor that moved the
+    faults are found within the spacing of the grid.
+    """
+    rng = np.random.RandomState(15)
+    sigma1 = line_vectors([40], [65])[0]
+    sigma3 = np.cross(sigma1, [0, 0, 1.0])
+    sigma3 /= np.sqrt(np.sum(sigma3 ** 2))
+    frame = np.column_stack((sigma1, np.cross(sigma3, sigma1), sigma3))
+    columns = synthetic_faults(rng, frame, 0.4, 300)
+
+    result = paleostress(*columns)
+    assert result.has_tensor()
+    assert np.all(axis_angles(result.frame, frame) < 10)
+    assert abs(result.get_ratio() - 0.4) <= 0.1
+    assert np.mean(result.get_misfits()) < 10
+    exact = slip_misfits(frame[np.newaxis], [0.4], result.normals,
+                         result.slips)[0, 0]
+    np.testing.assert_allclose(exact, 0, atol=1e-4)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        other = paleostress(*columns, executor=executor)
+    np.testing.assert_array_equal(other.frame, result.frame)
+    assert other.get_ratio() == result.get_ratio()
+
+
+def test_fault_vectors_follow_the_sense():
+    """
+    The normals point upwards and the slips in the direction of movement
+    of the hanging wall. Faults without a known sense or with a lineation
+    normal to the plane are left out.
+    """
+    #A plane dipping 45 degrees to the east, which strikes north
+    plane_dir = [90] * 8
+    plane_dip = [45] * 8
+    line_dir = [90, 90, 0, 180, 0, 180, 90, 270]
+    line_dip = [45, 45, 0, 0, 0, 0, 45, 45]
+    sense = ["dn", "up", "sin", "sin", "dex", "uk", "", "dn"]
+    normals, slips, used = fault_vectors(plane_dir, plane_dip, line_dir,
+                                         line_dip, sense)
+    np.testing.assert_array_equal(used, [True, True, True, True, True,
+                                         False, False, False])
+    root = np.sqrt(0.5)
+    np.testing.assert_allclose(normals, [[0, root, -root]] * 5, atol=1e-12)
+    np.testing.assert_allclose(slips, [[0, root, root], [0, -root, -root],
+                                       [1, 0, 0], [1, 0, 0], [-1, 0, 0]],
+                               atol=1e-12)
+
+    #Lineations slightly off the plane are projected onto it
+    normals, slips, used = fault_vectors([90], [45], [100], [40], ["dn"])
+    np.testing.assert_allclose(np.sum(normals * slips, axis=1), 0,
+                               atol=1e-12)
+    np.testing.assert_allclose(np.sum(slips ** 2, axis=1), 1)
+    assert slips[0, 2] > 0
+
+
+def test_worker_stores_and_hands_back_the_result():
+    """
+    The StressWorker hands the result to the callback through the post
+    function and stores it in the cache. Submitting the same data again
+    before the result is handed back does not start a new inversion.
+    """
+    rng = np.random.RandomState(16)
+    frame = np.eye(3)[:, [2, 0, 1]]
+    layer_obj = FaultPlaneLayer(None, None)
+    layer_obj.attach_data_arrays(list(synthetic_faults(rng, frame, 0.5, 60)))
+    cache = StressInversionCache()
+    posted = queue.Queue()
+    results = []
+
+    def post_function(function, *args):
+        posted.put((function, args))
+
+    def callback(owner, version, result):
+        results.append((owner, version, result))
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        worker = StressWorker(cache, post_function, executor)
+        worker.submit(layer_obj, "first", callback)
+        future = worker.jobs[layer_obj][1]
+        worker.submit(layer_obj, "second", callback)
+        assert worker.jobs[layer_obj][1] is future
+        function, args = posted.get(timeout=60)
+        assert function(*args) == False
+        worker.shutdown()
+    assert posted.empty()
+    assert not worker.is_pending(layer_obj)
+    assert len(results) == 1
+    owner, version, result = results[0]
+    assert owner is layer_obj and version == "second"
+    assert cache.lookup(layer_obj) is result
+    assert cache.get_result(layer_obj) is result
+    layer_obj.append_data_arrays([[10.0], [40.0], [100.0], [30.0], ["dn"]])
+    assert cache.lookup(layer_obj) is None
+
+
+def test_worker_hands_errors_to_the_error_function():
+    """
+    A failed inversion calls the error function with the layer and the
+    exception, and neither the callback nor the cache receive a result.
+    """
+    rng = np.random.RandomState(17)
+    frame = np.eye(3)[:, [2, 0, 1]]
+    layer_obj = FaultPlaneLayer(None, None)
+    layer_obj.attach_data_arrays(list(synthetic_faults(rng, frame, 0.5, 60)))
+    cache = StressInversionCache()
+    posted = queue.Queue()
+    results = []
+    errors = []
+    executor = ThreadPoolExecutor(max_workers=1)
+    #A pool that is shut down can not run the blocks of the inversion
+    executor.shutdown()
+    worker = StressWorker(cache,
+                          lambda function, *args: posted.put((function,
+                                                              args)),
+                          executor,
+                          lambda owner, error: errors.append((owner, error)))
+    worker.submit(layer_obj, 1, lambda *args: results.append(args))
+    function, args = posted.get(timeout=60)
+    assert function(*args) == False
+    worker.shutdown()
+    assert results == []
+    assert len(errors) == 1 and errors[0][0] is layer_obj
+    assert isinstance(errors[0][1], RuntimeError)
+    assert cache.lookup(layer_obj) is None
+    assert not worker.is_pending(layer_obj)
@@ -0,0 +1,98 @@
+#!/usr/bin/python3
+
+"""
+Tests saving and opening projects with innstereo.project_file.
+"""
+
+import zipfile
+import numpy as np
+from innstereo.headless import load_project_layers
+from innstereo.project_file import save_project, ProjectArchive
+
+
+def project_tree(dipdir, dip, notes):
+    """
+    Returns a layer tree with a plane-layer inside a group.
+    """
+    layer = {"kind": "layer", "label": "Bedding", "visible": True,
+             "layer_type": "plane", "style": {"line_color": "#123456"},
+             "columns": [dipdir, dip, notes]}
+    return [{"kind": "group", "label": "Outcrop 1", "visible": True,
+             "children": [layer]}]
+
+
+def test_round_trip_with_memory_mapped_columns(tmp_path):
+    """
+    The columns are memory-mapped when opened, edits do not change the
+    file, and the mapped columns can be saved over their own file.
+    """
+    path = str(tmp_path / "test.innstereo")
+    dipdir = np.linspace(0, 359, 1000)
+    dip = np.linspace(0, 90, 1000)
+    notes = np.array(["", "äöü", "a long note"] * 333 + ["x"], dtype=object)
+    save_project(path, project_tree(dipdir, dip, notes), {"grid": True})
+
+    archive = ProjectArchive(path)
+    assert archive.get_settings() == {"grid": True}
+    group = archive.get_layer_tree()[0]
+    assert group["label"] == "Outcrop 1"
+    layer = group["children"][0]
+    assert layer["style"] == {"line_color": "#123456"}
+    columns = archive.read_columns(layer["columns"])
+    assert isinstance(columns[0], np.memmap)
+    np.testing.assert_array_equal(columns[0], dipdir)
+    np.testing.assert_array_equal(columns[1], dip)
+    assert columns[2].tolist() == notes.tolist()
+
+    #Copy-on-write: the file keeps its values
+    columns[0][0] = 123
+    assert ProjectArchive(path).read_columns(layer["columns"])[0][0] == 0
+
+    #Save the mapped columns over the file they are mapped from
+    save_project(path, project_tree(*columns), {})
+    reopened = ProjectArchive(path)
+    saved = reopened.read_columns(
+                    reopened.get_layer_tree()[0]["children"][0]["columns"])
+    assert saved[0][0] == 123
+    np.testing.assert_array_equal(saved[1], dip)
+    assert saved[2].tolist() == notes.tolist()
+
+
+def test_layers_load_their_columns_when_used(tmp_path):
+    """
+    Opened layers read their data from the archive when it is first used.
+    """
+    path = str(tmp_path / "test.innstereo")
+    save_project(path, project_tree(np.array([10.0, 20.0]),
+                                    np.array([30.0, 40.0]),
+                                    np.array(["a", "b"], dtype=object)), {})
+    archive = ProjectArchive(path)
+    layers = load_project_layers(archive, archive.get_layer_tree())
+    assert len(layers) == 1
+    assert layers[0].get_label() == "Bedding"
+    assert layers[0].get_line_color() == "#123456"
+    assert layers[0].data_loader is not None
+    columns = layers[0].get_data_columns()
+    assert layers[0].data_loader is None
+    assert columns.get_column(1).tolist() == [30.0, 40.0]
+    assert columns.get_column(2).tolist() == ["a", "b"]
+
+
+def test_compressed_members_are_read(tmp_path):
+    """
+    Archives that were packed again with compression can still be opened.
+    """
+    path = str(tmp_path / "test.innstereo")
+    packed = str(tmp_path / "packed.innstereo")
+    save_project(path, project_tree(np.arange(5.0), np.arange(5.0),
+                                    np.array([""] * 5, dtype=object)), {})
+    with zipfile.ZipFile(path) as source, \
+            zipfile.ZipFile(packed, "w", zipfile.ZIP_DEFLATED) as target:
+        for info in source.infolist():
+            target.writestr(info.filename, source.read(info.filename))
+    archive = ProjectArchive(packed)
+    names = archive.get_layer_tree()[0]["children"][0]["columns"]
+    columns = archive.read_columns(names)
+    assert not isinstance(columns[0], np.memmap)
+    np.testing.assert_array_equal(columns[1], np.arange(5.0))
+    assert columns[2].tolist() == [""] * 5
@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+
+"""
+Tests the counts and the cache of innstereo.rose_histogram.
+"""
+
+import numpy as np
+from innstereo.layer_types import PlaneLayer
+from innstereo.rose_histogram import rose_counts, RoseHistogramCache
+
+
+def test_rose_counts_wrap_azimuths():
+    """
+    360 degrees and negative azimuths are counted in the bins of 0 to 360.
+    """
+    counts = rose_counts([0, 5, 359.9, 360, -10, 725], 10)
+    assert len(counts) == 36
+    assert counts.sum() == 6
+    assert counts[0] == 4
+    assert counts[35] == 2
+
+
+def test_cache_hits_until_the_data_or_spacing_changes():
+    """
+    The cached counts are returned until the data version or the spacing
+    changes.
+    """
+    layer_obj = PlaneLayer(None, None)
+    layer_obj.attach_data_arrays([np.array([10.0, 20, 200]),
+                                  np.array([30.0, 40, 50]), None])
+    azimuths = layer_obj.get_data_columns().get_column(0)
+    cache = RoseHistogramCache()
+    first = cache.get_counts(layer_obj, azimuths, 10)
+    assert cache.get_counts(layer_obj, azimuths, 10) is first
+
+    other = cache.get_counts(layer_obj, azimuths, 20)
+    assert other is not first
+    assert len(other) == 18
+
+    layer_obj.append_data_arrays([[15.0], [10.0], [""]])
+    azimuths = layer_obj.get_data_columns().get_column(0)
+    counts = cache.get_counts(layer_obj, azimuths, 20)
+    assert counts is not other
+    assert counts.sum() == 4
+
+    #Style changes keep the counts
+    layer_obj.set_line_color("#ff0000")
+    assert cache.get_counts(layer_obj, azimuths, 20) is counts
+
+
+def test_cache_drops_deleted_layers():
+    """
+    The cache does not keep deleted layers alive.
+    """
+    layer_obj = PlaneLayer(None, None)
+    layer_obj.attach_data_arrays([np.array([10.0]), np.array([30.0]), None])
+    cache = RoseHistogramCache()
+    cache.get_counts(layer_obj, layer_obj.get_data_columns().get_column(0),
+                     10)
+    assert len(cache.counts) == 1
+    del layer_obj
+    assert len(cache.counts) == 0
@@ -0,0 +1,107 @@
+#!/usr/bin/python3
+
+"""
+Tests the detection of the layout of text files by innstereo.text_sniffer.
+"""
+
+import numpy as np
+from innstereo.text_sniffer import sniff_dialect
+
+
+def sample_rows(size=50, seed=1):
+    """
+    Returns rows of random dip directions and dips with one decimal.
+    """
+    rng = np.random.RandomState(seed)
+    return [(rng.randint(3600) / 10.0, rng.randint(900) / 10.0)
+            for k in range(size)]
+
+
+def test_tab_separated_with_header():
+    """
+    Tabs are detected and the header gives the column names.
+    """
+    lines = ["Dip direction\tDip\tUnit"] + \
+            ["{0}\t{1}\tlimestone".format(*row) for row in sample_rows()]
+    dialect = sniff_dialect(lines)
+    assert dialect.delimiter == "\t"
+    assert dialect.decimal == "."
+    assert dialect.header_lines == 1
+    assert dialect.column_names == ["Dip direction", "Dip", "Unit"]
+    assert dialect.column_types == ["float", "float", "text"]
+    assert dialect.get_layer_columns("plane") == ([0, 1], 2, False)
+
+
+def test_semicolons_with_decimal_commas():
+    """
+    Semicolon-separated exports of spreadsheets use decimal commas.
+    """
+    lines = ["{0};{1}".format(*row).replace(".", ",")
+             for row in sample_rows()]
+    dialect = sniff_dialect(lines)
+    assert dialect.delimiter == ";"
+    assert dialect.decimal == ","
+    assert dialect.header_lines == 0
+    assert dialect.column_types == ["float", "float"]
+    assert dialect.get_layer_columns("plane")[0] == [0, 1]
+    values = dialect.to_floats([dialect.split_line(lines[0])[0]])
+    assert values[0] == sample_rows()[0][0]
+
+
+def test_whitespace_with_decimal_commas():
+    """
+    Whitespace between fields with decimal commas is not mistaken for
+    fields separated by commas.
+    """
+    lines = ["{0}   {1}".format(*row).replace(".", ",")
+             for row in sample_rows()]
+    dialect = sniff_dialect(lines)
+    assert dialect.delimiter == " "
+    assert dialect.decimal == ","
+    assert dialect.column_types == ["float", "float"]
+    assert dialect.get_layer_columns("plane")[0] == [0, 1]
+
+
+def test_commas_with_spaces_stay_commas():
+    """
+    Comma-separated files with a space after each comma are split at the
+    commas.
+    """
+    lines = ["{0}, {1}, a note".format(*row) for row in sample_rows()]
+    dialect = sniff_dialect(lines)
+    assert dialect.delimiter == ","
+    assert dialect.decimal == "."
+    assert dialect.get_layer_columns("plane") == ([0, 1], 2, False)
+
+
+def test_quoted_fields():
+    """
+    Quoted fields can hold the delimiter.
+    """
+    lines = ["\"Azimuth\",\"Dip\",\"Comment\""] + \
+            ["{0},{1},\"bedding, overturned\"".format(*row)
+             for row in sample_rows()]
+    dialect = sniff_dialect(lines)
+    assert dialect.delimiter == ","
+    assert dialect.quote == "\""
+    assert dialect.header_lines == 1
+    assert dialect.split_line(lines[1])[2] == "bedding, overturned"
+    assert dialect.get_layer_columns("plane") == ([0, 1], 2, False)
+
+
+def test_several_header_lines_and_fault_columns():
+    """
+    All lines before the first row of numbers are header lines, and the
+    columns of faults are guessed from the names of the last one.
+    """
+    rows = sample_rows()
+    lines = ["Outcrop 12", "Logged by A. B.",
+             "Dip direction;Dip;Trend;Plunge;Sense"] + \
+            ["{0};{1};{0};{2};{3}".format(row[0], row[1], row[1] / 2,
+                                          ["up", "dn", "dex"][k % 3])
+             for k, row in enumerate(rows)]
+    dialect = sniff_dialect(lines)
+    assert dialect.delimiter == ";"
+    assert dialect.header_lines == 3
+    assert dialect.get_layer_columns("faultplane") == ([0, 1, 2, 3], 4,
+                                                       False)